@@ -0,0 +1 @@
+"""性能基准：合成仓库生成器（synth）和分阶段计时（run）。用法见 python -m benchmarks --help"""
@@ -0,0 +1,347 @@
+"""
+基准测试：生成合成仓库，逐个阶段计时，结果写成 JSON。
+
+    python -m benchmarks --files 20000 -o bench.json
+    python -m benchmarks --files 20000 --compare bench.json   # 与上次结果对比，变慢时退出码为 1
+
+无界面的阶段（扫描、读取、解码、渲染……）只依赖 extractor；
+文件树、勾选和剪贴板阶段通过 Qt 的 offscreen 平台运行，没有安装 PySide6 时跳过。
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from extractor import (TYPE_DIR, ContentCache, DepGraph, Extractor, PathFilter, StringSink, compact_text,
+                       estimate_tokens, outline_text, read_file, render_chunks)
+from extractor.cli import parse_size
+from extractor.search import ContentIndex, PathIndex
+
+from .synth import DEFAULT_ENCODINGS, generate, parse_mix
+
+SCHEMA = 1
+
+# 冷启动：新进程里从导入 PySide6 到主窗口第一次绘制完成的时间
+STARTUP_SCRIPT = '''
+import time
+start = time.perf_counter()
+from PySide6.QtWidgets import QApplication
+from gui.window import MainWindow
+app = QApplication([])
+window = MainWindow()
+window.show()
+app.processEvents()
+print(time.perf_counter() - start)
+'''
+
+# 对比时低于这个时间（秒）的差异视为噪声
+NOISE_FLOOR = 0.005
+
+
+def timed(func, repeat):
+    """运行 func repeat 次，返回 (各次耗时, 最后一次的返回值)"""
+    runs = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        runs.append(time.perf_counter() - start)
+    return runs, result
+
+
+def summarize(runs, **extra):
+    entry = {'best': min(runs), 'median': statistics.median(runs), 'runs': runs}
+    entry.update(extra)
+    return entry
+
+
+# --- 无界面阶段 ---
+
+def bench_engine(root, repeat, workers):
+    stages = {}
+    selected = [(root, TYPE_DIR)]
+    path_filter = PathFilter(root)
+
+    runs, files = timed(lambda: Extractor(root, selected, path_filter=path_filter).collect_files(), repeat)
+    stages['scan'] = summarize(runs, files=len(files))
+
+    def read_all():
+        total = 0
+        for path in files:
+            with open(path, 'rb') as f:
+                total += len(f.read())
+        return total
+    runs, nbytes = timed(read_all, repeat)
+    stages['read'] = summarize(runs, bytes=nbytes)
+
+    runs, decoded = timed(lambda: [(path, read_file(path)[0]) for path in files], repeat)
+    stages['decode'] = summarize(runs, files=sum(1 for _, text in decoded if text is not None))
+
+    def decode_parallel():
+        return sum(1 for _, text in Extractor(root, selected, workers=workers).iter_decoded(files)
+                   if text is not None)
+    runs, count = timed(decode_parallel, repeat)
+    stages['decode_parallel'] = summarize(runs, files=count, workers=Extractor(root, selected, workers=workers).workers)
+
+    # 缓存命中：先跑一遍填充缓存，再计时
+    cache_dir = tempfile.mkdtemp(prefix='code_copier_bench_cache_')
+    try:
+        cache = ContentCache(os.path.join(cache_dir, 'content.sqlite'))
+        list(Extractor(root, selected, workers=workers, cache=cache).iter_decoded(files))
+        cache.flush()
+        cache.reset_counters()
+        runs, _ = timed(lambda: list(Extractor(root, selected, workers=workers, cache=cache).iter_decoded(files)), repeat)
+        stages['decode_cached'] = summarize(runs, hits=cache.hits // repeat)
+        cache.close()
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    texts = [(os.path.relpath(path, root), text) for path, text in decoded if text is not None]
+
+    def render():
+        sink = StringSink()
+        for rel_path, text in texts:
+            for chunk in render_chunks(rel_path, text):
+                sink.write(chunk)
+        return sink.getvalue()
+    runs, output = timed(render, repeat)
+    stages['render'] = summarize(runs, chars=len(output))
+
+    runs, tokens = timed(lambda: sum(estimate_tokens(text) for _, text in texts), repeat)
+    stages['tokens'] = summarize(runs, tokens=tokens)
+
+    runs, _ = timed(lambda: [compact_text(rel_path, text) for rel_path, text in texts], repeat)
+    stages['compact'] = summarize(runs)
+
+    runs, _ = timed(lambda: [outline_text(rel_path, text) for rel_path, text in texts], repeat)
+    stages['outline'] = summarize(runs)
+
+    runs, path_index = timed(lambda: PathIndex.build(root, path_filter.walk(root)), repeat)
+    stages['search_index'] = summarize(runs, paths=len(path_index))
+    queries = ['file', 'file_1', 'fiel_12', 'd1 d2 file']
+    runs, _ = timed(lambda: [path_index.search(q) for q in queries], repeat)
+    stages['search_names'] = summarize(runs, queries=len(queries))
+    runs, content_index = timed(lambda: ContentIndex.build(root, decoded), repeat)
+    stages['search_content_index'] = summarize(runs, files=len(content_index), postings=content_index.postings)
+    contents = {rel_path.replace(os.sep, '/'): text for rel_path, text in texts}
+    runs, _ = timed(lambda: content_index.search('edge cases', contents.get), repeat)
+    stages['search_contents'] = summarize(runs)
+
+    # 依赖图：冷构建每次用新的数据库，增量构建在没有变化的仓库上只 stat 不解析
+    deps_dir = tempfile.mkdtemp(prefix='code_copier_bench_deps_')
+    try:
+        def deps_cold():
+            db = os.path.join(deps_dir, f'deps_{time.perf_counter_ns()}.sqlite')
+            graph = DepGraph(root, path_filter, path=db)
+            graph.build()
+            graph.close()
+            return graph
+        runs, graph = timed(deps_cold, repeat)
+        stages['deps_build'] = summarize(runs, parsed=graph.parsed)
+        graph = DepGraph(root, path_filter, path=graph.path)
+        runs, _ = timed(graph.build, repeat)
+        stages['deps_update'] = summarize(runs, parsed=graph.parsed)
+        runs, found = timed(lambda: graph.dependencies(files, 2), repeat)
+        stages['deps_resolve'] = summarize(runs, found=len(found))
+        graph.close()
+    finally:
+        shutil.rmtree(deps_dir, ignore_errors=True)
+
+    runs, (text, count) = timed(lambda: Extractor(root, selected, workers=workers).run(), repeat)
+    stages['extract'] = summarize(runs, files=count, chars=len(text))
+    return stages, text
+
+
+# --- Qt 阶段 ---
+
+def bench_gui(root, repeat, text, timeout=120.0):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6.QtCore import QModelIndex, Qt
+    from PySide6.QtWidgets import QApplication
+
+    from gui.tree_model import FileTreeModel
+
+    app = QApplication.instance() or QApplication([])
+    stages = {}
+
+    def spin_until(condition):
+        deadline = time.perf_counter() + timeout
+        while not condition():
+            if time.perf_counter() > deadline:
+                raise TimeoutError('tree loading did not finish')
+            app.processEvents()
+
+    model = FileTreeModel()
+
+    def load_tree():
+        # 模拟把每个目录都展开一遍：逐层 fetchMore，等后台加载全部完成
+        model.set_root(root, PathFilter(root))
+        pending = [QModelIndex()]
+        while pending:
+            parent = pending.pop()
+            if model.canFetchMore(parent):
+                model.fetchMore(parent)
+                node = model.node_of(parent)
+                spin_until(lambda: node not in model._loading)
+            for row in range(model.rowCount(parent)):
+                child = model.index(row, 0, parent)
+                if model.hasChildren(child):
+                    pending.append(child)
+    runs, _ = timed(load_tree, repeat)
+    stages['tree_load'] = summarize(runs, nodes=len(model.index_data),
+                                    index_bytes=model.index_data.memory_usage())
+
+    top = [model.node_of(model.index(row, 0)) for row in range(model.rowCount())]
+
+    def toggle_top():
+        for state in (Qt.CheckState.Checked, Qt.CheckState.Unchecked):
+            for node in top:
+                model.set_check_state(node, state.value)
+    runs, _ = timed(toggle_top, repeat)
+    stages['selection_toggle'] = summarize(runs, toggles=2 * len(top))
+
+    # 最深的叶子：勾选状态需要一路传播到根
+    deepest = max(range(len(model.index_data)), key=lambda n: _depth(model.index_data, n))
+
+    def toggle_leaf():
+        for state in (Qt.CheckState.Checked, Qt.CheckState.Unchecked):
+            model.set_check_state(deepest, state.value)
+    runs, _ = timed(toggle_leaf, repeat)
+    stages['selection_toggle_leaf'] = summarize(runs, depth=_depth(model.index_data, deepest))
+
+    for node in top:
+        model.set_check_state(node, Qt.CheckState.Checked.value)
+    runs, checked = timed(model.collect_checked_paths, repeat)
+    stages['collect_checked'] = summarize(runs, items=len(checked))
+
+    clipboard = app.clipboard()
+    runs, _ = timed(lambda: clipboard.setText(text), repeat)
+    stages['clipboard'] = summarize(runs, chars=len(text))
+    return stages
+
+
+def bench_startup(repeat):
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=repo_root, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        runs.append(float(out.split()[-1]))
+    return {'startup': summarize(runs)}
+
+
+def _depth(index, node):
+    depth = 0
+    while node > 0:
+        node = index.parent[node]
+        depth += 1
+    return depth
+
+
+# --- 对比 ---
+
+def compare(result, baseline, tolerance):
+    """打印与 baseline 的对比，返回变慢超过 tolerance 的阶段名"""
+    regressions = []
+    print(f"{'stage':<24}{'baseline':>12}{'current':>12}{'change':>10}", file=sys.stderr)
+    for name, entry in result['stages'].items():
+        old = baseline.get('stages', {}).get(name)
+        if old is None:
+            continue
+        before, after = old['best'], entry['best']
+        change = (after - before) / before if before else 0.0
+        flag = ''
+        if after > before * (1 + tolerance) and after - before > NOISE_FLOOR:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<24}{before * 1000:>10.1f}ms{after * 1000:>10.1f}ms{change:>+10.0%}{flag}", file=sys.stderr)
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Benchmark code_copier on a synthetic repository')
+    parser.add_argument('--files', type=int, default=2000, help='Number of files to generate (default: %(default)s)')
+    parser.add_argument('--depth', type=int, default=4, help='Maximum directory depth (default: %(default)s)')
+    parser.add_argument('--fanout', type=int, default=6, help='Subdirectories per level (default: %(default)s)')
+    parser.add_argument('--median-size', type=parse_size, default=4096, metavar='SIZE',
+                        help='Median file size, log-normally distributed (default: 4K)')
+    parser.add_argument('--max-size', type=parse_size, default=1024 * 1024, metavar='SIZE',
+                        help='Largest generated file (default: 1M)')
+    parser.add_argument('--encodings', type=parse_mix, default=DEFAULT_ENCODINGS, metavar='MIX',
+                        help='Encoding mix, e.g. utf-8=0.8,gbk=0.15,latin-1=0.05')
+    parser.add_argument('--binary', type=float, default=0.02, metavar='RATIO',
+                        help='Fraction of binary files (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: %(default)s)')
+    parser.add_argument('--repo', help='Generate into this directory and keep it (default: a temp dir)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per stage; best and median are reported')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='Read/decode threads')
+    parser.add_argument('--no-gui', action='store_true', help='Skip the Qt stages')
+    parser.add_argument('-o', '--output', help='Write the JSON result to this file instead of stdout')
+    parser.add_argument('--compare', metavar='JSON', help='Compare with an earlier result')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown before --compare fails (default: %(default)s)')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    params = {'files': args.files, 'depth': args.depth, 'fanout': args.fanout,
+              'median_size': args.median_size, 'max_size': args.max_size,
+              'encodings': args.encodings, 'binary_ratio': args.binary, 'seed': args.seed}
+
+    root = args.repo or tempfile.mkdtemp(prefix='code_copier_bench_')
+    try:
+        if args.repo and os.listdir(root):
+            print(f"error: {root} is not empty", file=sys.stderr)
+            return 2
+        start = time.perf_counter()
+        repo = generate(root, **params)
+        repo['generate_seconds'] = time.perf_counter() - start
+        print(f"Generated {repo['files']} files ({repo['bytes']} bytes) in {root}", file=sys.stderr)
+
+        stages, text = bench_engine(root, args.repeat, args.workers)
+        if not args.no_gui:
+            try:
+                stages.update(bench_gui(root, args.repeat, text))
+                stages.update(bench_startup(args.repeat))
+            except ImportError as e:
+                print(f"warning: skipping Qt stages: {e}", file=sys.stderr)
+    finally:
+        if not args.repo:
+            shutil.rmtree(root, ignore_errors=True)
+
+    result = {
+        'schema': SCHEMA,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'params': params,
+        'repo': repo,
+        'stages': stages,
+    }
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('params') != params:
+            print("warning: baseline was generated with different parameters", file=sys.stderr)
+        if compare(result, baseline, args.tolerance):
+            return 1
+    return 0
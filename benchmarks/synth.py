@@ -0,0 +1,99 @@
+"""
+生成合成测试仓库：文件数、目录深度、大小分布、编码比例和二进制比例都可调，
+同一组参数和 seed 生成的内容完全相同，便于在不同版本之间对比。
+"""
+import math
+import os
+import random
+
+DEFAULT_ENCODINGS = {'utf-8': 0.8, 'gbk': 0.15, 'latin-1': 0.05}
+
+# 文本文件的扩展名和对应的代码模板；{i} 为序号，{word} 为按编码挑选的注释内容
+TEMPLATES = {
+    '.py': "def func_{i}(a, b):\n    # {word}\n    value = a * {i} + b  # {word}\n    return value\n\n",
+    '.js': "export function f{i}(a, b) {{\n  // {word}\n  return a * {i} + b;\n}}\n\n",
+    '.go': "func F{i}(a, b int) int {{\n\t// {word}\n\treturn a*{i} + b\n}}\n\n",
+    '.java': "    public int m{i}(int a, int b) {{\n        /* {word} */\n        return a * {i} + b;\n    }}\n\n",
+    '.c': "static int f{i}(int a, int b)\n{{\n    /* {word} */\n    return a * {i} + b;\n}}\n\n",
+    '.md': "## Section {i}\n\n{word} - item {i}, see `func_{i}`.\n\n",
+    '.txt': "line {i}: {word}\n",
+}
+
+# 各编码下的注释文字：GBK 文件含中文，latin-1 文件含重音字母
+WORDS = {
+    'utf-8': ['compute the value', 'handle edge cases', '计算结果 ✓', 'naïve approach'],
+    'gbk': ['计算结果', '处理边界情况', '中文注释', 'mixed 中英文'],
+    'latin-1': ['déjà vu', 'café au lait', 'façade', 'plain ascii'],
+}
+
+BINARY_EXT = '.dat'
+
+
+def parse_mix(text):
+    """'utf-8=0.8,gbk=0.2' -> {'utf-8': 0.8, 'gbk': 0.2}，权重归一化"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight) if weight else 1.0
+    total = sum(mix.values())
+    return {name: weight / total for name, weight in mix.items()}
+
+
+def _text_content(rng, ext, encoding, size):
+    """按模板重复生成约 size 字节的文本，再用 encoding 编码"""
+    template = TEMPLATES[ext]
+    words = WORDS.get(encoding, WORDS['utf-8'])
+    parts = []
+    length = 0
+    i = 0
+    while length < size:
+        chunk = template.format(i=i, word=words[rng.randrange(len(words))])
+        parts.append(chunk)
+        length += len(chunk)
+        i += 1
+    return ''.join(parts).encode(encoding)
+
+
+def generate(root, files=2000, depth=4, fanout=6, median_size=4096, max_size=1024 * 1024,
+             sigma=1.0, encodings=None, binary_ratio=0.02, seed=0):
+    """
+    在 root 下生成仓库，返回统计信息 dict。
+
+    每个文件随机放在深度 0..depth 的目录中，每层最多 fanout 个子目录；
+    大小服从中位数为 median_size 的对数正态分布，截断到 max_size。
+    """
+    rng = random.Random(seed)
+    encodings = encodings or DEFAULT_ENCODINGS
+    names, weights = list(encodings), list(encodings.values())
+    exts = list(TEMPLATES)
+
+    stats = {'files': 0, 'dirs': 0, 'bytes': 0, 'binary': 0,
+             'by_encoding': {name: 0 for name in names}}
+    created = set()
+    for i in range(files):
+        parts = [f"d{rng.randrange(fanout)}" for _ in range(rng.randint(0, depth))]
+        dir_path = os.path.join(root, *parts)
+        if dir_path not in created:
+            os.makedirs(dir_path, exist_ok=True)
+            created.add(dir_path)
+        size = max(1, min(max_size, int(rng.lognormvariate(math.log(median_size), sigma))))
+
+        if rng.random() < binary_ratio:
+            # 开头带 NUL 字节，会被二进制嗅探识别出来
+            data = b'\x00' + rng.randbytes(size - 1) if size > 1 else b'\x00'
+            path = os.path.join(dir_path, f"blob_{i}{BINARY_EXT}")
+            stats['binary'] += 1
+        else:
+            encoding = rng.choices(names, weights)[0]
+            ext = exts[rng.randrange(len(exts))]
+            data = _text_content(rng, ext, encoding, size)
+            path = os.path.join(dir_path, f"file_{i}{ext}")
+            stats['by_encoding'][encoding] += 1
+
+        with open(path, 'wb') as f:
+            f.write(data)
+        stats['files'] += 1
+        stats['bytes'] += len(data)
+
+    stats['dirs'] = len(created)
+    return stats
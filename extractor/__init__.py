@@ -0,0 +1,34 @@
+"""无界面的代码提取引擎，供 GUI、命令行和脚本共用。"""
+from .engine import (TYPE_DIR, TYPE_FILE, Extractor,
+                     decode_file, default_workers, extract, read_file, render_chunks, render_file,
+                     resolve_selection)
+from .archive import Archive, ArchiveError, is_archive, open_archive
+from .compact import compact_text
+from .outline import outline_supported, outline_text
+from .encoding import ENCODINGS, decode_bytes, sniff
+from .excerpt import Excerpt
+from .cache import ContentCache, cache_dir
+from .deps import DepGraph
+from .filters import IGNORE_DIRS, IGNORE_EXTS, PathFilter
+from .git import GitDiff, GitError
+from .project_index import ProjectIndex, recent_projects
+from .sinks import FileSink, PartSink, Sink, StreamSink, StringSink, stdout_sink
+from .tokens import PREFER_RECENT, PREFER_SMALL, estimate_tokens, format_tokens, pack
+from .trace import Trace
+
+__all__ = ['IGNORE_DIRS', 'IGNORE_EXTS', 'TYPE_DIR', 'TYPE_FILE', 'Extractor',
+           'decode_file', 'default_workers', 'extract', 'read_file', 'render_chunks', 'render_file',
+           'resolve_selection',
+           'Archive', 'ArchiveError', 'is_archive', 'open_archive',
+           'compact_text',
+           'outline_supported', 'outline_text',
+           'ENCODINGS', 'decode_bytes', 'sniff',
+           'Excerpt',
+           'ContentCache', 'cache_dir',
+           'DepGraph',
+           'PathFilter',
+           'GitDiff', 'GitError',
+           'ProjectIndex', 'recent_projects',
+           'FileSink', 'PartSink', 'Sink', 'StreamSink', 'StringSink', 'stdout_sink',
+           'PREFER_RECENT', 'PREFER_SMALL', 'estimate_tokens', 'format_tokens', 'pack',
+           'Trace']
@@ -0,0 +1,240 @@
+"""
+zip / tar 归档作为虚拟的项目根目录：不解压到磁盘，文件树直接来自归档的目录
+（zip 的中央目录、tar 的成员头），提取时流式读取单个成员。
+
+虚拟路径为归档路径后接成员路径，如 /tmp/release.tar.gz/pkg/mod.py，
+PathFilter 的相对路径、输出的标题和缓存键都不必区分普通目录和归档；归档中的 .gitignore / .ignore 同样生效。
+
+zip 可以随机读取任意成员，多个线程并行读取。压缩的 tar 只能顺序解压：
+提取时按成员在归档中的位置排序（read_order）并且单线程读取，整个归档只向前解压一遍。
+"""
+import io
+import lzma
+import os
+import tarfile
+import threading
+import time
+import zipfile
+import zlib
+from collections import namedtuple
+
+from .filters import IGNORE_FILES, PathFilter, RuleSet
+
+ZIP_EXTS = ('.zip', '.whl', '.jar')
+TAR_EXTS = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+ARCHIVE_EXTS = ZIP_EXTS + TAR_EXTS
+
+# 读取归档时可能出现的错误，都当作文件无法读取（加密的 zip 成员抛出 RuntimeError）
+READ_ERRORS = (OSError, EOFError, RuntimeError, zipfile.BadZipFile, tarfile.TarError, zlib.error, lzma.LZMAError)
+
+# st_mtime 为成员自身的修改时间（用于“优先最近修改”），st_mtime_ns 为归档文件的修改时间：
+# 缓存以它为键，归档被替换后其中所有成员都会失效
+MemberStat = namedtuple('MemberStat', 'st_size st_mtime st_mtime_ns')
+
+
+class ArchiveError(Exception):
+    """不是支持的归档格式，或者归档已损坏"""
+
+
+def is_archive(path):
+    """path 是否为可以作为根目录打开的归档文件（按扩展名判断）"""
+    return path.lower().endswith(ARCHIVE_EXTS) and os.path.isfile(path)
+
+
+def open_archive(path, extra_globs=None, use_gitignore=True):
+    """按扩展名打开 zip 或 tar 归档，读出成员列表；失败时抛出 ArchiveError"""
+    name = path.lower()
+    if name.endswith(ZIP_EXTS):
+        cls = ZipArchive
+    elif name.endswith(TAR_EXTS):
+        cls = TarArchive
+    else:
+        raise ArchiveError(f"unsupported archive type: {os.path.basename(path)}")
+    try:
+        return cls(path, extra_globs, use_gitignore)
+    except READ_ERRORS as e:
+        raise ArchiveError(f"cannot read archive {os.path.basename(path)}: {e}")
+
+
+def _member_rel(name):
+    """成员名 -> 以 / 分隔的相对路径；去掉开头的 / 和 ./，含 .. 的成员返回 None"""
+    parts = [p for p in name.replace('\\', '/').split('/') if p and p != '.']
+    if not parts or '..' in parts:
+        return None
+    return '/'.join(parts)
+
+
+class Archive(PathFilter):
+    """
+    归档中的虚拟文件树。本身就是一个 PathFilter（list_dir / walk 只列出归档中的成员），
+    可以直接交给文件树、搜索和 Extractor；Extractor 另外通过 stat / open 读取成员。
+    """
+    sequential = False  # True 时成员只能按 read_order 的顺序单线程读取
+
+    def __init__(self, path, extra_globs=None, use_gitignore=True):
+        super().__init__(path, extra_globs, use_gitignore)
+        self.mtime_ns = os.stat(self.root).st_mtime_ns
+        self._dirs = {'': {}}   # 相对目录 -> {名称: is_dir}
+        self._members = {}      # 相对路径 -> (size, mtime, 成员对象)
+        self._load()
+
+    def file_count(self):
+        return len(self._members)
+
+    def set_extra_globs(self, extra_globs):
+        """更换用户自定义规则；不必为此重新读取归档的成员列表"""
+        self.extra_globs = list(extra_globs or [])
+        self.user_rules = RuleSet(self.extra_globs)
+
+    def _load(self):
+        raise NotImplementedError
+
+    def _add(self, rel, is_dir, size=0, mtime=0, member=None):
+        """加入一个成员；缺少的上级目录自动补上（zip 中常常没有目录条目）"""
+        parts = rel.split('/')
+        parent = ''
+        for part in parts[:-1]:
+            path = parent + '/' + part if parent else part
+            if path not in self._dirs:
+                self._dirs[parent][part] = True
+                self._dirs[path] = {}
+            parent = path
+        if rel in self._dirs:
+            return
+        self._dirs[parent][parts[-1]] = is_dir
+        if is_dir:
+            self._dirs[rel] = {}
+        else:
+            self._members[rel] = (size, mtime, member)
+
+    def _entry(self, path):
+        rel = self.relpath(path)
+        entry = self._members.get(rel) if rel is not None else None
+        if entry is None:
+            raise FileNotFoundError(2, 'No such file in archive', path)
+        return entry
+
+    def isdir(self, path):
+        rel = self.relpath(path)
+        return rel is not None and rel in self._dirs
+
+    def isfile(self, path):
+        rel = self.relpath(path)
+        return rel is not None and rel in self._members
+
+    def stat(self, path):
+        """成员的 MemberStat；不存在时抛出 FileNotFoundError"""
+        size, mtime, _ = self._entry(path)
+        return MemberStat(size, mtime, self.mtime_ns)
+
+    def open(self, path):
+        """以只读的二进制流打开成员"""
+        return self._open(self._entry(path)[2])
+
+    def _open(self, member):
+        raise NotImplementedError
+
+    def read_order(self, paths):
+        """读取顺序：可以随机读取时保持原顺序"""
+        return list(paths)
+
+    def close(self):
+        pass
+
+    def _rule_lines(self, rel_dir):
+        lines = []
+        for name in IGNORE_FILES:
+            entry = self._members.get(rel_dir + '/' + name if rel_dir else name)
+            if entry is None:
+                continue
+            try:
+                with self._open(entry[2]) as f:
+                    lines.extend(f.read().decode('utf-8', 'replace').splitlines())
+            except READ_ERRORS:
+                pass
+        return lines
+
+    def list_dir(self, dir_path):
+        rel = self.relpath(dir_path)
+        children = self._dirs.get(rel) if rel is not None else None
+        if children is None:
+            raise FileNotFoundError(2, 'No such directory in archive', dir_path)
+        entries = self.filter_entries(dir_path, children.items())
+        entries.sort(key=lambda e: (not e[1], e[0]))
+        return entries
+
+    def walk(self, top):
+        """与 PathFilter.walk 相同，但遍历的是归档中的目录；调用方同样可以修改 dirs 剪枝"""
+        rel = self.relpath(top)
+        if rel is None or rel not in self._dirs:
+            return
+        stack = [(top, rel)]
+        while stack:
+            dir_path, rel_dir = stack.pop()
+            prefix = rel_dir + '/' if rel_dir else ''
+            dirs, files = [], []
+            for name, is_dir in sorted(self._dirs[rel_dir].items()):
+                if not self.is_ignored(prefix + name, is_dir):
+                    (dirs if is_dir else files).append(name)
+            yield dir_path, dirs, files
+            for name in reversed(dirs):
+                stack.append((os.path.join(dir_path, name), prefix + name))
+
+
+class ZipArchive(Archive):
+    def _load(self):
+        self._zip = zipfile.ZipFile(self.root)
+        for info in self._zip.infolist():
+            rel = _member_rel(info.filename)
+            if rel is None:
+                continue
+            try:
+                mtime = time.mktime(info.date_time + (0, 0, -1))
+            except (OverflowError, ValueError):
+                mtime = 0
+            self._add(rel, info.is_dir(), info.file_size, mtime, info)
+
+    def _open(self, info):
+        # ZipFile 的读取共用一个带锁的文件句柄，多个线程可以同时打开不同的成员
+        return self._zip.open(info)
+
+    def close(self):
+        self._zip.close()
+
+
+class TarArchive(Archive):
+    sequential = True
+
+    def _load(self):
+        self._lock = threading.Lock()
+        self._ignore_data = {}
+        self._tar = tarfile.open(self.root, 'r:*')
+        for member in self._tar:
+            rel = _member_rel(member.name)
+            if rel is None:
+                continue
+            if member.isdir():
+                self._add(rel, True)
+            elif member.isfile():
+                self._add(rel, False, member.size, member.mtime, member)
+                if self.use_gitignore and rel.rsplit('/', 1)[-1] in IGNORE_FILES:
+                    # 规则文件趁顺序扫描时读出，之后不必为它回头解压
+                    self._ignore_data[member] = self._tar.extractfile(member).read()
+
+    def _open(self, member):
+        data = self._ignore_data.get(member)
+        if data is None:
+            # 所有成员共用压缩流的读取位置，在锁内整个读出
+            with self._lock:
+                data = self._tar.extractfile(member).read()
+        return io.BytesIO(data)
+
+    def read_order(self, paths):
+        """按成员在归档中的位置排序，压缩流只需向前解压；不在归档中的路径排在最前"""
+        def offset(path):
+            entry = self._members.get(self.relpath(path))
+            return entry[2].offset_data if entry is not None else -1
+        return sorted(paths, key=offset)
+
+    def close(self):
+        self._tar.close()
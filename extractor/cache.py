@@ -0,0 +1,254 @@
+"""
+解码结果的持久化缓存。
+
+以 (path, size, mtime_ns) 为键保存解码后的文本（或“二进制”判定）及其 token 估算值，
+文件未变化时直接复用，不再读取和解码。大纲模式的结果按内容哈希另存一张表。
+两张表共用一个容量上限，超过时按最近最少使用（LRU）淘汰。
+"""
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_DIR_ENV = 'CODE_COPIER_CACHE_DIR'
+CACHE_SIZE_ENV = 'CODE_COPIER_CACHE_MB'
+DEFAULT_MAX_MB = 256
+# 写入攒够这么多条、或距上次提交超过这么久（秒）就提交：共享的 content.sqlite 的写锁只短暂持有，
+# 另一个窗口、命令行或守护进程不必等到整个提取结束
+COMMIT_BATCH = 64
+COMMIT_INTERVAL = 0.5
+# 写入等待其它进程释放写锁的最长时间（秒）；等不到时这段时间内的写入直接跳过，只是少缓存一些文件
+LOCK_TIMEOUT = 1.0
+LOCKED_BACKOFF = 30.0
+
+
+def cache_dir():
+    """缓存目录：CODE_COPIER_CACHE_DIR > %LOCALAPPDATA% / $XDG_CACHE_HOME / ~/.cache"""
+    path = os.environ.get(CACHE_DIR_ENV)
+    if path:
+        return path
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME') \
+        or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'code_copier')
+
+
+def default_max_bytes():
+    try:
+        return int(float(os.environ.get(CACHE_SIZE_ENV, DEFAULT_MAX_MB)) * 1024 * 1024)
+    except ValueError:
+        return DEFAULT_MAX_MB * 1024 * 1024
+
+
+class ContentCache:
+    """
+    线程安全的 SQLite 缓存，供 Extractor 的读取线程并发使用。
+
+    写入按小批提交，单个文件不会触发磁盘同步，写锁也不会在整个提取期间一直持有；
+    LRU 时间戳的更新和淘汰在 flush() 时进行。
+    """
+
+    def __init__(self, path=None, max_bytes=None):
+        self.path = path or os.path.join(cache_dir(), 'content.sqlite')
+        self.max_bytes = default_max_bytes() if max_bytes is None else max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._touched = {}
+        self._touched_outlines = {}
+        self._pending = 0
+        self._committed = time.monotonic()
+        self._blocked_until = 0.0
+        self._timer = None
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=LOCK_TIMEOUT, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            ' path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER,'
+            ' encoding TEXT, content TEXT, nbytes INTEGER, last_used INTEGER, tokens INTEGER)')
+        # 旧版本建的表没有 tokens 列，补上即可，已有条目按未知处理
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(entries)')}
+        if 'tokens' not in columns:
+            self._conn.execute('ALTER TABLE entries ADD COLUMN tokens INTEGER')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_used)')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS outlines ('
+            ' key TEXT PRIMARY KEY, outline TEXT, nbytes INTEGER, last_used INTEGER)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS outlines_lru ON outlines (last_used)')
+        self._conn.commit()
+
+    def get(self, path, size, mtime_ns):
+        """
+        命中时返回 (encoding, content)；二进制文件返回 (None, None)。
+        未命中或文件已变化时返回 None。
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT encoding, content FROM entries WHERE path = ? AND size = ? AND mtime_ns = ?',
+                (path, size, mtime_ns)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[path] = time.time_ns()
+            return row[0], row[1]
+
+    def get_tokens(self, path, size, mtime_ns):
+        """只取 token 估算值，不读出内容；未命中、二进制文件或旧条目返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT tokens FROM entries WHERE path = ? AND size = ? AND mtime_ns = ?',
+                (path, size, mtime_ns)).fetchone()
+        return row[0] if row is not None else None
+
+    def put(self, path, size, mtime_ns, encoding, content, tokens=None):
+        """保存解码结果；encoding 为 None 表示二进制文件"""
+        # 单个文件超过总容量的 1/4 时不缓存，避免一次把其它条目全部挤掉
+        if size > self.max_bytes // 4:
+            return
+        self._write('INSERT OR REPLACE INTO entries'
+                    ' (path, size, mtime_ns, encoding, content, nbytes, last_used, tokens)'
+                    ' VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (path, size, mtime_ns, encoding, content, size if content is not None else 0,
+                     time.time_ns(), tokens))
+
+    def get_outline(self, key):
+        """按 outline.outline_key() 取缓存的大纲，未命中返回 None"""
+        with self._lock:
+            row = self._conn.execute('SELECT outline FROM outlines WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            self._touched_outlines[key] = time.time_ns()
+            return row[0]
+
+    def put_outline(self, key, outline):
+        self._write('INSERT OR REPLACE INTO outlines VALUES (?, ?, ?, ?)',
+                    (key, outline, len(outline), time.time_ns()))
+
+    def invalidate(self, path):
+        with self._lock:
+            self._conn.execute('DELETE FROM entries WHERE path = ?', (path,))
+            self._touched.pop(path, None)
+            self._commit()
+
+    def invalidate_tree(self, dir_path):
+        """删除 dir_path 目录下所有文件的条目"""
+        prefix = os.path.join(dir_path, '')
+        with self._lock:
+            self._conn.execute('DELETE FROM entries WHERE substr(path, 1, ?) = ?', (len(prefix), prefix))
+            for path in [p for p in self._touched if p.startswith(prefix)]:
+                del self._touched[path]
+            self._commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM entries')
+            self._conn.execute('DELETE FROM outlines')
+            self._touched.clear()
+            self._touched_outlines.clear()
+            self._commit()
+
+    def _write(self, sql, params):
+        """
+        写入一条，攒够一批或距上次提交已久时提交。其它进程占着写锁时抛出 sqlite3.Error，
+        之后 LOCKED_BACKOFF 秒内的写入直接跳过，不必每个文件都等一次锁超时。
+        """
+        with self._lock:
+            if time.monotonic() < self._blocked_until:
+                return
+            try:
+                self._conn.execute(sql, params)
+                self._pending += 1
+                if self._pending >= COMMIT_BATCH or time.monotonic() - self._committed >= COMMIT_INTERVAL:
+                    self._commit()
+                elif self._timer is None:
+                    # 之后没有写入（提取结束或被取消后还在途的读取）时也要提交，事务最多留 COMMIT_INTERVAL 秒
+                    self._timer = threading.Timer(COMMIT_INTERVAL, self._timed_commit)
+                    self._timer.daemon = True
+                    self._timer.start()
+            except sqlite3.OperationalError:
+                self._blocked_until = time.monotonic() + LOCKED_BACKOFF
+                if not self._pending:
+                    self._conn.rollback()  # 没拿到写锁的空事务也不留着
+                raise
+
+    def commit(self):
+        """只提交挂起的写入，不更新 LRU 时间戳、不淘汰；取消提取时使用"""
+        with self._lock:
+            self._timer = None
+            if self._pending:
+                self._commit()
+
+    def _timed_commit(self):
+        try:
+            self.commit()
+        except sqlite3.Error:
+            pass  # 已经回滚，这一批只是没有缓存下来
+
+    def _commit(self):
+        """提交当前事务；失败时（如磁盘已满）回滚这一批，不让事务和写锁一直留着"""
+        self._pending = 0
+        self._committed = time.monotonic()
+        try:
+            self._conn.commit()
+        except sqlite3.Error:
+            self._conn.rollback()
+            raise
+
+    def flush(self):
+        """提交挂起的写入，更新 LRU 时间戳并淘汰超出容量的条目"""
+        with self._lock:
+            try:
+                if self._touched:
+                    self._conn.executemany('UPDATE entries SET last_used = ? WHERE path = ?',
+                                           [(t, p) for p, t in self._touched.items()])
+                    self._touched.clear()
+                if self._touched_outlines:
+                    self._conn.executemany('UPDATE outlines SET last_used = ? WHERE key = ?',
+                                           [(t, k) for k, t in self._touched_outlines.items()])
+                    self._touched_outlines.clear()
+                self._evict()
+            except sqlite3.Error:
+                # 数据库被其它进程锁住：这次不更新时间戳和淘汰，已写入的条目照常提交
+                self._touched.clear()
+                self._touched_outlines.clear()
+            self._commit()
+
+    def _evict(self):
+        total = self._conn.execute(
+            'SELECT (SELECT COALESCE(SUM(nbytes), 0) FROM entries)'
+            ' + (SELECT COALESCE(SUM(nbytes), 0) FROM outlines)').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = {'entries': [], 'outlines': []}
+        for table, key, nbytes, _ in self._conn.execute(
+                "SELECT 'entries', path, nbytes, last_used FROM entries"
+                " UNION ALL SELECT 'outlines', key, nbytes, last_used FROM outlines ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            victims[table].append((key,))
+            total -= nbytes
+        self._conn.executemany('DELETE FROM entries WHERE path = ?', victims['entries'])
+        self._conn.executemany('DELETE FROM outlines WHERE key = ?', victims['outlines'])
+
+    def stats(self):
+        with self._lock:
+            count, total = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM entries').fetchone()
+            total += self._conn.execute('SELECT COALESCE(SUM(nbytes), 0) FROM outlines').fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses, 'entries': count,
+                'bytes': total, 'max_bytes': self.max_bytes}
+
+    def reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        try:
+            self.flush()
+        finally:
+            self._conn.close()
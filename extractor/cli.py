@@ -0,0 +1,349 @@
+"""
+命令行入口：python code_copier.py extract <root> [paths...] [-o OUTPUT]
+            python code_copier.py serve（常驻服务，见 daemon.py；extract --daemon 把请求交给它）
+
+只依赖 extractor 引擎，不会导入 PySide6。
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+
+from .archive import ArchiveError, is_archive, open_archive
+from .cache import ContentCache
+from .deps import DepGraph
+from .engine import SKIP_TOO_LARGE, TYPE_FILE, Extractor, resolve_selection
+from .excerpt import Excerpt, split_path_spec
+from .filters import PathFilter
+from .git import DEFAULT_CONTEXT, DEFAULT_REF, GitDiff, GitError
+from .project_index import ProjectIndex
+from .sinks import FileSink, PartSink, stdout_sink
+from .tokens import PREFER_SMALL, PREFERENCES, format_tokens
+from .trace import FORMAT_CHROME, FORMATS, Trace
+
+# code_copier.py 据此决定是否走命令行分支
+COMMANDS = ('extract', 'serve')
+
+
+def parse_size(text):
+    """'500K' / '2M' / '1G' / '12345' -> 字节数"""
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    text = text.strip().upper().rstrip('B')
+    try:
+        if text and text[-1] in units:
+            return int(float(text[:-1]) * units[text[-1]])
+        return int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}")
+
+
+def parse_count(text):
+    """'100k' / '1.5M' / '8000' -> token 数（十进制单位）"""
+    units = {'K': 1000, 'M': 1000 ** 2}
+    text = text.strip().upper()
+    try:
+        if text and text[-1] in units:
+            return int(float(text[:-1]) * units[text[-1]])
+        return int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid token count: {text!r}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='code_copier', description='Code Context Extractor for AI')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_extract = sub.add_parser('extract', help='Extract files as Markdown without starting the GUI')
+    p_extract.add_argument('root', help='Project root directory, or a .zip / .tar[.gz|.bz2|.xz] archive '
+                                           'read in place without unpacking')
+    p_extract.add_argument('paths', nargs='*',
+                           help='Files or folders relative to root (default: whole root). A file may end in '
+                                ':LINES to output only those lines, e.g. app.log:tail=200 or main.py:1-80,120-')
+    p_extract.add_argument('-o', '--output', help='Write to this file instead of stdout '
+                                                  '(with --split-*, a directory for the parts)')
+    p_extract.add_argument('-j', '--workers', type=int, default=None,
+                           help='Read/decode threads (default: $CODE_COPIER_WORKERS or CPU count + 4)')
+    p_extract.add_argument('-x', '--exclude', action='append', default=[], metavar='GLOB',
+                           help='Extra gitignore-style pattern to ignore (repeatable, "!" re-includes)')
+    p_extract.add_argument('--no-gitignore', action='store_true',
+                           help='Do not read .gitignore / .ignore files')
+    p_extract.add_argument('--max-size', type=parse_size, default=None, metavar='SIZE',
+                           help='Skip files larger than SIZE (e.g. 500K, 2M) without reading them')
+    p_extract.add_argument('--placeholder', action='store_true',
+                           help='Emit a one-line placeholder for files over --max-size instead of leaving them out')
+    p_extract.add_argument('--head', type=int, default=0, metavar='N',
+                           help='Only the first N lines of each file; omitted lines are marked in the output')
+    p_extract.add_argument('--tail', type=int, default=0, metavar='N',
+                           help='Only the last N lines of each file (with --head, both ends); large files are '
+                                'read from the end without reading the rest')
+    p_extract.add_argument('--no-cache', action='store_true',
+                           help='Do not use the persistent decoded-content cache')
+    p_extract.add_argument('--index', action='store_true',
+                           help='Resolve folders from the persistent project index; unchanged '
+                                'directories are not listed again (shared with the GUI)')
+    p_extract.add_argument('--deps', type=int, default=0, metavar='DEPTH',
+                           help='Also include local modules imported by the selected files (Python, JS/TS), '
+                                'following imports DEPTH levels deep; the import graph is cached')
+    p_extract.add_argument('--changed', nargs='?', const=DEFAULT_REF, default=None, metavar='REF',
+                           help='Only files changed against REF in the local git repository, including untracked '
+                                'files (default REF: HEAD, i.e. uncommitted changes; "main..." compares with '
+                                'the merge base). Limited to the given paths, if any')
+    p_extract.add_argument('--diff', action='store_true',
+                           help='Emit unified diffs against the --changed REF (or HEAD) instead of whole files; '
+                                'new files are emitted in full, unchanged files are skipped')
+    p_extract.add_argument('-U', '--context', type=int, default=DEFAULT_CONTEXT, metavar='LINES',
+                           help='Context lines around each change with --diff (default: %(default)s)')
+    p_extract.add_argument('--compact', action='store_true',
+                           help='Strip comments, trailing whitespace and blank-line runs from known languages')
+    p_extract.add_argument('--outline', action='store_true',
+                           help='Emit only signatures, docstrings and constants for supported languages')
+    p_extract.add_argument('--budget', type=parse_count, default=None, metavar='TOKENS',
+                           help='Only output files that fit in TOKENS estimated tokens (e.g. 100k)')
+    p_extract.add_argument('--prefer', choices=PREFERENCES, default=PREFER_SMALL,
+                           help='Which files to keep first when over budget, after explicitly listed '
+                                'files (default: %(default)s)')
+    p_extract.add_argument('--split-tokens', type=parse_count, default=None, metavar='TOKENS',
+                           help='Split the output at file boundaries into parts of at most TOKENS tokens')
+    p_extract.add_argument('--split-bytes', type=parse_size, default=None, metavar='SIZE',
+                           help='Split the output at file boundaries into parts of at most SIZE bytes')
+    p_extract.add_argument('--stats', action='store_true',
+                           help='Print per-stage timings, encodings, skipped and slowest files')
+    p_extract.add_argument('--trace', metavar='FILE',
+                           help='Write timings to FILE (Chrome trace by default, open in ui.perfetto.dev)')
+    p_extract.add_argument('--trace-format', choices=FORMATS, default=FORMAT_CHROME,
+                           help='Format of --trace: Chrome trace events or a JSON summary (default: %(default)s)')
+    p_extract.add_argument('--daemon', action='store_true',
+                           help='Send the request to a running "serve" daemon, which keeps indexes and caches '
+                                'warm; falls back to extracting in this process if none is running')
+
+    p_serve = sub.add_parser('serve', help='Run a local daemon that answers extract requests from editors '
+                                           'and scripts over HTTP on 127.0.0.1')
+    p_serve.add_argument('--port', type=int, default=0,
+                         help='Port to listen on (default: any free port; clients find it in daemon.json '
+                              'in the cache directory, together with the access token)')
+    p_serve.add_argument('--status', action='store_true', help='Print the status of the running daemon and exit')
+    p_serve.add_argument('--stop', action='store_true', help='Stop the running daemon')
+    parser.commands = sub.choices  # 子命令名 -> 子解析器，供 parse_args() 使用
+    return parser
+
+
+def parse_args(argv=None):
+    """
+    子命令的参数用 parse_intermixed_args 解析，路径可以写在选项之后（extract . --deps 2 src/main.py）。
+    argparse 的子命令不支持这种解析，所以先按名称取出子解析器，再由它解析其余参数。
+    """
+    parser = build_parser()
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in parser.commands:
+        args = parser.commands[argv[0]].parse_intermixed_args(argv[1:])
+        args.command = argv[0]
+        return args
+    return parser.parse_args(argv)  # -h、缺少或未知的子命令由顶层解析器报告
+
+
+def open_cache(args):
+    """打开持久化缓存；不可用时退化为无缓存运行"""
+    if args.no_cache:
+        return None
+    try:
+        return ContentCache()
+    except (OSError, sqlite3.Error) as e:
+        print(f"warning: cache disabled: {e}", file=sys.stderr)
+        return None
+
+
+def open_index(args, path_filter):
+    """打开项目索引；不可用时退化为直接遍历"""
+    if not args.index:
+        return None
+    try:
+        return ProjectIndex(args.root, path_filter)
+    except (OSError, sqlite3.Error) as e:
+        print(f"warning: project index disabled: {e}", file=sys.stderr)
+        return None
+
+
+def open_deps(args, path_filter):
+    """打开依赖图；不可用时不展开依赖"""
+    if args.deps <= 0:
+        return None
+    try:
+        return DepGraph(args.root, path_filter)
+    except (OSError, sqlite3.Error) as e:
+        print(f"warning: dependency graph disabled: {e}", file=sys.stderr)
+        return None
+
+
+def run_extract(args, log, out=None, cache=None, project=None):
+    """
+    执行一次提取，返回退出码；错误、警告和摘要逐行交给 log(line)。
+    out: 没有 -o 时的输出 sink，默认为标准输出；cache: 调用方打开和关闭的 ContentCache。
+    project: 守护进程保持打开的 daemon.Project，提供过滤规则、归档、项目索引和依赖图，用完不关闭；
+    没有时按 args 打开，结束时关闭。
+    """
+    try:
+        specs = [split_path_spec(arg) for arg in args.paths]
+    except ValueError as e:
+        log(f"error: {e}")
+        return 2
+    args.paths = [path for path, _ in specs]
+    if args.head < 0 or args.tail < 0:
+        log("error: --head and --tail need a non-negative line count")
+        return 2
+
+    archive = project.archive if project is not None else None
+    if is_archive(args.root):
+        if args.index or args.deps > 0 or args.changed is not None or args.diff:
+            log("error: --index, --deps, --changed and --diff need a directory, not an archive")
+            return 2
+        try:
+            archive = archive or open_archive(args.root, args.exclude, use_gitignore=not args.no_gitignore)
+        except (ArchiveError, OSError) as e:
+            log(f"error: {e}")
+            return 2
+    try:
+        selected = resolve_selection(args.root, args.paths, archive)
+    except FileNotFoundError as e:
+        log(f"error: no such file or directory: {e}")
+        return 2
+    excerpts = {}
+    for (path, excerpt), (full_path, item_type) in zip(specs, selected):
+        if excerpt is None:
+            continue
+        if item_type != TYPE_FILE:
+            log(f"error: line ranges apply to files only: {path}")
+            return 2
+        excerpts[full_path] = excerpt
+
+    if project is not None:
+        path_filter = project.filter_for(args.index)
+    else:
+        path_filter = archive or PathFilter(args.root, args.exclude, use_gitignore=not args.no_gitignore)
+    diff = None
+    if args.changed is not None or args.diff:
+        diff = GitDiff(args.root, args.changed or DEFAULT_REF, args.context, path_filter)
+        try:
+            if args.changed is not None:
+                selected = diff.selection(include_deleted=args.diff, within=selected if args.paths else None)
+            if args.diff:
+                diff.load()
+        except GitError as e:
+            log(f"error: {e}")
+            return 2
+
+    split = args.split_tokens is not None or args.split_bytes is not None
+    if split and not args.output:
+        log("error: --split-tokens/--split-bytes need -o DIRECTORY for the parts")
+        return 2
+
+    # 流式写出，内存占用不随选中内容增长
+    trace = Trace() if args.stats or args.trace else None
+    if split:
+        sink = PartSink(args.output, max_bytes=args.split_bytes, max_tokens=args.split_tokens)
+    else:
+        sink = FileSink(args.output) if args.output else out or stdout_sink()
+    with sink:
+        if project is not None:
+            index = project.project_index() if args.index else None
+            deps = project.dep_graph(path_filter) if args.deps > 0 else None
+        else:
+            index = open_index(args, path_filter)
+            deps = open_deps(args, path_filter)
+        extractor = Extractor(args.root, selected, workers=args.workers, cache=cache,
+                              path_filter=path_filter, max_file_size=args.max_size,
+                              token_budget=args.budget, prefer=args.prefer, compact=args.compact,
+                              outline=args.outline, trace=trace, project_index=index,
+                              dep_graph=deps, dep_depth=args.deps, diff=diff if args.diff else None,
+                              archive=archive, excerpt=Excerpt(args.head, args.tail), excerpts=excerpts,
+                              placeholder=args.placeholder)
+        count = extractor.write_to(sink)
+    if project is None:
+        for opened in (index, deps, archive):
+            if opened is not None:
+                opened.close()
+
+    summary = f"Extracted {count} files (~{format_tokens(extractor.total_tokens)} tokens)."
+    if deps is not None:
+        summary += f" {extractor.dep_files} added as dependencies."
+    if args.diff:
+        summary += f" {extractor.diffed} as diffs."
+    if args.outline:
+        summary += f" {extractor.outlined} as outlines."
+    if extractor.truncated:
+        summary += f" {len(extractor.truncated)} truncated."
+    if cache is not None:
+        summary += f" (cache: {cache.hits} hits, {cache.misses} misses)"
+    log(summary)
+    if split:
+        log(f"Wrote {len(sink.parts)} parts:")
+        for path, tokens in zip(sink.parts, sink.part_tokens):
+            log(f"  {path} (~{format_tokens(tokens)} tokens)")
+    if args.compact:
+        log(f"Compaction saved {extractor.saved_bytes} bytes (~{format_tokens(extractor.saved_tokens)} tokens).")
+
+    # 预算模式下文件会被解码两次（估算和输出），去掉重复的记录
+    too_large = list(dict.fromkeys(path for path, status in extractor.skipped if status == SKIP_TOO_LARGE))
+    if too_large:
+        what = "Replaced with placeholders" if args.placeholder else "Skipped"
+        log(f"{what} {len(too_large)} files larger than {args.max_size} bytes:")
+        for path in too_large:
+            log(f"  {path}")
+
+    if extractor.dropped:
+        dropped_tokens = sum(tokens for _, tokens in extractor.dropped)
+        log(f"Dropped {len(extractor.dropped)} files (~{format_tokens(dropped_tokens)} tokens) "
+            f"to fit the budget of {args.budget} tokens:")
+        for path, tokens in extractor.dropped:
+            log(f"  {path} (~{format_tokens(tokens)})")
+
+    if args.stats:
+        for line in trace.summary_lines(lambda path: os.path.relpath(path, args.root)):
+            log(line)
+    if args.trace:
+        try:
+            trace.save(args.trace, args.trace_format)
+        except OSError as e:
+            log(f"error: cannot write trace: {e}")
+            return 1
+    return 0
+
+
+def cmd_extract(args):
+    if args.daemon:
+        from .daemon import request_extract
+        out = stdout_sink()
+        with out:
+            code = request_extract(args, out.write, lambda line: print(line, file=sys.stderr))
+        if code is not None:
+            return code
+        print("warning: no daemon is running; extracting in this process", file=sys.stderr)
+    cache = open_cache(args)
+    try:
+        return run_extract(args, lambda line: print(line, file=sys.stderr), cache=cache)
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def cmd_serve(args):
+    # 守护进程需要 cli 中的 run_extract，在这里才导入，避免循环导入
+    from .daemon import request, serve
+    if args.status or args.stop:
+        state = request('POST', '/shutdown') if args.stop else request('GET', '/status')
+        if state is None:
+            print("error: no daemon is running", file=sys.stderr)
+            return 1
+        if args.status:
+            print(json.dumps(state, indent=2))
+        return 0
+    return serve(args.port)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'extract':
+        return cmd_extract(args)
+    if args.command == 'serve':
+        return cmd_serve(args)
+    return 1
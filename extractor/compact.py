@@ -0,0 +1,194 @@
+"""
+按语言去掉注释、行尾空白和多余空行，缩小输出体积。
+
+每种语言只描述字符串和注释的写法，编译成一个单遍扫描的正则：
+字符串总是最先匹配并原样保留，所以字符串里的 "//"、"#" 不会被误删，
+多行字符串里的空白和空行也不受影响。未知类型的文件原样输出。
+"""
+import os
+import re
+
+# 常用的字符串写法
+_DQ = r'"[^"\\\n]*(?:\\[\s\S][^"\\\n]*)*"'
+_SQ = r"'[^'\\\n]*(?:\\[\s\S][^'\\\n]*)*'"
+_CHAR = r"'(?:\\[\s\S][^'\n]{0,8}|[^'\\\n])'"  # 字符字面量，不会把 Rust 的 'a 生命周期当成字符串
+_TRIPLE_DQ = r'"""[^"\\]*(?:(?:\\[\s\S]|"(?!""))[^"\\]*)*"""'
+_TRIPLE_SQ = r"'''[^'\\]*(?:(?:\\[\s\S]|'(?!''))[^'\\]*)*'''"
+_BACKTICK = r'`[^`\\]*(?:\\[\s\S][^`\\]*)*`'
+_RAW_BACKTICK = r'`[^`]*`'
+_SQL_SQ = r"'(?:[^']|'')*'"
+# JS 正则字面量：只有出现在运算符、括号或 return 之后时才是正则，否则是除号（见 Lexer.compact）
+_JS_REGEX = r'/(?![*/])(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/[a-z]*'
+_REGEX_PREFIX = set('(,=:[!&|?{};\n')
+
+_C_BLOCK = ('/*', '*/')
+
+
+class Lexer:
+    """
+    一种语言的字符串和注释规则，编译成一个单遍扫描的正则。
+
+    strings: 字符串字面量的正则列表，按优先级排列，每个都必须以固定字符开头
+    line: 行注释的开头，如 '//'、'#'
+    line_except: 不当作注释的行注释（正则前瞻），用来保留 //go:build 之类的指令
+    block: (开始, 结束) 块注释的定界符
+    regex_literals: 是否识别 JS 的 /.../ 正则字面量
+    space_before_line: 行注释前必须是空白（shell 的 $#、${#var} 不是注释）
+    collapse: 是否合并连续空行（标记语言里可能有 <pre>，不合并）
+    """
+
+    def __init__(self, strings=(), line=None, line_except=None, block=None, regex_literals=False,
+                 space_before_line=False, collapse=True):
+        self.line = line
+        self.block = block
+        self.comment_starts = tuple(c for c in (line, block and block[0]) if c)
+        self.regex_literals = regex_literals
+        self.space_before_line = space_before_line
+        self.collapse = collapse
+
+        comments = []
+        if line:
+            start = keep = ''
+            if line_except:
+                # 不从注释开头的中间开始匹配：否则 /// <reference> 会从第二个 / 起被当成注释，前瞻形同虚设
+                start = f'(?<!{re.escape(line[0])})'
+                keep = f'(?!{line_except})'
+            comments.append(rf'{start}{re.escape(line)}{keep}[^\n]*')
+        if block:
+            comments.append(rf'{re.escape(block[0])}[\s\S]*?{re.escape(block[1])}')
+        comment = '|'.join(comments)
+
+        # 所有分支都以固定字符开头，正则引擎可以按首字符快速跳过普通代码；
+        # 行尾空白不在正则里处理（会在每段空白上回溯），见 compact()
+        parts = list(strings)
+        if regex_literals:
+            parts.append(_JS_REGEX)
+        if collapse:
+            # 换行之后连续的空行和只有注释的行：有空行时保留一个空行，否则整段删除
+            parts.append(rf'\n(?:[ \t]*(?:{comment})?[ \t]*\n)+' if comment else r'\n(?:[ \t]*\n)+')
+        parts.extend(comments)
+        # 第一次使用时才编译：导入时编译所有语言的正则会拖慢启动
+        self.source = '|'.join(parts)
+        self._pattern = None
+
+    @property
+    def pattern(self):
+        if self._pattern is None:
+            self._pattern = re.compile(self.source)
+        return self._pattern
+
+    def compact(self, text):
+        # 保留 #! 行；前面补一个换行，让文件开头的注释和空行也走空行分支
+        shebang = ''
+        if text.startswith('#!'):
+            shebang, _, text = text.partition('\n')
+            shebang += '\n'
+        text = '\n' + text
+
+        # 跨行的字符串先换成 \0序号\0 占位，剩下的文本可以放心地逐行去掉行尾空白
+        multiline = [] if '\0' not in text else None
+        out = []
+        pos = 0
+        search = self.pattern.search
+        while True:
+            m = search(text, pos)
+            if m is None:
+                out.append(text[pos:])
+                break
+            start, end = m.span()
+            out.append(text[pos:start])
+            pos = end
+            token = m.group()
+
+            if token[0] == '\n':
+                lines = token.split('\n')
+                out.append('\n\n' if any(not line.strip() for line in lines[1:-1]) else '\n')
+            elif token.startswith(self.comment_starts):
+                if self.space_before_line and token.startswith(self.line) and not text[start - 1].isspace():
+                    out.append(token[0])
+                    pos = start + 1
+                elif self.block and token.startswith(self.block[0]) and start and end < len(text) \
+                        and not text[start - 1].isspace() and not text[end].isspace():
+                    # 代码中间的块注释换成一个空格，避免 a/**/b 变成 ab
+                    out.append(' ')
+            elif token[0] == '/' and self.regex_literals and not _regex_allowed(text, start):
+                out.append('/')
+                pos = start + 1
+            elif multiline is not None and '\n' in token:
+                multiline.append(token)
+                out.append(f'\0{len(multiline) - 1}\0')
+            else:
+                out.append(token)
+
+        text = ''.join(out)
+        if multiline is not None:
+            text = '\n'.join([line.rstrip(' \t') for line in text.split('\n')])
+            if multiline:
+                text = _PLACEHOLDER.sub(lambda m: multiline[int(m.group(1))], text)
+        text = text.strip('\n') if self.collapse else text[1:]
+        return shebang + text
+
+
+_PLACEHOLDER = re.compile(r'\0(\d+)\0')
+
+
+def _regex_allowed(text, pos):
+    """pos 处的 / 是否可能是正则字面量的开头：看前一个非空白字符"""
+    i = pos - 1
+    while i >= 0 and text[i] in ' \t':
+        i -= 1
+    if i < 0 or text[i] in _REGEX_PREFIX:
+        return True
+    return text.endswith('return', 0, i + 1) and (i < 6 or not (text[i - 6].isalnum() or text[i - 6] in '_$'))
+
+
+_PYTHON = Lexer([_TRIPLE_DQ, _TRIPLE_SQ, _DQ, _SQ], line='#')
+_C = Lexer([_DQ, _CHAR], line='//', block=_C_BLOCK)
+_CSHARP = Lexer([r'@"(?:[^"]|"")*"', _DQ, _CHAR], line='//', block=_C_BLOCK)
+_JVM = Lexer([_TRIPLE_DQ, _DQ, _CHAR], line='//', block=_C_BLOCK)  # Java 文本块、Kotlin/Scala 原始字符串
+_GO = Lexer([_RAW_BACKTICK, _DQ, _CHAR], line='//', line_except=r'go:|line |export |extern |\s*\+build',
+            block=_C_BLOCK)
+_JS = Lexer([_BACKTICK, _DQ, _SQ], line='//', block=_C_BLOCK, regex_literals=True)
+_TS = Lexer([_BACKTICK, _DQ, _SQ], line='//', line_except=r'/\s*<', block=_C_BLOCK,  # 保留 /// <reference>
+            regex_literals=True)
+_DART = Lexer([_TRIPLE_DQ, _TRIPLE_SQ, _DQ, _SQ], line='//', block=_C_BLOCK)
+_SCSS = Lexer([_DQ, _SQ], line='//', block=_C_BLOCK)
+_CSS = Lexer([_DQ, _SQ], block=_C_BLOCK)  # CSS 没有行注释，url(http://...) 必须保留
+_SQL = Lexer([_SQL_SQ, _DQ], line='--', block=_C_BLOCK)
+_LUA = Lexer([r'\[\[[\s\S]*?\]\]', _DQ, _SQ], line='--', line_except=r'\[\[', block=('--[[', ']]'))
+_SHELL = Lexer([_DQ, r"'[^']*'"], line='#', space_before_line=True)
+_HASH_LANG = Lexer([_TRIPLE_DQ, _TRIPLE_SQ, _DQ, _SQ], line='#', space_before_line=True)
+_MARKUP = Lexer(block=('<!--', '-->'), collapse=False)
+
+LEXERS = {
+    'python': (_PYTHON, ('.py', '.pyi', '.pyw')),
+    'c': (_C, ('.c', '.h', '.cc', '.cpp', '.cxx', '.hpp', '.hh', '.hxx', '.m', '.mm', '.rs', '.swift')),
+    'csharp': (_CSHARP, ('.cs',)),
+    'jvm': (_JVM, ('.java', '.kt', '.kts', '.scala', '.groovy', '.gradle')),
+    'go': (_GO, ('.go',)),
+    'javascript': (_JS, ('.js', '.jsx', '.mjs', '.cjs')),
+    'typescript': (_TS, ('.ts', '.tsx', '.mts', '.cts')),
+    'dart': (_DART, ('.dart',)),
+    'scss': (_SCSS, ('.scss', '.less')),
+    'css': (_CSS, ('.css',)),
+    'sql': (_SQL, ('.sql',)),
+    'lua': (_LUA, ('.lua',)),
+    'shell': (_SHELL, ('.sh', '.bash', '.zsh')),
+    'hash': (_HASH_LANG, ('.rb', '.r', '.toml', '.cmake')),
+    'markup': (_MARKUP, ('.html', '.htm', '.xml', '.svg', '.vue', '.svelte')),
+}
+
+_BY_EXT = {ext: lexer for lexer, exts in LEXERS.values() for ext in exts}
+
+
+def lexer_for(path):
+    """按扩展名返回 Lexer，不支持的类型返回 None"""
+    return _BY_EXT.get(os.path.splitext(path)[1].lower())
+
+
+def compact_text(path, text):
+    """去掉 text 中的注释和多余空白；path 只用来判断语言，不支持的类型原样返回"""
+    lexer = lexer_for(path)
+    if lexer is None:
+        return text
+    return lexer.compact(text)
@@ -0,0 +1,420 @@
+"""
+常驻的本地服务（code_copier serve）：项目的过滤规则、项目索引、依赖图和内容缓存保持打开，
+编辑器插件和脚本通过本机 HTTP 发送提取请求，结果流式返回；省去每次启动进程、导入模块、
+打开数据库和重新遍历目录的开销，重复的请求通常在 100ms 以内完成。
+
+只监听 127.0.0.1。启动时生成随机令牌，连同端口写入缓存目录中的 daemon.json（只有当前用户可读），
+请求必须带 Authorization: Bearer <令牌>；Host 头必须是本机地址，网页无法通过 DNS 重绑定访问。
+
+  GET  /status    运行时间、保持打开的项目和缓存统计（JSON）
+  POST /extract   请求体 {"args": {...}}，键与 extract 子命令的选项同名（dest），root 等路径为绝对路径；
+                  响应为 NDJSON：若干 {"text": ...}，最后一行为
+                  {"done": true, "exit": 退出码, "log": [与命令行相同的提示和摘要]}
+  POST /shutdown  停止服务
+"""
+import hmac
+import http.client
+import http.server
+import json
+import os
+import secrets
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from .archive import ArchiveError, is_archive, open_archive
+from .cache import ContentCache, cache_dir
+from .cli import build_parser, run_extract
+from .deps import DepGraph
+from .filters import PathFilter
+from .project_index import ProjectIndex
+from .sinks import Sink
+
+HOST = '127.0.0.1'
+# 同时保持打开的项目数，超出时关闭最久未用的
+MAX_PROJECTS = 8
+# 客户端连接守护进程的超时（秒）；连不上时退回到本进程提取
+CONNECT_TIMEOUT = 1.0
+
+
+def state_path():
+    return os.path.join(cache_dir(), 'daemon.json')
+
+
+def read_state():
+    """正在运行的守护进程的 {"port", "token", "pid"}；没有时返回 None"""
+    try:
+        with open(state_path(), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_state(state):
+    """只有当前用户可读；先写临时文件再替换，客户端不会读到写了一半的文件"""
+    path = state_path()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+class NdjsonSink(Sink):
+    """把输出攒成较大的块，每块写成一行 {"text": ...}"""
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, send):
+        self.send = send
+        self._parts = []
+        self._size = 0
+
+    def write(self, chunk):
+        self._parts.append(chunk)
+        self._size += len(chunk)
+        if self._size >= self.CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self._parts:
+            self.send({'text': ''.join(self._parts)})
+            self._parts = []
+            self._size = 0
+
+    def close(self):
+        self.flush()
+
+
+class Project:
+    """
+    一个根目录（连同过滤设置）保持打开的资源：归档的成员列表、项目索引和依赖图，都在第一次用到时打开。
+    与命令行相同，只有请求带 --index 时才用项目索引展开文件夹（输出顺序与直接遍历不同）。
+    """
+
+    def __init__(self, root, exclude, use_gitignore):
+        self.root = root
+        self.exclude = exclude
+        self.use_gitignore = use_gitignore
+        self.archive = None
+        self.index = None
+        self.deps = None
+        self.used = time.time()
+        if is_archive(root):
+            self.archive = open_archive(root, exclude, use_gitignore)
+        # 项目索引发现规则文件变化时会让它重新读取，所以可以一直保留
+        self.path_filter = self.archive or PathFilter(root, exclude, use_gitignore)
+
+    def stale(self):
+        """归档被替换后要重新读取成员列表"""
+        if self.archive is None:
+            return False
+        try:
+            return os.stat(self.root).st_mtime_ns != self.archive.mtime_ns
+        except OSError:
+            return True
+
+    def filter_for(self, use_index):
+        """不用项目索引时规则文件的变化无从得知，每次新建 PathFilter（规则文件在遍历时按需读取）"""
+        if self.archive is not None or use_index and self.project_index() is not None:
+            return self.path_filter
+        return PathFilter(self.root, self.exclude, self.use_gitignore)
+
+    def project_index(self):
+        if self.index is None and self.archive is None:
+            try:
+                self.index = ProjectIndex(self.root, self.path_filter)
+            except (OSError, sqlite3.Error) as e:
+                print(f"warning: project index disabled for {self.root}: {e}", file=sys.stderr)
+        return self.index
+
+    def dep_graph(self, path_filter):
+        """保持打开的依赖图；每次请求都重新遍历，只解析变化过的文件"""
+        if self.deps is None:
+            try:
+                self.deps = DepGraph(self.root, path_filter)
+            except (OSError, sqlite3.Error) as e:
+                print(f"warning: dependency graph disabled for {self.root}: {e}", file=sys.stderr)
+                return None
+        self.deps.set_filter(path_filter)
+        return self.deps
+
+    def close(self):
+        for opened in (self.index, self.deps, self.archive):
+            if opened is not None:
+                opened.close()
+
+
+class Daemon:
+    def __init__(self, port=0):
+        try:
+            self.cache = ContentCache()
+        except (OSError, sqlite3.Error) as e:
+            print(f"warning: cache disabled: {e}", file=sys.stderr)
+            self.cache = None
+        self.projects = OrderedDict()  # (root, exclude, use_gitignore) -> Project，最近使用的在后
+        self.token = secrets.token_urlsafe(32)
+        self.started = time.time()
+        self.requests = 0
+        # 提取请求逐个处理：共用缓存的命中计数和项目索引的事务；单个提取内部仍是多线程
+        self._lock = threading.Lock()
+        self.server = http.server.ThreadingHTTPServer((HOST, port), Handler)
+        self.server.daemon_threads = True
+        self.server.owner = self
+        self.port = self.server.server_address[1]
+
+    def project(self, args):
+        """args 对应的 Project，不存在或已过时时打开；归档无法读取时返回 None，由 run_extract 报告错误"""
+        root = os.path.abspath(args.root)
+        key = (root, tuple(args.exclude), not args.no_gitignore)
+        project = self.projects.pop(key, None)
+        if project is not None and project.stale():
+            project.close()
+            project = None
+        if project is None:
+            try:
+                project = Project(root, list(args.exclude), not args.no_gitignore)
+            except (ArchiveError, OSError):
+                return None
+        project.used = time.time()
+        self.projects[key] = project
+        while len(self.projects) > MAX_PROJECTS:
+            self.projects.popitem(last=False)[1].close()
+        return project
+
+    def parse_args(self, fields):
+        """请求中的选项覆盖 extract 的默认值；未知的键忽略，旧的客户端也能使用"""
+        if not isinstance(fields, dict) or not isinstance(fields.get('root'), str):
+            raise ValueError("request needs {\"args\": {\"root\": ...}}")
+        args = build_parser().parse_args(['extract', fields['root']])
+        for name, value in fields.items():
+            if name not in ('command', 'daemon') and hasattr(args, name):
+                setattr(args, name, value)
+        if not os.path.isabs(args.root):
+            raise ValueError("root must be an absolute path")
+        return args
+
+    def extract(self, args, send):
+        """执行一次提取，输出通过 send(record) 逐块发送，返回最后一行记录"""
+        lines = []
+        with self._lock:
+            self.requests += 1
+            start = time.perf_counter()
+            project = self.project(args)
+            cache = None if args.no_cache else self.cache
+            if cache is not None:
+                cache.reset_counters()
+            with NdjsonSink(send) as sink:
+                code = run_extract(args, lines.append, out=sink, cache=cache, project=project)
+        print(f"extract {args.root} -> exit {code} in {(time.perf_counter() - start) * 1000:.0f} ms",
+              file=sys.stderr)
+        return {'done': True, 'exit': code, 'log': lines}
+
+    def status(self):
+        return {
+            'pid': os.getpid(),
+            'port': self.port,
+            'uptime': round(time.time() - self.started, 1),
+            'requests': self.requests,
+            'projects': [project.root for project in reversed(self.projects.values())],
+            'cache': self.cache.stats() if self.cache is not None else None,
+        }
+
+    def serve_forever(self):
+        _write_state({'pid': os.getpid(), 'port': self.port, 'token': self.token})
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if (read_state() or {}).get('token') == self.token:
+                try:
+                    os.remove(state_path())
+                except OSError:
+                    pass
+            with self._lock:
+                for project in self.projects.values():
+                    project.close()
+                self.projects.clear()
+                if self.cache is not None:
+                    self.cache.close()
+
+    def shutdown(self):
+        # serve_forever() 所在的线程之外调用，否则会一直等待自己
+        threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'code_copier'
+
+    def log_message(self, format, *args):
+        pass  # 每个提取请求由 Daemon.extract 记录一行
+
+    def _authorized(self):
+        owner = self.server.owner
+        host = (self.headers.get('Host') or '').rsplit(':', 1)[0]
+        if host not in (HOST, 'localhost'):
+            self._send_json(403, {'error': 'forbidden host'})
+            return False
+        expected = f"Bearer {owner.token}".encode()
+        if not hmac.compare_digest((self.headers.get('Authorization') or '').encode(), expected):
+            self._send_json(401, {'error': 'missing or wrong token'})
+            return False
+        return True
+
+    def _send_json(self, code, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, record):
+        data = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if self.path == '/status':
+            self._send_json(200, self.server.owner.status())
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        try:
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        except (OSError, ValueError):
+            return
+        if self.path == '/shutdown':
+            self._send_json(200, {'ok': True})
+            self.server.owner.shutdown()
+            return
+        if self.path != '/extract':
+            self._send_json(404, {'error': 'not found'})
+            return
+        try:
+            fields = json.loads(body or b'{}').get('args')
+            args = self.server.owner.parse_args(fields)
+        except (ValueError, AttributeError, SystemExit) as e:
+            self._send_json(400, {'error': str(e) or 'invalid arguments'})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            try:
+                record = self.server.owner.extract(args, self._send_chunk)
+            except (ConnectionError, socket.timeout):
+                raise
+            except Exception as e:
+                record = {'done': True, 'exit': 1, 'error': f"{type(e).__name__}: {e}", 'log': []}
+            self._send_chunk(record)
+            self.wfile.write(b'0\r\n\r\n')
+        except (ConnectionError, socket.timeout):
+            # 客户端中途断开：写出失败时提取随之停止
+            self.close_connection = True
+            print(f"extract {args.root} -> client disconnected", file=sys.stderr)
+
+
+def serve(port=0):
+    """在前台运行守护进程，直到收到 /shutdown 或 Ctrl+C；返回退出码"""
+    state = read_state()
+    if state is not None and request('GET', '/status', state=state) is not None:
+        print(f"error: a daemon is already running on port {state['port']} (pid {state.get('pid')})",
+              file=sys.stderr)
+        return 2
+    try:
+        daemon = Daemon(port)
+    except OSError as e:
+        print(f"error: cannot listen on {HOST}:{port}: {e}", file=sys.stderr)
+        return 2
+    print(f"Serving on http://{HOST}:{daemon.port} (pid {os.getpid()}); token in {state_path()}",
+          file=sys.stderr)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _connect(state):
+    return http.client.HTTPConnection(HOST, state['port'], timeout=CONNECT_TIMEOUT)
+
+
+def _headers(state):
+    return {'Authorization': f"Bearer {state['token']}", 'Content-Type': 'application/json'}
+
+
+def request(method, path, body=None, state=None):
+    """向守护进程发送一个返回 JSON 的请求；没有运行时返回 None"""
+    state = state or read_state()
+    if state is None:
+        return None
+    conn = _connect(state)
+    try:
+        conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=_headers(state))
+        response = conn.getresponse()
+        data = json.loads(response.read() or b'{}')
+    except (OSError, ValueError, http.client.HTTPException):
+        return None
+    finally:
+        conn.close()
+    return data if response.status == 200 else None
+
+
+def request_extract(args, write, log):
+    """
+    把 extract 的 args 交给守护进程执行，输出文本交给 write，提示和摘要逐行交给 log。
+    返回退出码；没有守护进程或在开始输出之前连接失败时返回 None，由调用方在本进程提取。
+    """
+    state = read_state()
+    if state is None:
+        return None
+    fields = dict(vars(args))
+    # 守护进程的工作目录与客户端不同
+    fields['root'] = os.path.abspath(args.root)
+    for name in ('output', 'trace'):
+        if fields.get(name):
+            fields[name] = os.path.abspath(fields[name])
+    conn = _connect(state)
+    try:
+        conn.request('POST', '/extract', body=json.dumps({'args': fields}), headers=_headers(state))
+        response = conn.getresponse()
+    except (OSError, http.client.HTTPException):
+        conn.close()
+        return None
+    try:
+        if response.status != 200:
+            try:
+                error = json.loads(response.read()).get('error')
+            except (OSError, ValueError, AttributeError, http.client.HTTPException):
+                error = None
+            log(f"error: daemon refused the request: {error or response.status}")
+            return 2
+        conn.sock.settimeout(None)  # 大的提取可能要运行很久
+        record = None
+        for line in response:
+            record = json.loads(line)
+            if 'text' in record:
+                write(record['text'])
+        if record is None or not record.get('done'):
+            log("error: the daemon closed the connection before finishing")
+            return 1
+        for line in record.get('log', []):
+            log(line)
+        if record.get('error'):
+            log(f"error: {record['error']}")
+        return record.get('exit', 1)
+    except (OSError, ValueError, http.client.HTTPException) as e:
+        log(f"error: lost the connection to the daemon: {e}")
+        return 1
+    finally:
+        conn.close()
@@ -0,0 +1,346 @@
+"""
+项目内的依赖图：解析每个源文件引用的本地模块，用于把选中文件的依赖一并加入输出。
+
+Python 先用正则找出 import / from ... import 语句（包括相对导入和函数体内的导入），只把这些语句交给 ast 解析；
+文档字符串中形似 import 的行也会被当作导入，多出的依赖比漏掉的好。JS/TS 用正则取 import / export ... from /
+require() / import() 的说明符，其中只解析以 . 开头的相对路径（包名指向 node_modules，不属于项目）。
+每个文件解析出的引用按 (size, mtime_ns) 保存在 SQLite 中，文件未变化时不再解析；
+引用到文件的解析在内存中进行，依赖项目的文件列表，所以新增的文件也能被正确解析。
+"""
+import ast
+import json
+import os
+import posixpath
+import re
+import sqlite3
+import threading
+import warnings
+from collections import deque
+
+from .cache import LOCK_TIMEOUT, cache_dir
+from .engine import decode_file
+from .filters import PathFilter
+
+PY_EXTS = ('.py', '.pyi')
+JS_EXTS = ('.ts', '.tsx', '.js', '.jsx', '.mjs', '.cjs', '.mts', '.cts')
+
+# 超过这个大小的文件不解析（多为生成的代码）
+MAX_PARSE_SIZE = 1024 * 1024
+
+# 行首的 import 语句；整个文件建语法树要慢一个数量级以上
+_PY_IMPORT = re.compile(r'^[ \t]*(from[ \t]+[\w.]+[ \t]+import[ \t]*(?:\([^)]*\)|(?:\\\n|[^\n])*)'
+                        r'|import[ \t]+(?:\\\n|[^\n])*)', re.M)
+_JS_IMPORT = re.compile(
+    r'''(?:\bimport\s*(?:type\s+)?(?:[\w$*{}\s,]+?\s*from\s*)?|\bexport\s*(?:type\s+)?[\w$*{}\s,]*?\s*from\s*'''
+    r'''|\brequire\s*\(\s*|\bimport\s*\(\s*)(['"])([^'"\n]+)\1''')
+# TypeScript 的 ESM 代码中写的是编译后的后缀：./foo.js 实际指向 ./foo.ts
+_JS_OUTPUT_EXTS = {'.js': ('.ts', '.tsx'), '.jsx': ('.tsx',), '.mjs': ('.mts',), '.cjs': ('.cts',)}
+
+
+def deps_path():
+    return os.path.join(cache_dir(), 'deps.sqlite')
+
+
+def _parse_statements(statements):
+    """解析 import 语句；整体解析失败时逐条解析，跳过无法解析的（如字符串中形似 import 的行）"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # 无效转义序列等
+        try:
+            return ast.parse('\n'.join(statements)).body
+        except (SyntaxError, ValueError):
+            pass
+        nodes = []
+        for statement in statements:
+            try:
+                nodes.extend(ast.parse(statement).body)
+            except (SyntaxError, ValueError):
+                pass
+        return nodes
+
+
+def parse_python(text):
+    """import 语句的列表 [(level, module, names)]，包括函数体内的 import"""
+    refs = []
+    for node in _parse_statements([m.group(1).rstrip() for m in _PY_IMPORT.finditer(text)]):
+        if isinstance(node, ast.Import):
+            refs.extend((0, alias.name, []) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            refs.append((node.level, node.module or '', [alias.name for alias in node.names if alias.name != '*']))
+    return refs
+
+
+def parse_js(text):
+    """相对路径的模块说明符列表，保持出现顺序并去重"""
+    specs = []
+    for match in _JS_IMPORT.finditer(text):
+        spec = match.group(2)
+        if spec.startswith('.') and spec not in specs:
+            specs.append(spec)
+    return specs
+
+
+def parse_file(file_path):
+    """解析单个文件的引用；不支持的语言、二进制或过大的文件返回 None"""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext not in PY_EXTS and ext not in JS_EXTS:
+        return None
+    text = decode_file(file_path, MAX_PARSE_SIZE)
+    if text is None:
+        return None
+    return parse_python(text) if ext in PY_EXTS else parse_js(text)
+
+
+class DepGraph:
+    """
+    一个项目的依赖图。build() 遍历项目并解析变化过的文件（通常在后台线程中），
+    dependencies() 在提取时展开选中文件的依赖，访问到的文件逐个核对，变化过的重新解析。
+
+    线程安全：后台构建和提取线程可以共用一个实例。
+    """
+
+    def __init__(self, root, path_filter=None, path=None):
+        self.root = os.path.abspath(root)
+        self.path_filter = path_filter or PathFilter(self.root)
+        self.path = path or deps_path()
+        self.ready = False
+        self.parsed = 0
+        self.files = set()      # 项目中的文件（相对路径）
+        self._refs = {}         # 相对路径 -> (size, mtime_ns, refs)，refs 为 None 表示无法读取（二进制或过大）
+        self._py_roots = ['']   # 顶层包所在的目录
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self._conn = None
+        self._db()
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=LOCK_TIMEOUT, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS refs ('
+                ' root TEXT, path TEXT, size INTEGER, mtime_ns INTEGER, refs TEXT,'
+                ' PRIMARY KEY (root, path))')
+            self._conn.commit()
+        return self._conn
+
+    def invalidate(self, *args):
+        """文件系统变化后调用：下次 ensure() 时重新遍历（只解析变化过的文件）"""
+        self.ready = False
+
+    def set_filter(self, path_filter):
+        self.path_filter = path_filter
+        self.ready = False
+
+    def ensure(self, walk=None, should_stop=None):
+        """还没建好或已失效时构建；后台构建正在进行时等它结束"""
+        with self._build_lock:
+            if not self.ready:
+                self._build(walk, should_stop)
+
+    def build(self, walk=None, should_stop=None):
+        """
+        遍历项目，文件的 (size, mtime_ns) 与保存的不同时重新解析，删除已不存在的文件的记录。
+        walk 为 PathFilter.walk / ProjectIndex.walk 这类迭代器，默认用 path_filter 遍历整个项目。
+        should_stop() 返回 True 时放弃，图保持原状。
+        """
+        with self._build_lock:
+            self._build(walk, should_stop)
+
+    def _build(self, walk, should_stop):
+        if walk is None:
+            walk = self.path_filter.walk(self.root)
+        with self._lock:
+            conn = self._db()
+            stored = {path: (size, mtime_ns, refs) for path, size, mtime_ns, refs in conn.execute(
+                'SELECT path, size, mtime_ns, refs FROM refs WHERE root = ?', (self.root,))}
+
+        files = set()
+        refs = {}
+        changed = []
+        for dir_path, _, names in walk:
+            if should_stop is not None and should_stop():
+                return
+            rel_dir = self.path_filter.relpath(dir_path)
+            if rel_dir is None:
+                continue
+            prefix = rel_dir + '/' if rel_dir else ''
+            for name in names:
+                rel = prefix + name
+                files.add(rel)
+                ext = os.path.splitext(name)[1].lower()
+                if ext not in PY_EXTS and ext not in JS_EXTS:
+                    continue
+                try:
+                    st = os.stat(os.path.join(dir_path, name))
+                except OSError:
+                    continue
+                row = stored.get(rel)
+                if row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+                    refs[rel] = (row[0], row[1], json.loads(row[2]) if row[2] is not None else None)
+                else:
+                    found = parse_file(os.path.join(dir_path, name))
+                    refs[rel] = (st.st_size, st.st_mtime_ns, found)
+                    changed.append(rel)
+
+        with self._lock:
+            self._write([('DELETE FROM refs WHERE root = ? AND path = ?',
+                          [(self.root, path) for path in stored if path not in refs]),
+                         ('INSERT OR REPLACE INTO refs VALUES (?, ?, ?, ?, ?)',
+                          [(self.root, rel, *self._row(refs[rel])) for rel in changed])])
+            self.files = files
+            self._refs = refs
+            self._py_roots = self._find_py_roots(files)
+            self.parsed = len(changed)
+            self.ready = True
+
+    def _write(self, statements):
+        """
+        在一个事务中执行 [(sql, 参数行列表)] 并立即提交，不留着事务占住 deps.sqlite 的写锁（调用方持有 _lock）。
+        数据库被其它进程锁住时回滚放弃：内存中的图照常使用，只是下次还要重新解析这些文件。
+        """
+        conn = self._db()
+        try:
+            for sql, rows in statements:
+                conn.executemany(sql, rows)
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+
+    @staticmethod
+    def _row(entry):
+        size, mtime_ns, found = entry
+        return size, mtime_ns, json.dumps(found, ensure_ascii=False) if found is not None else None
+
+    @staticmethod
+    def _find_py_roots(files):
+        """顶层包（其上一级目录没有 __init__.py）的父目录，按路径长度排序；项目根目录总在其中"""
+        roots = {''}
+        for rel in files:
+            if rel.endswith('__init__.py') and posixpath.basename(rel) == '__init__.py':
+                package = posixpath.dirname(rel)
+                parent = posixpath.dirname(package)
+                if package and posixpath.join(parent, '__init__.py') not in files:
+                    roots.add(parent)
+        return sorted(roots, key=len)
+
+    def refs(self, rel):
+        """rel 的引用，文件变化过时重新解析并写回；不是源文件时返回 None"""
+        ext = os.path.splitext(rel)[1].lower()
+        if ext not in PY_EXTS and ext not in JS_EXTS:
+            return None
+        with self._lock:
+            entry = self._refs.get(rel)
+        file_path = os.path.join(self.root, *rel.split('/'))
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return None
+        if entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry[2]
+        entry = (st.st_size, st.st_mtime_ns, parse_file(file_path))
+        with self._lock:
+            self._refs[rel] = entry
+            self._write([('INSERT OR REPLACE INTO refs VALUES (?, ?, ?, ?, ?)', [(self.root, rel, *self._row(entry))])])
+            self.parsed += 1
+        return entry[2]
+
+    # --- 解析引用 ---
+
+    def _module_file(self, base, module):
+        """base 目录下的模块 a.b -> a/b.py 或 a/b/__init__.py"""
+        path = posixpath.join(base, *module.split('.')) if module else base
+        for candidate in (path + '.py', path + '.pyi', posixpath.join(path, '__init__.py')):
+            candidate = candidate.lstrip('/')
+            if candidate in self.files:
+                return candidate
+        return None
+
+    def resolve_python(self, rel, refs):
+        found = []
+        own_dir = posixpath.dirname(rel)
+        for level, module, names in refs:
+            if level:
+                base = own_dir
+                for _ in range(level - 1):
+                    base = posixpath.dirname(base)
+                bases = [base]
+            else:
+                # 绝对导入：依次试顶层包所在的目录和文件自身所在的目录（脚本式导入）
+                bases = self._py_roots + [own_dir]
+            for base in bases:
+                # from a import b：b 可能是子模块，也可能是 a 中的名称
+                targets = [self._module_file(base, f"{module}.{name}" if module else name) for name in names]
+                targets = [t for t in targets if t is not None]
+                target = self._module_file(base, module)
+                if target is not None:
+                    targets.append(target)
+                if targets:
+                    found.extend(targets)
+                    break
+        return found
+
+    def resolve_js(self, rel, specs):
+        found = []
+        own_dir = posixpath.dirname(rel)
+        for spec in specs:
+            path = posixpath.normpath(posixpath.join(own_dir, spec))
+            if path.startswith('..'):
+                continue
+            stem, ext = posixpath.splitext(path)
+            candidates = [path] + [path + e for e in JS_EXTS]
+            candidates += [stem + e for e in _JS_OUTPUT_EXTS.get(ext, ())]
+            candidates += [posixpath.join(path, 'index' + e) for e in JS_EXTS]
+            for candidate in candidates:
+                if candidate in self.files:
+                    found.append(candidate)
+                    break
+        return found
+
+    def imports(self, rel):
+        """rel 直接引用的项目内文件（相对路径）"""
+        refs = self.refs(rel)
+        if not refs:
+            return []
+        if os.path.splitext(rel)[1].lower() in PY_EXTS:
+            return self.resolve_python(rel, refs)
+        return self.resolve_js(rel, refs)
+
+    def dependencies(self, file_paths, depth, should_stop=None):
+        """
+        file_paths（绝对路径）引用的项目内文件，逐层展开到 depth 层，按发现顺序返回绝对路径，
+        不含 file_paths 本身。
+        """
+        seen = set()
+        queue = deque()
+        for file_path in file_paths:
+            rel = self.path_filter.relpath(file_path)
+            if rel is not None and rel not in seen:
+                seen.add(rel)
+                queue.append((rel, 0))
+        found = []
+        while queue:
+            if should_stop is not None and should_stop():
+                break
+            rel, level = queue.popleft()
+            if level >= depth:
+                continue
+            for target in self.imports(rel):
+                if target not in seen:
+                    seen.add(target)
+                    found.append(os.path.join(self.root, *target.split('/')))
+                    queue.append((target, level + 1))
+        return found
+
+    def flush(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,72 @@
+"""
+编码与二进制嗅探。
+
+只看文件开头的 SNIFF_SIZE 字节：先识别 BOM，再用 NUL 字节排除二进制文件，
+最后用增量解码器在这一小段上挑出候选编码。完整内容只按候选编码解码一次，
+失败时才继续尝试 ENCODINGS 中排在后面的编码，结果与逐个整段尝试完全一致。
+"""
+import codecs
+
+# 嗅探时读取的字节数，与原来的二进制检测窗口一致
+SNIFF_SIZE = 8000
+
+# 依次尝试的编码，latin-1 兜底（任何字节序列都能解码）
+ENCODINGS = ['utf-8', 'gb18030', 'gbk', 'cp1252', 'latin-1']
+
+# UTF-32 LE 的 BOM 以 UTF-16 LE 的 BOM 开头，必须先判断
+BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+
+def sniff(prefix, use_bom=True):
+    """根据文件开头返回候选编码；判定为二进制时返回 None"""
+    if use_bom:
+        for bom, enc in BOMS:
+            if prefix.startswith(bom):
+                return enc
+
+    # 简单的二进制检测
+    if b'\0' in prefix:
+        return None
+
+    # final=False：允许 prefix 在多字节字符中间截断
+    for enc in ENCODINGS:
+        try:
+            codecs.getincrementaldecoder(enc)().decode(prefix, False)
+            return enc
+        except UnicodeDecodeError:
+            continue
+    return ENCODINGS[-1]
+
+
+def decode_bytes(raw_data, candidate=None):
+    """
+    解码字节串，返回 (content, encoding)；判定为二进制时返回 (None, None)。
+    candidate 为 sniff() 的结果，None 表示在这里对开头重新嗅探。
+    """
+    if candidate is None:
+        candidate = sniff(raw_data[:SNIFF_SIZE])
+        if candidate is None:
+            return None, None
+
+    if candidate not in ENCODINGS:
+        # 带 BOM 的文件；解码失败时按没有 BOM 重新判断
+        try:
+            return raw_data.decode(candidate), candidate
+        except UnicodeDecodeError:
+            candidate = sniff(raw_data[:SNIFF_SIZE], use_bom=False)
+            if candidate is None:
+                return None, None
+
+    # 排在候选编码之前的编码在开头就已失败，不必再整段尝试
+    for enc in ENCODINGS[ENCODINGS.index(candidate):]:
+        try:
+            return raw_data.decode(enc), enc
+        except UnicodeDecodeError:
+            continue
+    return None, None
@@ -0,0 +1,677 @@
+"""
+纯 Python 的提取引擎：遍历 -> 过滤 -> 解码 -> (大纲 / 压缩) -> 渲染。
+
+这里不能导入任何 Qt 模块，CLI 和 GUI 的 Worker 共用这一套流程。
+"""
+import os
+import sqlite3
+import time
+from collections import deque
+
+from .archive import READ_ERRORS
+from .compact import compact_text
+from .encoding import SNIFF_SIZE, decode_bytes, sniff
+from .excerpt import PARTIAL_READ_MIN, excerpt_stream, excerpt_text, placeholder_text
+from .filters import PathFilter
+from .outline import outline_key, outline_supported, outline_text
+from .sinks import StringSink
+from .tokens import PREFER_SMALL, estimate_tokens, pack
+from .trace import (STAGE_CACHE, STAGE_COMPACT, STAGE_DECODE, STAGE_DEPS, STAGE_GIT, STAGE_OUTLINE,
+                    STAGE_READ, STAGE_RENDER, STAGE_WALK)
+
+# 读取/解码线程数，可用环境变量 CODE_COPIER_WORKERS 按机器调整
+WORKERS_ENV = 'CODE_COPIER_WORKERS'
+# 写入 sink 时每块的最大字符数，避免为大文件再拼出一份完整副本
+CHUNK_SIZE = 64 * 1024
+
+# 每个线程最多预取的文件数，限制乱序完成时暂存的内容
+PREFETCH_PER_WORKER = 4
+
+# 等待线程池结果时检查 stop() 的间隔（秒）：取消不必等正在读取的大文件读完
+CANCEL_POLL = 0.05
+
+# 大纲模式下缓存未命中超过这个数时才启动进程池，少量文件不值得启动子进程
+OUTLINE_POOL_MIN = 32
+
+# 段落标题：完整内容 / 大纲 / git diff
+TITLE_FILE = 'File'
+TITLE_OUTLINE = 'Outline'
+TITLE_DIFF = 'Diff'
+
+# selected_paths 中的类型标记
+TYPE_FILE = 0
+TYPE_DIR = 1
+
+# read_file 的结果状态
+READ_OK = 'ok'
+SKIP_BINARY = 'binary'
+SKIP_TOO_LARGE = 'too_large'
+SKIP_ERROR = 'error'
+SKIP_UNCHANGED = 'unchanged'  # diff 模式下没有改动的文件
+
+
+def read_raw(file_path, max_size=None, archive=None):
+    """
+    读取文件的字节，返回 (data, candidate, status)，candidate 为 sniff() 选出的候选编码。
+    先只读开头 SNIFF_SIZE 字节：二进制文件和超过 max_size 的文件不会被完整读取，
+    二进制文件的 data 只有这段开头，过大或无法读取时 data 为 None。
+    archive 给出时 file_path 为其中的虚拟路径，直接从归档成员流式读取。
+    """
+    try:
+        if archive is not None:
+            if max_size is not None and archive.stat(file_path).st_size > max_size:
+                return None, None, SKIP_TOO_LARGE
+            with archive.open(file_path) as f:
+                return _read_stream(f)
+        with open(file_path, 'rb') as f:
+            if max_size is not None and os.fstat(f.fileno()).st_size > max_size:
+                return None, None, SKIP_TOO_LARGE
+            return _read_stream(f)
+    except READ_ERRORS:
+        return None, None, SKIP_ERROR
+
+
+def _read_stream(f):
+    prefix = f.read(SNIFF_SIZE)
+    candidate = sniff(prefix)
+    if candidate is None:
+        return prefix, None, SKIP_BINARY
+    return prefix + f.read(), candidate, READ_OK
+
+
+def read_file(file_path, max_size=None, archive=None):
+    """读取并解码文件，返回 (content, encoding, status)，status 为 READ_OK 或 SKIP_*"""
+    raw_data, candidate, status = read_raw(file_path, max_size, archive)
+    if status != READ_OK:
+        return None, None, status
+
+    content, encoding = decode_bytes(raw_data, candidate)
+    if content is None:
+        return None, None, SKIP_BINARY
+    return content, encoding, READ_OK
+
+
+def decode_file(file_path, max_size=None):
+    """读取并解码文件，二进制、过大或无法读取时返回 None"""
+    return read_file(file_path, max_size)[0]
+
+
+def default_workers():
+    """默认线程数：环境变量优先，否则与 ThreadPoolExecutor 的默认值一致"""
+    value = os.environ.get(WORKERS_ENV)
+    if value:
+        try:
+            return max(1, int(value))
+        except ValueError:
+            pass
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+def render_file(rel_path, content, title=TITLE_FILE):
+    """渲染单个文件的 Markdown 段落"""
+    return f"## {title}: {rel_path}\n```\n{content}\n```\n"
+
+
+def section_tokens(rel_path, tokens, title=TITLE_FILE):
+    """一个文件段落的 token 数：内容 + 标题和代码围栏 + 段落之间的换行"""
+    return tokens + estimate_tokens(render_file(rel_path, "", title)) + 1
+
+
+def render_chunks(rel_path, content, chunk_size=CHUNK_SIZE, title=TITLE_FILE):
+    """与 render_file 输出相同，但按 chunk_size 分块产出"""
+    yield f"## {title}: {rel_path}\n```\n"
+    for start in range(0, len(content), chunk_size):
+        yield content[start:start + chunk_size]
+    yield "\n```\n"
+
+
+class Extractor:
+    def __init__(self, root_dir, selected_paths, workers=None, cache=None, path_filter=None,
+                 max_file_size=None, token_budget=None, prefer=PREFER_SMALL, compact=False,
+                 outline=False, trace=None, project_index=None, dep_graph=None, dep_depth=0,
+                 diff=None, archive=None, excerpt=None, excerpts=None, placeholder=False):
+        """
+        root_dir: 项目根目录
+        selected_paths: 一个列表，包含 (path, type)
+                        type 0 = 文件
+                        type 1 = 文件夹 (全选)
+        workers: 读取/解码线程数，None 表示 default_workers()，1 表示单线程
+        cache: 可选的 ContentCache，文件未变化时跳过读取和解码
+        path_filter: 遍历文件夹时使用的 PathFilter，默认读取 root_dir 下的 .gitignore
+        max_file_size: 超过该字节数的文件不读取，记录在 skipped 中；None 表示不限制
+        token_budget: 结果的 token 上限；超出时按 prefer 挑选文件，其余记录在 dropped 中
+        prefer: 预算不够时的取舍策略，见 tokens.PREFERENCES
+        compact: 输出前按语言去掉注释、行尾空白和多余空行，节省量记录在 saved_bytes / saved_tokens
+        outline: 支持的语言只输出大纲（签名、文档字符串和常量），数量记录在 outlined 中
+        trace: 可选的 trace.Trace，记录各阶段耗时、编码分布和最慢的文件
+        project_index: 可选的 ProjectIndex，全选的文件夹从索引展开，未变化的目录不再遍历
+        dep_graph: 可选的 deps.DepGraph；与 dep_depth > 0 一起给出时，选中文件引用的本地模块
+                   逐层展开到 dep_depth 层后追加到文件列表末尾，数量记录在 dep_files 中
+        diff: 可选的 git.GitDiff；给出时已跟踪的文件只输出 diff（标题为 Diff），新文件输出完整内容，
+              没有改动的文件跳过（SKIP_UNCHANGED），选中的文件夹下已删除的文件也输出 diff；
+              输出为 diff 的文件数记录在 diffed 中
+        archive: 可选的 archive.Archive；给出时 root_dir 和 selected_paths 都是归档中的虚拟路径，
+                 未给出 path_filter 时用它过滤，成员直接从归档中读取；tar 归档只用一个线程
+        excerpt: 可选的 excerpt.Excerpt，所有文件只输出开头/末尾的若干行或指定的行范围，省略处写明省略了什么
+        excerpts: {file_path: Excerpt}，单个文件的行范围，优先于 excerpt，也不受 max_file_size 限制；
+                  被截取的文件记录在 truncated 中
+        placeholder: 超过 max_file_size 的文件输出一行占位说明，而不是直接略过（仍记录在 skipped 中）
+        """
+        self.root_dir = root_dir
+        self.selected_paths = selected_paths
+        self.workers = default_workers() if workers is None else max(1, int(workers))
+        if archive is not None and archive.sequential:
+            self.workers = 1
+        self.cache = cache
+        self.archive = archive
+        self.path_filter = path_filter or archive or PathFilter(root_dir)
+        self.max_file_size = max_file_size
+        self.token_budget = token_budget
+        self.prefer = prefer
+        self.skipped = [] # [(file_path, status)]，status 为 SKIP_*
+        self.dropped = [] # [(file_path, tokens)]，因超出 token 预算而未输出的文件
+        self.total_tokens = 0
+        self.compact = compact
+        self.saved_bytes = 0
+        self.saved_tokens = 0
+        self.outline = outline
+        self.outlined = 0
+        self.trace = trace
+        self.project_index = project_index
+        self.size_hints = {} # 索引中记录的文件大小，预扫描时不必再 stat
+        self.dep_graph = dep_graph
+        self.dep_depth = dep_depth
+        self.dep_files = 0
+        self.diff = diff
+        self.diffed = 0
+        self.excerpt = excerpt or None
+        self.excerpts = excerpts or {}
+        self.placeholder = placeholder
+        self.truncated = set()
+        self.sizes = {} # 预扫描得到的 {file_path: 需要读取的字节数}，见 scan()
+        self.is_running = True
+
+    def stop(self):
+        self.is_running = False
+
+    def collect_files(self):
+        """把选中项展开成去重后的文件列表，保持选择顺序"""
+        final_file_list = []
+        processed_files = set()
+
+        for path, item_type in self.selected_paths:
+            if not self.is_running: break
+
+            if item_type == TYPE_FILE:
+                if path not in processed_files:
+                    final_file_list.append(path)
+                    processed_files.add(path)
+            elif item_type == TYPE_DIR: # 文件夹 (递归添加所有内容)
+                # 被忽略的目录在 walk 中已被剪枝，files 也已过滤
+                if self.project_index is not None:
+                    walk = self.project_index.walk(path, self.size_hints)
+                else:
+                    walk = self.path_filter.walk(path)
+                for root, dirs, files in walk:
+                    if not self.is_running: break
+                    
+                    for file in files:
+                        file_path = os.path.join(root, file)
+                        if file_path not in processed_files:
+                            final_file_list.append(file_path)
+                            processed_files.add(file_path)
+
+        return final_file_list
+
+    def collect_dependencies(self, file_list):
+        """file_list 引用的本地模块（不含 file_list 中已有的文件）；依赖图未建好或已失效时先增量构建"""
+        graph = self.dep_graph
+        walk = self.project_index.walk(graph.root) if self.project_index is not None else None
+        should_stop = lambda: not self.is_running
+        graph.ensure(walk, should_stop)
+        found = graph.dependencies(file_list, self.dep_depth, should_stop)
+        self.dep_files = len(found)
+        return found
+
+    def is_patch(self, file_path):
+        """diff 模式下 file_path 的输出是 diff 而不是文件内容"""
+        return self.diff is not None and file_path in self.diff.patches
+
+    def decode(self, file_path):
+        """
+        读取并解码单个文件，二进制、过大或无法读取时返回 None 并记录到 skipped。
+        有缓存时 (path, size, mtime_ns) 未变化直接返回缓存内容。diff 模式下已跟踪的文件返回它的 diff。
+        要截取的文件只返回保留的行，大文件只读需要的部分；placeholder 时过大的文件返回占位说明。
+        """
+        if self.diff is not None and file_path not in self.diff.new:
+            patch = self.diff.patches.get(file_path)
+            if patch is None:
+                self.skipped.append((file_path, SKIP_UNCHANGED))
+            return patch
+        start = time.perf_counter() if self.trace is not None else None
+        excerpt = self.excerpt_for(file_path)
+        if self.cache is None and excerpt is None and not self.placeholder:
+            content, encoding, status = self.read(file_path, self.max_file_size)
+        else:
+            try:
+                st = self.stat(file_path)
+            except OSError:
+                st = None
+            if st is None:
+                content, encoding, status = None, None, SKIP_ERROR
+            elif (self.max_file_size is not None and st.st_size > self.max_file_size
+                  and file_path not in self.excerpts):
+                content, encoding, status = None, None, SKIP_TOO_LARGE
+                if self.placeholder:
+                    content = placeholder_text(st.st_size, self.max_file_size)
+            elif excerpt is not None and st.st_size >= PARTIAL_READ_MIN:
+                # 大文件只读需要的部分；结果不完整，不写入缓存
+                content, encoding, status = self.read_excerpt(file_path, st.st_size, excerpt)
+                excerpt = None
+            elif self.cache is None:
+                content, encoding, status = self.read(file_path)
+            else:
+                entry = self.cached(self.cache.get, file_path, st.st_size, st.st_mtime_ns)
+                if self.trace is not None:
+                    self.trace.add(STAGE_CACHE, start, path=file_path)
+                if entry is not None:
+                    encoding, content = entry
+                    status = READ_OK if content is not None else SKIP_BINARY
+                else:
+                    content, encoding, status = self.read(file_path)
+                    if status != SKIP_ERROR:
+                        tokens = estimate_tokens(content) if content is not None else None
+                        self.cached(self.cache.put, file_path, st.st_size, st.st_mtime_ns, encoding, content,
+                                    tokens)
+
+        if excerpt is not None and status == READ_OK:
+            excerpted = excerpt_text(content, excerpt)
+            if excerpted is not content:
+                self.truncated.add(file_path)
+            content = excerpted
+        if status != READ_OK:
+            self.skipped.append((file_path, status))
+        if self.trace is not None:
+            self.trace.file_done(file_path, time.perf_counter() - start, encoding,
+                                 status if status != READ_OK else None)
+        return content
+
+    def excerpt_for(self, file_path):
+        """file_path 要截取的行，None 表示完整输出"""
+        return self.excerpts.get(file_path) or self.excerpt
+
+    def read_excerpt(self, file_path, size, excerpt):
+        """只读出 excerpt 需要的字节并解码，返回 (content, encoding, status)"""
+        start = time.perf_counter()
+        try:
+            with (open(file_path, 'rb') if self.archive is None else self.archive.open(file_path)) as f:
+                content, encoding, truncated = excerpt_stream(f, size, excerpt)
+        except READ_ERRORS:
+            return None, None, SKIP_ERROR
+        finally:
+            if self.trace is not None:
+                self.trace.add(STAGE_READ, start, path=file_path)
+        if content is None:
+            return None, None, SKIP_BINARY
+        if truncated:
+            self.truncated.add(file_path)
+        return content, encoding, READ_OK
+
+    def stat(self, file_path):
+        """os.stat()；归档中的文件返回成员的 MemberStat"""
+        return os.stat(file_path) if self.archive is None else self.archive.stat(file_path)
+
+    def read(self, file_path, max_size=None):
+        """read_file()；有 trace 时分别记录读取和解码的耗时以及读取的字节数"""
+        if self.trace is None:
+            return read_file(file_path, max_size, self.archive)
+        start = time.perf_counter()
+        raw_data, candidate, status = read_raw(file_path, max_size, self.archive)
+        read_end = time.perf_counter()
+        self.trace.add(STAGE_READ, start, read_end, file_path)
+        if raw_data is not None:
+            self.trace.add_bytes(len(raw_data))
+        if status != READ_OK:
+            return None, None, status
+        content, encoding = decode_bytes(raw_data, candidate)
+        self.trace.add(STAGE_DECODE, read_end, path=file_path)
+        if content is None:
+            return None, None, SKIP_BINARY
+        return content, encoding, READ_OK
+
+    def measure(self, file_path):
+        """
+        估算单个文件的 token 数，返回 (tokens, mtime)；文件被跳过时返回 None。
+        缓存中有估算值时不读取文件内容（压缩和大纲模式下缓存的是原文的估算值，不能直接用）。
+        """
+        try:
+            st = self.stat(file_path)
+        except OSError:
+            st = None
+        if self.cache is not None and st is not None and not (self.compact or self.outline or self.diff is not None) and (
+                self.max_file_size is None or st.st_size <= self.max_file_size) and self.excerpt_for(file_path) is None:
+            tokens = self.cached(self.cache.get_tokens, file_path, st.st_size, st.st_mtime_ns)
+            if tokens is not None:
+                return tokens, st.st_mtime
+        content = self.decode(file_path)
+        if content is None:
+            return None
+        if self.is_patch(file_path):
+            return estimate_tokens(content), st.st_mtime if st is not None else 0
+        outline = self.outline_one(file_path, content) if self.outline else None
+        if outline is not None:
+            content = outline
+        elif self.compact:
+            content = self.timed(STAGE_COMPACT, file_path, compact_text, file_path, content)
+        return estimate_tokens(content), st.st_mtime if st is not None else 0
+
+    def cached(self, method, *args):
+        """
+        调用 self.cache 的方法；数据库被其它进程锁住或已损坏时当作未命中（写入则放弃），
+        提取照常进行，不因为缓存而中断。
+        """
+        try:
+            return method(*args)
+        except sqlite3.Error:
+            return None
+
+    def timed(self, stage, file_path, func, *args):
+        """调用 func(*args)；有 trace 时把耗时记在 stage 下"""
+        if self.trace is None:
+            return func(*args)
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.trace.add(stage, start, path=file_path)
+
+    def iter_decoded(self, file_list):
+        """按 file_list 的顺序产出 (file_path, content)，读取和解码在线程池中并行执行"""
+        return self.iter_mapped(self.decode, file_list)
+
+    def iter_mapped(self, func, file_list):
+        """按 file_list 的顺序产出 (file_path, func(file_path))，func 在线程池中并行执行"""
+        if self.workers <= 1:
+            for file_path in file_list:
+                if not self.is_running: break
+                yield file_path, func(file_path)
+            return
+
+        # 延迟导入：concurrent.futures 会带入 logging 等模块，拖慢界面启动
+        from concurrent.futures import ThreadPoolExecutor, wait
+
+        window = self.workers * PREFETCH_PER_WORKER
+        pending = deque()
+        files = iter(file_list)
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='decode')
+        try:
+            while self.is_running:
+                # 保持固定数量的任务在途：按提交顺序取结果，输出顺序与单线程一致
+                while len(pending) < window:
+                    file_path = next(files, None)
+                    if file_path is None: break
+                    pending.append((file_path, pool.submit(func, file_path)))
+                if not pending: break
+
+                file_path, future = pending[0]
+                while not future.done() and self.is_running:
+                    wait((future,), timeout=CANCEL_POLL)
+                if not self.is_running: break
+                pending.popleft()
+                yield file_path, future.result()
+        finally:
+            # stop() 或调用方提前结束时，丢弃尚未开始的任务；stop() 后不等正在读取的文件
+            for _, future in pending:
+                future.cancel()
+            pool.shutdown(wait=self.is_running)
+
+    def scan(self, file_list):
+        """
+        预扫描：并行 stat 每个文件，记录到 sizes 中并返回总字节数，用于按字节显示进度。
+        索引中有大小的文件直接使用记录的值（原地修改过的文件可能略有出入，只影响进度显示）。
+        """
+        hints = self.size_hints
+        self.sizes = {path: self.file_size(path, hints[path]) for path in file_list if path in hints}
+        if len(self.sizes) < len(file_list):
+            missing = [path for path in file_list if path not in hints]
+            self.sizes.update(self.iter_mapped(self.file_size, missing))
+        return sum(self.sizes.values())
+
+    def file_size(self, file_path, size=None):
+        """需要读取的字节数；超过 max_file_size 的文件不会被读取，记为 0"""
+        if size is None:
+            try:
+                size = self.stat(file_path).st_size
+            except OSError:
+                return 0
+        return 0 if self.max_file_size is not None and size > self.max_file_size else size
+
+    def outline_one(self, file_path, content):
+        """在当前线程生成单个文件的大纲（先查缓存），不支持或无法解析时返回 None"""
+        if not outline_supported(file_path):
+            return None
+        key = outline_key(file_path, content)
+        result = self.cached(self.cache.get_outline, key) if self.cache is not None else None
+        if result is None:
+            result = self.timed(STAGE_OUTLINE, file_path, outline_text, file_path, content)
+            if result is not None and self.cache is not None:
+                self.cached(self.cache.put_outline, key, result)
+        return result
+
+    def iter_outlined(self, decoded):
+        """
+        把 (file_path, content) 换成 (file_path, text, title)：支持的文件换成大纲，其余原样输出。
+        大纲按内容哈希缓存；未命中的文件超过 OUTLINE_POOL_MIN 个后交给进程池解析，输出顺序不变。
+        """
+        from concurrent.futures import Future, ProcessPoolExecutor
+        processes = os.cpu_count() or 1
+        window = processes * PREFETCH_PER_WORKER
+        pool = None
+        misses = 0
+        pending = deque()
+        try:
+            for file_path, content in decoded:
+                key = result = None
+                if content is not None and outline_supported(file_path) and not self.is_patch(file_path):
+                    key = outline_key(file_path, content)
+                    result = self.cached(self.cache.get_outline, key) if self.cache is not None else None
+                    if result is not None:
+                        key = None # 命中，不必再写回
+                    else:
+                        misses += 1
+                        if pool is None and misses > OUTLINE_POOL_MIN and processes > 1 and self.workers > 1:
+                            pool = ProcessPoolExecutor(max_workers=processes)
+                        if pool is not None:
+                            result = pool.submit(outline_text, file_path, content)
+                        else:
+                            result = self.timed(STAGE_OUTLINE, file_path, outline_text, file_path, content)
+                pending.append((file_path, content, key, result))
+
+                # 队首已完成就先交出去；在途任务太多时等待队首
+                while pending and (len(pending) >= window or not isinstance(pending[0][3], Future)
+                                   or pending[0][3].done()):
+                    yield self.finish_outline(*pending.popleft())
+            while pending:
+                yield self.finish_outline(*pending.popleft())
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    def finish_outline(self, file_path, content, key, result):
+        from concurrent.futures import Future
+        from concurrent.futures.process import BrokenProcessPool
+
+        if isinstance(result, Future):
+            # 记录的是等待子进程的时间
+            start = time.perf_counter()
+            try:
+                result = result.result()
+            except BrokenProcessPool:
+                # 子进程无法启动或意外退出时退回到当前进程解析
+                result = outline_text(file_path, content)
+            if self.trace is not None:
+                self.trace.add(STAGE_OUTLINE, start, path=file_path)
+        if result is None:
+            return file_path, content, TITLE_FILE
+        if key is not None and self.cache is not None:
+            self.cached(self.cache.put_outline, key, result)
+        return file_path, result, TITLE_OUTLINE
+
+    def iter_sections(self, file_list, on_progress=None):
+        """
+        逐个产出 (rel_path, content, title)，title 为 TITLE_FILE 或 TITLE_OUTLINE。
+        on_progress(已处理文件数, 已处理字节数)：被跳过的文件也计入，字节数来自 scan() 的结果。
+        """
+        done_files = 0
+        done_bytes = 0
+        if self.outline:
+            sections = self.iter_outlined(self.iter_decoded(file_list))
+        else:
+            sections = ((file_path, content, TITLE_FILE) for file_path, content in self.iter_decoded(file_list))
+        for file_path, content, title in sections:
+            if content is not None:
+                if self.is_patch(file_path):
+                    title = TITLE_DIFF
+                    self.diffed += 1
+                elif title == TITLE_OUTLINE:
+                    self.outlined += 1
+                elif self.compact:
+                    content = self.compact_content(file_path, content)
+                rel_path = os.path.relpath(file_path, self.root_dir)
+                yield rel_path, content, title
+            done_files += 1
+            done_bytes += self.sizes.get(file_path, 0)
+            if on_progress is not None:
+                on_progress(done_files, done_bytes)
+
+    def pack_files(self, file_list):
+        """
+        预算模式的第一遍：估算每个文件的 token 数，挑出放得进 token_budget 的文件。
+        返回保留的文件（顺序不变），放不下的记录在 dropped 中。
+        只保留数字不保留内容；没有缓存时，被选中的文件在第二遍会再读一次。
+        """
+        explicit = {path for path, item_type in self.selected_paths if item_type == TYPE_FILE}
+        candidates = []
+        for file_path, measured in self.iter_mapped(self.measure, file_list):
+            if measured is None:
+                continue
+            tokens, mtime = measured
+            rel_path = os.path.relpath(file_path, self.root_dir)
+            if self.is_patch(file_path):
+                title = TITLE_DIFF
+            else:
+                title = TITLE_OUTLINE if self.outline and outline_supported(file_path) else TITLE_FILE
+            candidates.append((file_path, section_tokens(rel_path, tokens, title), file_path in explicit, mtime))
+
+        kept, dropped = pack(candidates, self.token_budget, self.prefer)
+        self.dropped = [(file_path, tokens) for file_path, tokens, _, _ in dropped]
+        return [file_path for file_path, _, _, _ in kept]
+
+    def compact_content(self, file_path, content):
+        """压缩单个文件的内容并累计节省的字节数和 token 数"""
+        compacted = self.timed(STAGE_COMPACT, file_path, compact_text, file_path, content)
+        if compacted is not content:
+            self.saved_bytes += len(content.encode('utf-8')) - len(compacted.encode('utf-8'))
+            self.saved_tokens += estimate_tokens(content) - estimate_tokens(compacted)
+        return compacted
+
+    def write_to(self, sink, on_progress=None, on_scan=None):
+        """
+        把渲染结果分块写入 sink，返回写入的文件数；同一时刻只持有少量文件的内容。
+        on_scan(文件数, 总字节数)：给出时先预扫描文件大小，之后 on_progress 按字节回报进度。
+        """
+        total_files = 0
+        self.total_tokens = 0
+        self.saved_bytes = 0
+        self.saved_tokens = 0
+        self.outlined = 0
+        self.dep_files = 0
+        self.diffed = 0
+        self.truncated = set()
+        self.size_hints = {}
+        if self.trace is not None:
+            self.trace.reset()
+        try:
+            if self.diff is not None:
+                self.timed(STAGE_GIT, None, self.diff.load)
+            file_list = self.timed(STAGE_WALK, None, self.collect_files)
+            if self.archive is not None:
+                file_list = self.archive.read_order(file_list)
+            if self.diff is not None:
+                listed = set(file_list)
+                file_list += [path for path in self.diff.deleted_under(self.selected_paths) if path not in listed]
+            if self.dep_graph is not None and self.dep_depth > 0 and self.is_running:
+                file_list += self.timed(STAGE_DEPS, None, self.collect_dependencies, file_list)
+            if self.token_budget is not None:
+                file_list = self.pack_files(file_list)
+            if on_scan is not None and self.is_running:
+                on_scan(len(file_list), self.scan(file_list))
+            for rel_path, content, title in self.iter_sections(file_list, on_progress):
+                start = time.perf_counter() if self.trace is not None else None
+                tokens = section_tokens(rel_path, estimate_tokens(content), title)
+                if total_files:
+                    sink.write("\n")
+                sink.begin_section(rel_path, content, tokens)
+                for chunk in render_chunks(rel_path, content, title=title):
+                    sink.write(chunk)
+                if start is not None:
+                    self.trace.add(STAGE_RENDER, start, path=rel_path)
+                total_files += 1
+                self.total_tokens += tokens
+        finally:
+            # 取消时也要提交（只跳过缓存的 LRU 更新和淘汰）：留着不提交的事务会一直占着共享数据库的写锁，
+            # 其它窗口、命令行和守护进程都要等它
+            if self.cache is not None:
+                self.cached(self.cache.flush if self.is_running else self.cache.commit)
+            if self.project_index is not None:
+                self.project_index.flush()
+            if self.dep_graph is not None:
+                self.dep_graph.flush()
+            if self.trace is not None:
+                self.trace.finish()
+        return total_files
+
+    def run(self, on_progress=None):
+        """执行完整流程，返回 (result_text, file_count)"""
+        sink = StringSink()
+        total_files = self.write_to(sink, on_progress)
+        return sink.getvalue(), total_files
+
+
+def resolve_selection(root_dir, paths, archive=None):
+    """
+    把命令行里的相对/绝对路径转换成 (path, type) 列表；未指定时选中整个根目录。
+    archive 给出时 root_dir 为归档文件，paths 为其中的成员路径。
+    根目录或某个路径不存在时抛出 FileNotFoundError。
+    """
+    root_dir = os.path.abspath(root_dir)
+    if not paths:
+        if archive is None and not os.path.isdir(root_dir):
+            raise FileNotFoundError(root_dir)
+        return [(root_dir, TYPE_DIR)]
+
+    fs = os.path if archive is None else archive
+    selected = []
+    for p in paths:
+        full_path = os.path.normpath(os.path.join(root_dir, p))
+        if fs.isdir(full_path):
+            selected.append((full_path, TYPE_DIR))
+        elif fs.isfile(full_path):
+            selected.append((full_path, TYPE_FILE))
+        else:
+            raise FileNotFoundError(full_path)
+    return selected
+
+
+def extract(root_dir, paths=None, workers=None, cache=None, path_filter=None, max_file_size=None,
+            token_budget=None, prefer=PREFER_SMALL, compact=False, outline=False, trace=None,
+            project_index=None, dep_graph=None, dep_depth=0, diff=None, archive=None, excerpt=None,
+            excerpts=None, placeholder=False):
+    """便捷入口：提取 root_dir 下的 paths（相对路径），返回 (result_text, file_count)"""
+    root_dir = os.path.abspath(root_dir)
+    return Extractor(root_dir, resolve_selection(root_dir, paths, archive), workers=workers, cache=cache,
+                     path_filter=path_filter, max_file_size=max_file_size,
+                     token_budget=token_budget, prefer=prefer, compact=compact, outline=outline,
+                     trace=trace, project_index=project_index, dep_graph=dep_graph,
+                     dep_depth=dep_depth, diff=diff, archive=archive, excerpt=excerpt,
+                     excerpts=excerpts, placeholder=placeholder).run()
@@ -0,0 +1,249 @@
+"""
+只输出文件的一部分：开头 N 行、末尾 N 行或指定的行范围，省略的部分换成一行标记，说明省略了什么。
+
+大文件（PARTIAL_READ_MIN 以上）只读需要的字节：开头的行和行范围从前往后按块读到最后一个范围结束，
+末尾的行从文件末尾往前按块查找换行，中间的内容不会被读取。按字节查找 b'\\n' 对 UTF-8、GBK 等
+兼容 ASCII 的编码都成立；UTF-16/32 的文件整个解码后再按行切分。
+小文件照常完整读取（可以命中缓存），在解码后的文本上切分。
+"""
+import re
+
+from .encoding import SNIFF_SIZE, decode_bytes, sniff
+
+# 不小于这个大小的文件只读取需要的部分，结果不写入缓存
+PARTIAL_READ_MIN = 256 * 1024
+# 查找换行时每次读取的字节数
+BLOCK_SIZE = 64 * 1024
+
+# 不兼容 ASCII 的编码：换行不是单独的 b'\n' 字节
+_WIDE_ENCODINGS = ('utf-16', 'utf-32')
+
+_ITEM = r'(?:head=\d+|tail=\d+|\d+(?:-\d*)?)'
+_SPEC = re.compile(rf'{_ITEM}(?:,{_ITEM})*')
+_PATH_SPEC = re.compile(rf'(.+):({_ITEM}(?:,{_ITEM})*)')
+
+
+class Excerpt:
+    """
+    保留开头 head 行、末尾 tail 行以及 ranges 中的行，其余省略。
+    ranges 为 [(first, last)]，行号从 1 开始并包含两端，last 为 None 表示到文件末尾。
+    """
+
+    def __init__(self, head=0, tail=0, ranges=()):
+        self.head = head
+        self.tail = tail
+        self.ranges = list(ranges)
+
+    @classmethod
+    def parse(cls, spec):
+        """
+        解析以逗号分隔的组合，如 'head=100'、'tail=50'、'1-80,200-240'、'300-'（到末尾）、'42'（单独一行）。
+        格式错误时抛出 ValueError。
+        """
+        spec = spec.replace(' ', '')
+        if not _SPEC.fullmatch(spec):
+            raise ValueError(f"invalid line range: {spec!r}")
+        excerpt = cls()
+        for item in spec.split(','):
+            if item.startswith('head='):
+                excerpt.head = max(excerpt.head, int(item[5:]))
+            elif item.startswith('tail='):
+                excerpt.tail = max(excerpt.tail, int(item[5:]))
+            else:
+                first, _, last = item.partition('-')
+                first = max(1, int(first))
+                if not _:
+                    last = first
+                elif last:
+                    last = int(last)
+                    if last < first:
+                        raise ValueError(f"invalid line range: {item!r}")
+                else:
+                    last = None
+                excerpt.ranges.append((first, last))
+        return excerpt
+
+    def __str__(self):
+        items = [f'head={self.head}'] if self.head else []
+        for first, last in self.ranges:
+            items.append(str(first) if first == last else f"{first}-{last or ''}")
+        if self.tail:
+            items.append(f'tail={self.tail}')
+        return ','.join(items)
+
+    def __bool__(self):
+        return bool(self.head or self.tail or self.ranges)
+
+    def line_ranges(self):
+        """开头和各行范围 [(first, last)]，按起始行排序；末尾的行在知道总行数之前无法换算"""
+        spans = list(self.ranges)
+        if self.head:
+            spans.append((1, self.head))
+        return sorted(spans, key=lambda span: span[0])
+
+
+def split_path_spec(arg):
+    """'path:SPEC' -> (path, Excerpt)；没有行范围后缀时返回 (arg, None)"""
+    m = _PATH_SPEC.fullmatch(arg)
+    if m is None:
+        return arg, None
+    return m.group(1), Excerpt.parse(m.group(2))
+
+
+def lines_marker(first, last):
+    what = f"line {first}" if first == last else f"lines {first}-{last}"
+    return f"[... {what} omitted ...]"
+
+
+def bytes_marker(count):
+    return f"[... {count:,} bytes omitted ...]"
+
+
+def placeholder_text(size, limit):
+    """超过大小限制、没有读取的文件的占位内容"""
+    return f"[... file omitted: {size:,} bytes, over the {limit:,}-byte limit ...]"
+
+
+def excerpt_text(text, excerpt):
+    """在已解码的文本上切出 excerpt 的行，省略处换成标记；没有省略任何内容时原样返回 text"""
+    lines = text.split('\n')
+    if lines[-1] == '':
+        lines.pop()  # 末尾的换行不算作一个空行
+    total = len(lines)
+    spans = [(first, total if last is None else min(last, total))
+             for first, last in excerpt.line_ranges() if first <= total]
+    if excerpt.tail and total:
+        spans.append((max(1, total - excerpt.tail + 1), total))
+    spans.sort()
+
+    parts = []
+    omitted = False
+    done = 0  # 已经输出或标记过的最后一行
+    for first, last in spans:
+        if last <= done:
+            continue
+        if first > done + 1:
+            parts.append(lines_marker(done + 1, first - 1))
+            omitted = True
+        parts.extend(lines[max(first, done + 1) - 1:last])
+        done = last
+    if done < total:
+        parts.append(lines_marker(done + 1, total))
+        omitted = True
+    return '\n'.join(parts) if omitted else text
+
+
+def _line_offsets(f, lines):
+    """lines 为升序的行号，返回 {行号: 该行开头的字节偏移}；只读到最后一个需要的行，超出文件的行不在结果中"""
+    wanted = iter(lines)
+    target = next(wanted, None)
+    offsets = {}
+    line, pos = 1, 0
+    while target == 1:
+        offsets[1] = 0
+        target = next(wanted, None)
+    f.seek(0)
+    while target is not None:
+        block = f.read(BLOCK_SIZE)
+        if not block:
+            break
+        if line + block.count(b'\n') < target:
+            line += block.count(b'\n')
+        else:
+            i = block.find(b'\n')
+            while i >= 0 and target is not None:
+                line += 1
+                while target == line:
+                    offsets[line] = pos + i + 1
+                    target = next(wanted, None)
+                i = block.find(b'\n', i + 1)
+        pos += len(block)
+    return offsets
+
+
+def _tail_offset(f, size, count):
+    """末尾 count 行开始处的字节偏移，从文件末尾往前按块查找；整个文件不足 count 行时返回 0"""
+    pos = size
+    while pos > 0:
+        start = max(0, pos - BLOCK_SIZE)
+        f.seek(start)
+        block = f.read(pos - start)
+        i = len(block)
+        if pos == size and block.endswith(b'\n'):
+            i -= 1  # 末尾的换行属于最后一行
+        while True:
+            i = block.rfind(b'\n', 0, i)
+            if i < 0:
+                break
+            count -= 1
+            if count == 0:
+                return start + i + 1
+        pos = start
+    return 0
+
+
+def excerpt_stream(f, size, excerpt):
+    """
+    从可 seek 的二进制文件 f（共 size 字节）中只读出 excerpt 需要的部分并解码，
+    返回 (content, encoding, truncated)；二进制文件返回 (None, None, False)。
+    开头和行范围知道行号，省略处标记行号；末尾的行不知道行号，省略处标记字节数。
+    """
+    f.seek(0)
+    prefix = f.read(SNIFF_SIZE)
+    candidate = sniff(prefix)
+    if candidate is None:
+        return None, None, False
+    if candidate in _WIDE_ENCODINGS:
+        content, encoding = decode_bytes(prefix + f.read(), candidate)
+        if content is None:
+            return None, None, False
+        excerpted = excerpt_text(content, excerpt)
+        return excerpted, encoding, excerpted is not content
+
+    spans = []  # (start, end, first, last)：字节区间 [start, end) 及首尾行号，行号未知时为 None
+    line_spans = excerpt.line_ranges()
+    if line_spans:
+        wanted = sorted({n for first, last in line_spans for n in (first, last and last + 1) if n})
+        offsets = _line_offsets(f, wanted)
+        for first, last in line_spans:
+            start = offsets.get(first)
+            if start is None or start >= size:
+                continue
+            end = offsets.get(last + 1, size) if last is not None else size
+            spans.append((start, end, first, last if end < size else None))
+    if excerpt.tail:
+        start = _tail_offset(f, size, excerpt.tail)
+        spans.append((start, size, 1 if start == 0 else None, None))
+    spans.sort(key=lambda span: span[0])
+
+    merged = []
+    for span in spans:
+        if merged and span[0] <= merged[-1][1]:
+            prev = merged[-1]
+            if span[1] > prev[1]:
+                merged[-1] = (prev[0], span[1], prev[2], span[3])
+        else:
+            merged.append(span)
+
+    parts = []
+    omitted = False
+    text, encoding = '', None
+    pos, done = 0, 0  # 已处理到的字节偏移和行号（行号未知时为 None）
+    for start, end, first, last in merged:
+        if start > pos:
+            parts.append(lines_marker(done + 1, first - 1) if first is not None and done is not None
+                         else bytes_marker(start - pos))
+            omitted = True
+        f.seek(start)
+        text, enc = decode_bytes(f.read(end - start), candidate)
+        if text is None:
+            return None, None, False
+        encoding = encoding or enc
+        parts.append(text[:-1] if text.endswith('\n') else text)
+        pos, done = end, last
+    if pos < size:
+        parts.append(bytes_marker(size - pos))
+        omitted = True
+    if not omitted:
+        return text, encoding or candidate, False  # 整个文件都保留了
+    return '\n'.join(parts), encoding or candidate, True
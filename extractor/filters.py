@@ -0,0 +1,273 @@
+"""
+路径过滤：内置忽略规则 + 各级 .gitignore / .ignore + 用户自定义 glob。
+
+每个规则文件被编译成一个合并后的正则，匹配一次即可得到结果；
+被忽略的目录在遍历时直接剪枝，不会再列出其中的内容。
+树的懒加载（MainWindow.add_items）和提取（Extractor）共用同一个 PathFilter。
+"""
+import os
+import re
+
+# 内置默认规则：忽略的目录和文件后缀
+IGNORE_DIRS = {'.git', '.svn', '.hg', '.idea', '.vscode', '__pycache__', 'node_modules', 
+               'venv', 'env', 'build', 'dist', 'bin', 'obj', 'target', '.mypy_cache', '.pytest_cache'}
+IGNORE_EXTS = {'.exe', '.dll', '.so', '.dylib', '.class', '.jar', '.pyc', '.pyo', 
+               '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.pdf', '.zip', '.tar', '.gz', '.7z', '.rar',
+               '.svg', '.woff', '.woff2', '.ttf', '.eot', '.mp4', '.mp3', '.wav'}
+
+# 每个目录中读取的规则文件，后者优先级更高
+IGNORE_FILES = ('.gitignore', '.ignore')
+
+
+def rules_fingerprint(dir_path):
+    """目录中各规则文件的指纹（大小和修改时间），用于察觉规则文件的增删和修改"""
+    parts = []
+    for name in IGNORE_FILES:
+        try:
+            st = os.stat(os.path.join(dir_path, name))
+            parts.append(f"{st.st_size}:{st.st_mtime_ns}")
+        except OSError:
+            parts.append('-')
+    return ','.join(parts)
+
+
+def translate_glob(pattern):
+    """把 gitignore 风格的 glob 转成正则（不含首尾锚点）"""
+    i, n = 0, len(pattern)
+    res = []
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**/', i):
+                res.append('(?:.*/)?')   # 零个或多个目录
+                i += 3
+                continue
+            if pattern.startswith('**', i):
+                res.append('.*')
+                i += 2
+                continue
+            res.append('[^/]*')
+        elif c == '?':
+            res.append('[^/]')
+        elif c == '[':
+            j = i + 1
+            if j < n and pattern[j] in '!^':
+                j += 1
+            if j < n and pattern[j] == ']':
+                j += 1
+            j = pattern.find(']', j)
+            if j < 0:
+                res.append('\\[')
+            else:
+                body = pattern[i + 1:j].replace('\\', '\\\\')
+                if body[:1] in ('!', '^'):
+                    body = '^' + body[1:]
+                res.append(f'[{body}]')
+                i = j
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            res.append(re.escape(pattern[i]))
+        else:
+            res.append(re.escape(c))
+        i += 1
+    return ''.join(res)
+
+
+def parse_rule(line):
+    """
+    解析一行 gitignore 规则，返回 (regex, negate, dir_only)；空行和注释返回 None。
+    regex 匹配相对于规则文件所在目录的路径（使用 / 分隔）。
+    """
+    line = line.rstrip('\n\r')
+    # 未转义的行尾空格会被忽略
+    stripped = line.rstrip(' ')
+    if stripped.endswith('\\') and len(stripped) < len(line):
+        stripped += ' '
+    line = stripped
+    if not line or line.startswith('#'):
+        return None
+
+    negate = line.startswith('!')
+    if negate:
+        line = line[1:]
+    elif line.startswith('\\!') or line.startswith('\\#'):
+        line = line[1:]
+
+    dir_only = line.endswith('/')
+    line = line.rstrip('/')
+    if not line:
+        return None
+
+    # 含有 / 的规则相对于规则文件所在目录锚定，否则匹配任意层级的文件名
+    if '/' in line:
+        regex = translate_glob(line.lstrip('/'))
+    else:
+        regex = '(?:.*/)?' + translate_glob(line)
+    return regex, negate, dir_only
+
+
+class RuleSet:
+    """一个规则文件（或一组 glob）编译后的结果"""
+
+    def __init__(self, lines):
+        self.rules = [r for r in (parse_rule(line) for line in lines) if r is not None]
+        self.has_negation = any(negate for _, negate, _ in self.rules)
+
+        if self.has_negation:
+            # 有否定规则时必须按“最后一条匹配的规则生效”逐条判断
+            self.compiled = [(re.compile(f'^(?:{regex})$'), negate, dir_only)
+                             for regex, negate, dir_only in self.rules]
+        else:
+            # 没有否定规则时合并成一个正则，一次匹配
+            self.dir_regex = self._combine(r for r, _, _ in self.rules)
+            self.file_regex = self._combine(r for r, _, dir_only in self.rules if not dir_only)
+
+    @staticmethod
+    def _combine(regexes):
+        regexes = list(regexes)
+        if not regexes:
+            return None
+        return re.compile('^(?:' + '|'.join(f'(?:{r})' for r in regexes) + ')$')
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def match(self, rel_path, is_dir):
+        """返回 True（忽略）、False（被 ! 重新包含）或 None（没有规则匹配）"""
+        if self.has_negation:
+            for regex, negate, dir_only in reversed(self.compiled):
+                if dir_only and not is_dir:
+                    continue
+                if regex.match(rel_path):
+                    return not negate
+            return None
+
+        regex = self.dir_regex if is_dir else self.file_regex
+        if regex is not None and regex.match(rel_path):
+            return True
+        return None
+
+
+def default_rules():
+    """IGNORE_DIRS / IGNORE_EXTS 对应的内置规则"""
+    lines = [f'{d}/' for d in sorted(IGNORE_DIRS)]
+    lines += ['*' + ''.join(f'[{c.lower()}{c.upper()}]' if c.isalpha() else re.escape(c) for c in ext)
+              for ext in sorted(IGNORE_EXTS)]
+    return lines
+
+
+class PathFilter:
+    """
+    root: 项目根目录
+    extra_globs: 用户自定义的 gitignore 风格规则，优先级最高（支持 ! 重新包含）
+    use_gitignore: 是否读取各级目录中的 .gitignore / .ignore
+    """
+
+    def __init__(self, root, extra_globs=None, use_gitignore=True):
+        self.root = os.path.abspath(root)
+        self.use_gitignore = use_gitignore
+        self.extra_globs = list(extra_globs or [])
+        self.user_rules = RuleSet(self.extra_globs)
+        self.default_rules = RuleSet(default_rules())
+        self._dir_rules = {}
+
+    def _rules_for(self, rel_dir):
+        """读取并编译某个目录下的规则文件（带缓存）"""
+        rules = self._dir_rules.get(rel_dir)
+        if rules is None:
+            rules = RuleSet(self._rule_lines(rel_dir) if self.use_gitignore else [])
+            self._dir_rules[rel_dir] = rules
+        return rules
+
+    def _rule_lines(self, rel_dir):
+        """目录 rel_dir 中各规则文件的所有行（archive.Archive 改为从归档成员读取）"""
+        lines = []
+        abs_dir = os.path.join(self.root, rel_dir) if rel_dir else self.root
+        for name in IGNORE_FILES:
+            try:
+                with open(os.path.join(abs_dir, name), encoding='utf-8', errors='replace') as f:
+                    lines.extend(f.read().splitlines())
+            except OSError:
+                pass
+        return lines
+
+    def reload_rules(self, dir_path):
+        """dir_path 中的规则文件被修改后调用，下次匹配时重新读取"""
+        rel_dir = self.relpath(dir_path)
+        if rel_dir is not None:
+            self._dir_rules.pop(rel_dir, None)
+
+    def is_ignored(self, rel_path, is_dir):
+        """rel_path 为相对于根目录、以 / 分隔的路径；只判断路径本身，不检查祖先目录"""
+        result = self.user_rules.match(rel_path, is_dir)
+        if result is not None:
+            return result
+
+        if self.use_gitignore:
+            # 从最深的规则文件开始，越深优先级越高
+            parts = rel_path.split('/')
+            for depth in range(len(parts) - 1, -1, -1):
+                rules = self._rules_for('/'.join(parts[:depth]))
+                if rules:
+                    result = rules.match('/'.join(parts[depth:]), is_dir)
+                    if result is not None:
+                        return result
+
+        return bool(self.default_rules.match(rel_path, is_dir))
+
+    def is_path_ignored(self, rel_path, is_dir=False):
+        """与 is_ignored 相同，但祖先目录被忽略时也返回 True（用于不经遍历得到的路径）"""
+        parts = rel_path.split('/')
+        for depth in range(1, len(parts)):
+            if self.is_ignored('/'.join(parts[:depth]), True):
+                return True
+        return self.is_ignored(rel_path, is_dir)
+
+    def relpath(self, path):
+        """绝对路径 -> 相对于根目录的 / 分隔路径；不在根目录下时返回 None"""
+        rel = os.path.relpath(os.path.abspath(path), self.root)
+        if rel == os.curdir:
+            return ''
+        if rel == os.pardir or rel.startswith(os.pardir + os.sep):
+            return None
+        return rel.replace(os.sep, '/')
+
+    def filter_entries(self, dir_path, entries):
+        """过滤目录 dir_path 下的 (name, is_dir) 列表，返回保留的项"""
+        rel_dir = self.relpath(dir_path)
+        if rel_dir is None:
+            return list(entries)
+        prefix = rel_dir + '/' if rel_dir else ''
+        return [(name, is_dir) for name, is_dir in entries
+                if not self.is_ignored(prefix + name, is_dir)]
+
+    def list_dir(self, dir_path):
+        """
+        用 os.scandir 列出 dir_path 的直接子项并过滤，返回排序后的 (name, is_dir) 列表：文件夹在前。
+        DirEntry 自带类型信息，大多数平台上不需要为每一项额外 stat。
+        """
+        entries = []
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                entries.append((entry.name, is_dir))
+        entries = self.filter_entries(dir_path, entries)
+        entries.sort(key=lambda e: (not e[1], e[0]))
+        return entries
+
+    def walk(self, top):
+        """与 os.walk 相同，但被忽略的目录在列出之前就被剪掉，被忽略的文件不会出现在结果中"""
+        if self.relpath(top) is None:
+            # 不在根目录下：以 top 为根单独过滤
+            yield from PathFilter(top, self.extra_globs, self.use_gitignore).walk(top)
+            return
+
+        for root, dirs, files in os.walk(top):
+            rel_root = self.relpath(root)
+            prefix = rel_root + '/' if rel_root else ''
+            dirs[:] = [d for d in dirs if not self.is_ignored(prefix + d, True)]
+            files = [f for f in files if not self.is_ignored(prefix + f, False)]
+            yield root, dirs, files
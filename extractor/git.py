@@ -0,0 +1,169 @@
+"""
+本地 git 仓库中的改动：列出相对某个提交（默认 HEAD，即未提交的改动）变化过的文件，
+以及每个文件的统一格式 diff，供“只选改动的文件”和“只输出 diff”使用。
+
+只调用本地的 git 命令，不访问远程。ref 以 ... 结尾时（如 main...）与 HEAD 的合并基点比较，
+即“这个分支上改过的所有内容”，包括尚未提交的改动。未跟踪的文件（.gitignore 忽略的除外）算作新文件。
+"""
+import os
+import subprocess
+
+from .encoding import SNIFF_SIZE, decode_bytes, sniff
+from .engine import TYPE_DIR, TYPE_FILE
+
+DEFAULT_REF = 'HEAD'
+DEFAULT_CONTEXT = 3
+
+# 还没有任何提交的仓库中与“空树”比较
+EMPTY_TREE = '4b825dc642cb6eb9a060e54bf8d69288fbee4904'
+
+# git diff --name-status 的状态字母
+STATUS_ADDED = 'A'
+STATUS_DELETED = 'D'
+STATUS_UNTRACKED = '?'
+
+
+class GitError(Exception):
+    """git 不可用、不是 git 仓库或 ref 无效"""
+
+
+def git(root, *args):
+    """在 root 中执行 git 命令，返回标准输出的字节；失败时抛出 GitError"""
+    # 只读命令不需要刷新索引文件，避免与编辑器里的 git 争用 index.lock
+    env = dict(os.environ, GIT_OPTIONAL_LOCKS='0')
+    try:
+        proc = subprocess.run(['git', '-C', root, *args], capture_output=True, env=env,
+                              creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+    except OSError as e:
+        raise GitError(f"git is not available: {e}")
+    if proc.returncode != 0:
+        lines = proc.stderr.decode('utf-8', 'replace').strip().splitlines()
+        raise GitError(lines[0] if lines else f"git {args[0]} failed with exit code {proc.returncode}")
+    return proc.stdout
+
+
+def resolve_base(root, ref=DEFAULT_REF):
+    """把 ref 解析成提交的 id；ref... 取与 HEAD 的合并基点；还没有提交时 HEAD 解析为空树"""
+    git(root, 'rev-parse', '--is-inside-work-tree')  # 不是仓库时在这里报错，而不是退回到空树
+    if ref.endswith('...'):
+        return git(root, 'merge-base', ref[:-3] or DEFAULT_REF, 'HEAD').decode().strip()
+    try:
+        return git(root, 'rev-parse', '--verify', '--quiet', ref + '^{commit}').decode().strip()
+    except GitError:
+        if ref == DEFAULT_REF:
+            return EMPTY_TREE
+        raise GitError(f"unknown revision: {ref}")
+
+
+def _decode(data):
+    text, _ = decode_bytes(data, sniff(data[:SNIFF_SIZE]))
+    return text if text is not None else data.decode('utf-8', 'replace')
+
+
+class GitDiff:
+    """
+    root（可以是仓库中的子目录）下相对 ref 的改动。load_changes() 只列出文件，
+    load() 再取出所有文件的 diff；两者都只执行一次。路径都是绝对路径。
+
+    path_filter: 与文件树共用的 PathFilter，被过滤掉的文件不列出（如已提交的 dist/）
+    """
+
+    def __init__(self, root, ref=DEFAULT_REF, context=DEFAULT_CONTEXT, path_filter=None):
+        self.root = os.path.abspath(root)
+        self.ref = ref or DEFAULT_REF
+        self.context = context
+        self.path_filter = path_filter
+        self.base = None
+        self.changes = None  # [(status, path, old_path)]，old_path 只在重命名时不为 None
+        self.patches = None  # {path: diff 文本}，新文件不在其中
+        self.new = set()
+        self.deleted = set()
+
+    def _abs(self, rel):
+        return os.path.join(self.root, *rel.split('/'))
+
+    def _kept(self, rel):
+        return self.path_filter is None or not self.path_filter.is_path_ignored(rel)
+
+    def load_changes(self):
+        if self.changes is not None:
+            return self.changes
+        self.base = resolve_base(self.root, self.ref)
+        fields = git(self.root, 'diff', '--relative', '-M', '-z', '--name-status', self.base, '--').split(b'\0')
+        changes = []
+        i = 0
+        while i < len(fields) - 1:
+            status = fields[i].decode()[:1]
+            if status in 'RC':
+                old, rel = fields[i + 1], fields[i + 2]
+                i += 3
+            else:
+                old, rel = None, fields[i + 1]
+                i += 2
+            rel = os.fsdecode(rel)
+            changes.append((status, rel, os.fsdecode(old) if old is not None else None))
+        for rel in git(self.root, 'ls-files', '--others', '--exclude-standard', '-z').split(b'\0'):
+            if rel:
+                changes.append((STATUS_UNTRACKED, os.fsdecode(rel), None))
+
+        self.changes = [(status, self._abs(rel), old and self._abs(old))
+                        for status, rel, old in sorted(changes, key=lambda c: c[1]) if self._kept(rel)]
+        self.new = {path for status, path, _ in self.changes if status in (STATUS_ADDED, STATUS_UNTRACKED)}
+        self.deleted = {path for status, path, _ in self.changes if status == STATUS_DELETED}
+        return self.changes
+
+    def load(self):
+        """取出所有改动文件的 diff（一次 git diff，按文件切开）；新文件输出完整内容，不取 diff"""
+        if self.patches is not None:
+            return
+        self.load_changes()
+        tracked = [path for status, path, _ in self.changes if status != STATUS_UNTRACKED]
+        patches = {}
+        if tracked:
+            output = git(self.root, 'diff', '--relative', '-M', '--no-color', '--no-ext-diff',
+                         f'-U{self.context}', self.base, '--')
+            blocks = output.split(b'\ndiff --git ')
+            # 头部为 diff --git a/<旧路径> b/<新路径>，按新路径对应到文件
+            by_path = {}
+            for block in blocks:
+                header = block.split(b'\n', 1)[0]
+                by_path[header.rsplit(b' b/', 1)[-1]] = block if block.startswith(b'diff --git ') \
+                    else b'diff --git ' + block
+            for path in tracked:
+                if path in self.new:
+                    continue
+                rel = os.fsencode(os.path.relpath(path, self.root).replace(os.sep, '/'))
+                block = by_path.get(rel)
+                if block is None:
+                    block = self._file_patch(path)  # 路径含特殊字符时 git 会给头部加引号
+                if block:
+                    patches[path] = _decode(block).rstrip('\n')
+        self.patches = patches
+
+    def _file_patch(self, path):
+        try:
+            return git(self.root, 'diff', '--relative', '-M', '--no-color', '--no-ext-diff',
+                       f'-U{self.context}', self.base, '--', path)
+        except GitError:
+            return None
+
+    def selection(self, include_deleted=False, within=None):
+        """
+        改动过的文件，格式与 Extractor 的 selected_paths 相同；已删除的文件只在输出 diff 时有意义。
+        within 为 selected_paths 格式的列表时，只保留其中的文件和文件夹下的文件。
+        """
+        paths = [path for status, path, _ in self.load_changes() if include_deleted or status != STATUS_DELETED]
+        if within is not None:
+            paths = select_within(paths, within)
+        return [(path, TYPE_FILE) for path in paths]
+
+    def deleted_under(self, selected_paths):
+        """selected_paths 中的文件夹下（或直接选中的）已删除的文件"""
+        return select_within(sorted(self.deleted), selected_paths)
+
+
+def select_within(paths, selected_paths):
+    """paths 中被 selected_paths 直接选中或位于其中某个文件夹下的路径，保持顺序"""
+    prefixes = tuple(os.path.join(path, '') for path, item_type in selected_paths if item_type == TYPE_DIR)
+    explicit = {path for path, item_type in selected_paths if item_type == TYPE_FILE}
+    return [path for path in paths if path in explicit or path.startswith(prefixes)]
@@ -0,0 +1,122 @@
+"""
+大纲（骨架）模式：只保留类和函数的签名、文档字符串和模块级常量，去掉函数体。
+
+Python 用 ast 解析后重新生成代码；其它带花括号的语言用按行扫描的轻量解析器，
+按花括号深度保留声明，省略函数体。这些函数都是纯函数，可以放进进程池并行执行。
+"""
+import ast
+import re
+
+from .compact import LEXERS, compact_text, lexer_for
+
+# 大纲算法变化时加一，让旧的缓存结果失效
+OUTLINE_VERSION = 1
+
+# 常量的值超过这个长度时用 ... 代替
+MAX_VALUE_LEN = 80
+
+# 用花括号界定代码块的语言（compact.LEXERS 中的名字）
+BRACE_LANGUAGES = ('c', 'csharp', 'jvm', 'go', 'javascript', 'typescript', 'dart')
+_BRACE_LEXERS = {id(LEXERS[name][0]) for name in BRACE_LANGUAGES}
+_PYTHON_LEXER = LEXERS['python'][0]
+
+
+def outline_supported(path):
+    """path 的类型是否能生成大纲"""
+    lexer = lexer_for(path)
+    return lexer is _PYTHON_LEXER or (lexer is not None and id(lexer) in _BRACE_LEXERS)
+
+
+def outline_key(path, text):
+    """大纲缓存的键：算法版本 + 语言 + 内容哈希，与文件路径和修改时间无关"""
+    import hashlib
+    digest = hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+    return f"{OUTLINE_VERSION}:{'py' if lexer_for(path) is _PYTHON_LEXER else 'brace'}:{digest}"
+
+
+def outline_text(path, text):
+    """生成 text 的大纲；不支持的类型或无法解析时返回 None"""
+    lexer = lexer_for(path)
+    if lexer is _PYTHON_LEXER:
+        return outline_python(text)
+    if lexer is not None and id(lexer) in _BRACE_LEXERS:
+        return outline_braced(compact_text(path, text))
+    return None
+
+
+# --- Python ---
+
+def outline_python(text):
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return None
+    tree.body = _outline_body(tree.body, module=True)
+    return ast.unparse(tree)
+
+
+def _outline_body(body, module=False):
+    result = []
+    for i, node in enumerate(body):
+        if i == 0 and _is_docstring(node):
+            result.append(node)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            node.body = [node.body[0]] if _is_docstring(node.body[0]) else []
+            node.body.append(ast.Expr(ast.Constant(...)))
+            result.append(node)
+        elif isinstance(node, ast.ClassDef):
+            node.body = _outline_body(node.body) or [ast.Expr(ast.Constant(...))]
+            result.append(node)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)) and module:
+            result.append(node)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)) and _is_constant(node, module):
+            if node.value is not None and len(ast.unparse(node.value)) > MAX_VALUE_LEN:
+                node.value = ast.Constant(...)
+            result.append(node)
+    return result
+
+
+def _is_docstring(node):
+    return isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) \
+        and isinstance(node.value.value, str)
+
+
+def _is_constant(node, module):
+    """模块级只保留全大写的常量和 __all__；类里的属性全部保留"""
+    if not module:
+        return True
+    targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+    return all(isinstance(t, ast.Name) and (t.id.isupper() or t.id == '__all__') for t in targets)
+
+
+# --- 花括号语言 ---
+
+# 这些关键字开头的代码块保留块内的声明，其它代码块（函数体、对象字面量等）整体省略
+_CONTAINER = re.compile(r'\b(?:class|interface|struct|enum|trait|impl|namespace|module|mod|object|'
+                        r'extension|protocol|record|union|extern)\b')
+_STRING = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`(?:\\.|[^`\\])*`')
+
+
+def outline_braced(text):
+    """text 已去掉注释。保留容器块里的各层声明，其它代码块替换成 { ... }"""
+    out = []
+    depth = 0
+    skip_depth = None      # 正在省略的代码块开始时的深度
+    pending_container = False  # 容器声明的 { 在下一行
+    for line in text.split('\n'):
+        code = _STRING.sub('""', line)
+        new_depth = max(0, depth + code.count('{') - code.count('}'))
+        if skip_depth is not None:
+            if new_depth <= skip_depth:
+                skip_depth = None
+        elif new_depth > depth and not (pending_container or _CONTAINER.search(code)):
+            out.append(line.rstrip() + ' ... }')
+            skip_depth = depth
+        else:
+            out.append(line)
+            stripped = code.strip()
+            if stripped:
+                pending_container = bool(_CONTAINER.search(code)) and new_depth == depth \
+                    and not stripped.endswith((';', '}'))
+        depth = new_depth
+    return '\n'.join(out)
@@ -0,0 +1,334 @@
+"""
+项目元数据索引：按项目保存过滤后的目录列表（含文件大小和修改时间），以及树的展开状态和上一次的勾选。
+
+列表是 PathFilter 过滤之后的结果，也就是保存了过滤判定；过滤规则（自定义 glob、是否读取 .gitignore）
+变化时该项目的索引整体作废。每个目录记录自身的 mtime 和从根目录到它的各级规则文件的指纹
+（上级的 .gitignore 同样决定这个目录的过滤判定），核对时只需 stat 目录和规则文件：
+没有变化就直接使用保存的列表，不再 scandir 和逐项匹配规则。
+目录 mtime 不反映文件内容的原地修改，所以保存的文件大小只用于预估进度，不用于判断缓存是否有效。
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .cache import LOCK_TIMEOUT, cache_dir
+from .filters import PathFilter, rules_fingerprint
+
+# 列表格式或默认过滤规则变化时加一，让旧索引失效
+INDEX_VERSION = 2
+
+# 最多保留的项目数，超出时删除最久未打开的项目
+MAX_PROJECTS = 20
+
+# 目录在列出前这么短时间内修改过时不记录 mtime（同一时间片内的后续修改无法察觉），下次总是重新列出
+RACY_NS = 2_000_000_000
+
+
+def index_path():
+    return os.path.join(cache_dir(), 'projects.sqlite')
+
+
+def filter_key(path_filter):
+    return json.dumps([INDEX_VERSION, path_filter.extra_globs, path_filter.use_gitignore])
+
+
+def _connect(path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=LOCK_TIMEOUT, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS projects ('
+        ' id INTEGER PRIMARY KEY, root TEXT UNIQUE, filter_key TEXT, opened INTEGER, state TEXT)')
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS dirs ('
+        ' project INTEGER, path TEXT, mtime_ns INTEGER, rules TEXT, entries TEXT,'
+        ' PRIMARY KEY (project, path))')
+    conn.commit()
+    return conn
+
+
+def recent_projects(limit=10, path=None):
+    """最近打开过的项目根目录，最近的在前；索引不可用时返回空列表"""
+    path = path or index_path()
+    if not os.path.exists(path):
+        return []
+    try:
+        conn = _connect(path)
+        try:
+            rows = conn.execute('SELECT root FROM projects ORDER BY opened DESC LIMIT ?', (limit,)).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return []
+    return [row[0] for row in rows]
+
+
+class ProjectIndex:
+    """
+    一个项目的元数据索引，提供与 PathFilter 相同的 list_dir() / walk()，结果经过核对后与重新列出一致。
+
+    线程安全：树的后台加载、核对任务和提取线程共用一个实例。
+    每次写入（一个目录的列表）立即提交，WAL 模式下提交不同步磁盘，代价很小；不会有事务一直占着写锁，
+    GUI、命令行和守护进程可以同时使用同一个索引。
+    """
+
+    def __init__(self, root, path_filter=None, path=None):
+        self.root = os.path.abspath(root)
+        self.path_filter = path_filter or PathFilter(self.root)
+        self.path = path or index_path()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = _connect(self.path)
+
+        key = filter_key(self.path_filter)
+        with self._lock:
+            row = self._conn.execute('SELECT id, filter_key FROM projects WHERE root = ?',
+                                     (self.root,)).fetchone()
+            if row is None:
+                self.project = self._conn.execute(
+                    'INSERT INTO projects (root, filter_key, opened) VALUES (?, ?, ?)',
+                    (self.root, key, time.time_ns())).lastrowid
+            else:
+                self.project = row[0]
+                self._conn.execute('UPDATE projects SET opened = ? WHERE id = ?', (time.time_ns(), self.project))
+                if row[1] != key:
+                    self._reset_dirs(key)
+            self._prune()
+            self._conn.commit()
+
+    def _reset_dirs(self, key):
+        self._conn.execute('DELETE FROM dirs WHERE project = ?', (self.project,))
+        self._conn.execute('UPDATE projects SET filter_key = ? WHERE id = ?', (key, self.project))
+
+    def _prune(self):
+        stale = [row[0] for row in self._conn.execute(
+            'SELECT id FROM projects ORDER BY opened DESC LIMIT -1 OFFSET ?', (MAX_PROJECTS,))]
+        for project in stale:
+            self._conn.execute('DELETE FROM dirs WHERE project = ?', (project,))
+            self._conn.execute('DELETE FROM projects WHERE id = ?', (project,))
+
+    def set_filter(self, path_filter):
+        """
+        过滤规则变化：规则不同时丢弃已保存的目录列表。
+        数据库被锁住、无法丢弃时抛出 sqlite3.Error，调用方不能再使用这个索引（保存的是按旧规则过滤的列表）。
+        """
+        self.path_filter = path_filter
+        key = filter_key(path_filter)
+        with self._lock:
+            try:
+                row = self._conn.execute('SELECT filter_key FROM projects WHERE id = ?', (self.project,)).fetchone()
+                if row is None or row[0] != key:
+                    self._reset_dirs(key)
+                    self._conn.commit()
+            except sqlite3.Error:
+                self._conn.rollback()
+                raise
+
+    # --- 目录列表 ---
+
+    def _rel(self, dir_path):
+        return self.path_filter.relpath(dir_path)
+
+    def _rules(self, rel, chains=None):
+        """
+        从根目录到 rel 各级目录中规则文件的指纹，每级一项，以 ; 分隔：任何一级变化都使保存的列表失效。
+        chains 为一次遍历或核对中共用的 {rel: 指纹}，其中每一级目录的规则文件只 stat 一次。
+        """
+        if not self.path_filter.use_gitignore:
+            return ''
+        if chains is not None and rel in chains:
+            return chains[rel]
+        own = rules_fingerprint(self._abs(rel))
+        chain = self._rules(rel.rpartition('/')[0], chains) + ';' + own if rel else own
+        if chains is not None:
+            chains[rel] = chain
+        return chain
+
+    def _reload_changed_rules(self, rel, old, new):
+        """让 PathFilter 重新读取指纹发生变化的那几级目录中的规则文件"""
+        parts = rel.split('/') if rel else []
+        old = old.split(';')
+        for depth, fingerprint in enumerate(new.split(';')):
+            if depth >= len(old) or old[depth] != fingerprint:
+                self.path_filter.reload_rules(self._abs('/'.join(parts[:depth])))
+
+    def _row(self, rel):
+        with self._lock:
+            return self._conn.execute('SELECT mtime_ns, rules, entries FROM dirs WHERE project = ? AND path = ?',
+                                      (self.project, rel)).fetchone()
+
+    def cached_entries(self, dir_path):
+        """不经核对直接返回保存的列表 [(name, is_dir, size, mtime_ns)]，没有时返回 None"""
+        rel = self._rel(dir_path)
+        row = self._row(rel) if rel is not None else None
+        return None if row is None else [tuple(e) for e in json.loads(row[2])]
+
+    def check(self, dir_path, chains=None):
+        """
+        核对保存的列表：返回 (是否仍然有效, 规则文件是否变化)。
+        这个目录或任何一级上级目录的规则文件变化时，子孙目录的过滤判定也可能随之变化。
+        """
+        rel = self._rel(dir_path)
+        row = self._row(rel) if rel is not None else None
+        if row is None:
+            return False, False
+        try:
+            mtime_ns = os.stat(dir_path).st_mtime_ns
+        except OSError:
+            return False, False
+        rules_changed = row[1] != self._rules(rel, chains)
+        return row[0] == mtime_ns and not rules_changed, rules_changed
+
+    def stale_dirs(self, dir_paths):
+        """dir_paths 中需要重新列出的目录；规则文件变化的目录连同它的子孙一起返回"""
+        stale = []
+        changed_rules = []
+        chains = {}
+        for dir_path in sorted(dir_paths):
+            if any(dir_path.startswith(prefix) for prefix in changed_rules):
+                stale.append(dir_path)
+                continue
+            valid, rules_changed = self.check(dir_path, chains)
+            if rules_changed:
+                changed_rules.append(os.path.join(dir_path, ''))
+            if not valid:
+                stale.append(dir_path)
+        return stale
+
+    def entries(self, dir_path, chains=None):
+        """
+        dir_path 的过滤后列表 [(name, is_dir, size, mtime_ns)]，已排序：文件夹在前；目录无法读取时抛出 OSError。
+        chains 见 _rules()，walk() 在整个遍历中共用一个。
+        """
+        rel = self._rel(dir_path)
+        if rel is None:
+            return [(name, is_dir, 0, 0) for name, is_dir in self.path_filter.list_dir(dir_path)]
+        row = self._row(rel)
+        mtime_ns = os.stat(dir_path).st_mtime_ns
+        rules = self._rules(rel, chains)
+        if row is not None and row[0] == mtime_ns and row[1] == rules:
+            self.hits += 1
+            return [tuple(e) for e in json.loads(row[2])]
+        self.misses += 1
+
+        forget = row is not None and row[1] != rules
+        if forget:
+            # 这一级或上级的规则文件变了：这个目录以下保存的过滤判定都不再可信
+            self._reload_changed_rules(rel, row[1], rules)
+        entries = self._scan(dir_path)
+        if time.time_ns() - mtime_ns < RACY_NS:
+            mtime_ns = -1
+        statements = [self._forget_tree(rel)] if forget else []
+        statements.append(('INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?)',
+                           (self.project, rel, mtime_ns, rules, json.dumps(entries, ensure_ascii=False))))
+        self._write(statements)
+        return entries
+
+    def _scan(self, dir_path):
+        """与 PathFilter.list_dir 相同，另外 stat 保留下来的文件"""
+        found = {}
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                found[entry.name] = (entry, is_dir)
+        kept = self.path_filter.filter_entries(dir_path, [(name, is_dir) for name, (_, is_dir) in found.items()])
+        kept.sort(key=lambda e: (not e[1], e[0]))
+        entries = []
+        for name, is_dir in kept:
+            size = mtime_ns = 0
+            if not is_dir:
+                try:
+                    st = found[name][0].stat()
+                    size, mtime_ns = st.st_size, st.st_mtime_ns
+                except OSError:
+                    pass
+            entries.append((name, is_dir, size, mtime_ns))
+        return entries
+
+    def _forget_tree(self, rel):
+        """删除 rel 的所有子孙目录的列表的语句"""
+        prefix = rel + '/' if rel else ''
+        return ('DELETE FROM dirs WHERE project = ? AND substr(path, 1, ?) = ? AND path != ?',
+                (self.project, len(prefix), prefix, rel))
+
+    def _write(self, statements):
+        """
+        在一个事务中执行 [(sql, params)] 并立即提交。数据库被其它进程锁住时放弃这次写入并回滚：
+        列表照常返回，只是下次还要重新列出。
+        """
+        with self._lock:
+            try:
+                for sql, params in statements:
+                    self._conn.execute(sql, params)
+                self._conn.commit()
+            except sqlite3.Error:
+                self._conn.rollback()
+
+    def list_dir(self, dir_path):
+        """与 PathFilter.list_dir 相同的 (name, is_dir) 列表，供树的懒加载和刷新使用"""
+        return [(name, is_dir) for name, is_dir, _, _ in self.entries(dir_path)]
+
+    def walk(self, top, sizes=None):
+        """
+        与 PathFilter.walk 相同的 (root, dirs, files)，按树的顺序（文件夹在前、按名称）先序遍历；
+        未变化的目录直接取保存的列表。给出 sizes 时把文件大小记入其中（path -> size）。
+        """
+        if self._rel(top) is None:
+            yield from self.path_filter.walk(top)
+            return
+        stack = [top]
+        chains = {}
+        while stack:
+            dir_path = stack.pop()
+            try:
+                entries = self.entries(dir_path, chains)
+            except OSError:
+                continue
+            dirs = [name for name, is_dir, _, _ in entries if is_dir]
+            files = [name for name, is_dir, _, _ in entries if not is_dir]
+            if sizes is not None:
+                for name, is_dir, size, _ in entries:
+                    if not is_dir:
+                        sizes[os.path.join(dir_path, name)] = size
+            yield dir_path, dirs, files
+            stack.extend(os.path.join(dir_path, name) for name in reversed(dirs))
+
+    # --- 树和勾选的状态 ---
+
+    def load_state(self):
+        """上一次保存的 (已加载的目录, 已展开的目录, 勾选项)：前两项为绝对路径列表，勾选项为 (path, type) 列表"""
+        with self._lock:
+            row = self._conn.execute('SELECT state FROM projects WHERE id = ?', (self.project,)).fetchone()
+        state = json.loads(row[0]) if row is not None and row[0] else {}
+        return ([self._abs(rel) for rel in state.get('loaded', ())],
+                [self._abs(rel) for rel in state.get('expanded', ())],
+                [(self._abs(rel), item_type) for rel, item_type in state.get('selection', ())])
+
+    def save_state(self, loaded_dirs, expanded_dirs, selection):
+        """保存树中已加载、已展开的目录和勾选项（按相对路径保存，不在根目录下的忽略）"""
+        state = {
+            'loaded': [rel for rel in map(self._rel, loaded_dirs) if rel is not None],
+            'expanded': [rel for rel in map(self._rel, expanded_dirs) if rel is not None],
+            'selection': [(rel, item_type) for rel, item_type in
+                          ((self._rel(path), item_type) for path, item_type in selection) if rel is not None],
+        }
+        self._write([('UPDATE projects SET state = ? WHERE id = ?',
+                      (json.dumps(state, ensure_ascii=False), self.project))])
+
+    def _abs(self, rel):
+        return os.path.join(self.root, *rel.split('/')) if rel else self.root
+
+    def flush(self):
+        with self._lock:
+            self._conn.commit()
+
+    def close(self):
+        self.flush()
+        self._conn.close()
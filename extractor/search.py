@@ -0,0 +1,257 @@
+"""
+项目内的文件名和内容搜索，索引全部在内存中，在后台构建。
+
+文件名：每个名称（文件或目录的最后一段）的三元组（trigram）建倒排表，
+查询时只统计包含查询三元组的条目，按命中比例模糊匹配，不扫描全部路径；
+查询中 / 或空格分隔的前几段必须出现在所在目录的路径中（如 "gui model" 或 "gui/model"）。
+内容：每个文本文件中的单词（字母数字串）的三元组建倒排表，取交集得到候选文件后再读出内容确认
+（与 codesearch 的做法相同，只是跨单词的三元组不入索引，建索引快得多）。
+"""
+import os
+import re
+from array import array
+from collections import Counter
+
+# 名称至少命中查询三元组的这个比例才算匹配，容忍拼写错误
+FUZZY_RATIO = 0.6
+
+DEFAULT_LIMIT = 500
+
+# 内容索引跳过超过这个大小的文件（字符数），三元组集合的构建开销与长度成正比
+CONTENT_MAX_CHARS = 512 * 1024
+# 内容索引的倒排表总长度上限（每项 4 字节），超出后不再加入文件，索引标记为不完整
+CONTENT_MAX_POSTINGS = 32_000_000
+
+_SPLIT = re.compile(r'[\s/\\]+')
+_WORD = re.compile(r'\w{3,}')
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def word_trigrams(text):
+    """text 中每个不少于 3 个字符的单词的三元组（text 已转成小写）"""
+    grams = set()
+    for word in set(_WORD.findall(text)):
+        grams.update(trigrams(word))
+    return grams
+
+
+def _add_postings(postings, keys, item):
+    for key in keys:
+        ids = postings.get(key)
+        if ids is None:
+            ids = postings[key] = array('i')
+        ids.append(item)
+
+
+def _intersect(postings, keys):
+    """keys 的倒排表的交集；从最短的开始，某个三元组不存在时直接返回空"""
+    lists = []
+    for key in keys:
+        ids = postings.get(key)
+        if ids is None:
+            return set()
+        lists.append(ids)
+    lists.sort(key=len)
+    result = set(lists[0])
+    for ids in lists[1:]:
+        result.intersection_update(ids)
+        if not result:
+            break
+    return result
+
+
+class PathIndex:
+    """
+    项目中所有未被过滤的文件和目录，结构与 tree_index.FileIndex 相同：每个条目只存名称和父目录，
+    完整路径在需要时拼出来。相同的名称（__init__.py、index.ts 等）只建一次倒排表，
+    查询时按不同的名称打分，50 万条路径时也只占几十 MB。
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.names = []          # 名称编号 -> 小写名称
+        self.name_items = []     # 名称编号 -> [条目]
+        self.item_name = array('i')
+        self.real_names = []     # 条目 -> 原始名称
+        self.parent = array('i')
+        self.is_dir = bytearray()
+        self._name_ids = {}
+        self._postings = {}      # 三元组 -> array(名称编号)
+        self._dir_ids = {root: -1}
+
+    def __len__(self):
+        return len(self.item_name)
+
+    def add(self, parent, name, is_dir):
+        item = len(self.item_name)
+        lower = name.lower()
+        name_id = self._name_ids.get(lower)
+        if name_id is None:
+            name_id = self._name_ids[lower] = len(self.names)
+            self.names.append(lower)
+            self.name_items.append([])
+            _add_postings(self._postings, trigrams(lower), name_id)
+        self.name_items[name_id].append(item)
+        self.item_name.append(name_id)
+        self.real_names.append(name)
+        self.parent.append(parent)
+        self.is_dir.append(is_dir)
+        return item
+
+    @classmethod
+    def build(cls, root, walk, should_stop=None):
+        """
+        walk 为 PathFilter.walk / ProjectIndex.walk 这类 (root, dirs, files) 的迭代器。
+        should_stop() 返回 True 时提前结束，返回已建好的部分。
+        """
+        index = cls(root)
+        for dir_path, dirs, files in walk:
+            if should_stop is not None and should_stop():
+                break
+            parent = index._dir_ids.pop(dir_path, None)
+            if parent is None:
+                continue
+            for name in dirs:
+                index._dir_ids[os.path.join(dir_path, name)] = index.add(parent, name, True)
+            for name in files:
+                index.add(parent, name, False)
+        index._dir_ids = {}
+        return index
+
+    def file_paths(self):
+        """所有文件的绝对路径，按遍历顺序"""
+        return [os.path.join(self.root, *self.rel_path(item).split('/'))
+                for item in range(len(self.item_name)) if not self.is_dir[item]]
+
+    def rel_path(self, item, lower=False):
+        parts = []
+        while item >= 0:
+            parts.append(self.names[self.item_name[item]] if lower else self.real_names[item])
+            item = self.parent[item]
+        return '/'.join(reversed(parts))
+
+    def _match_names(self, term):
+        """term 模糊匹配的名称 {名称编号: 得分}"""
+        if len(term) < 3:
+            # 太短没有三元组：只按前缀匹配
+            return {name_id: 1.5 for name_id, name in enumerate(self.names) if name.startswith(term)}
+        grams = trigrams(term)
+        counts = Counter()
+        for gram in grams:
+            counts.update(self._postings.get(gram, ()))
+        total = len(grams)
+        need = max(1, int(total * FUZZY_RATIO + 0.999))
+        names = self.names
+        scores = {}
+        for name_id, hits in counts.items():
+            if hits < need:
+                continue
+            score = hits / total
+            # 三元组全部命中时才可能是子串
+            if hits == total and term in names[name_id]:
+                score += 1.5 if names[name_id].startswith(term) else 1.0
+            scores[name_id] = score
+        return scores
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """
+        返回 [(rel_path, is_dir)]，最相关的在前。最后一段模糊匹配名称，前面各段必须出现在目录路径中。
+        """
+        terms = [t for t in _SPLIT.split(query.lower()) if t]
+        if not terms:
+            return []
+        name_term, dir_terms = terms[-1], terms[:-1]
+        scores = self._match_names(name_term)
+        # 同分时名称越短越靠前
+        ranked = sorted(scores, key=lambda name_id: (-scores[name_id], len(self.names[name_id])))
+
+        results = []
+        dir_ok = {-1: False}
+        for name_id in ranked:
+            for item in self.name_items[name_id]:
+                if dir_terms:
+                    parent = self.parent[item]
+                    ok = dir_ok.get(parent)
+                    if ok is None:
+                        dir_path = self.rel_path(parent, lower=True)
+                        ok = dir_ok[parent] = all(term in dir_path for term in dir_terms)
+                    if not ok:
+                        continue
+                results.append((self.rel_path(item), bool(self.is_dir[item])))
+                if len(results) >= limit:
+                    return results
+        return results
+
+
+class ContentIndex:
+    """
+    文本文件内容的三元组倒排表（不区分大小写）。只保存文件编号，不保存内容；
+    查询时由调用方提供 read(rel_path) 读出候选文件确认，通常经由 ContentCache，不会重新解码。
+    """
+
+    def __init__(self, max_chars=CONTENT_MAX_CHARS, max_postings=CONTENT_MAX_POSTINGS):
+        self.max_chars = max_chars
+        self.max_postings = max_postings
+        self.paths = []
+        self.skipped = 0
+        self.truncated = False
+        self.postings = 0
+        self._postings = {}
+
+    def __len__(self):
+        return len(self.paths)
+
+    def add(self, rel_path, text):
+        """加入一个文件；文件过大或索引已满时返回 False"""
+        if len(text) > self.max_chars or self.truncated:
+            self.skipped += 1
+            return False
+        grams = word_trigrams(text.lower())
+        if self.postings + len(grams) > self.max_postings:
+            self.truncated = True
+            self.skipped += 1
+            return False
+        self.postings += len(grams)
+        item = len(self.paths)
+        self.paths.append(rel_path)
+        _add_postings(self._postings, grams, item)
+        return True
+
+    @classmethod
+    def build(cls, root, decoded, should_stop=None, **kwargs):
+        """decoded 为 (file_path, content) 的迭代器（如 Extractor.iter_decoded），content 为 None 的文件跳过"""
+        index = cls(**kwargs)
+        for file_path, content in decoded:
+            if should_stop is not None and should_stop():
+                break
+            if content is not None:
+                index.add(os.path.relpath(file_path, root).replace(os.sep, '/'), content)
+        return index
+
+    def search(self, query, read, limit=DEFAULT_LIMIT):
+        """
+        返回 [(rel_path, line_no, line)]：内容包含 query（不区分大小写）的文件及第一处匹配所在的行。
+        query 中没有不少于 3 个字符的单词时没有三元组可用，返回空列表。
+        """
+        needle = query.lower()
+        grams = word_trigrams(needle)
+        if not grams:
+            return []
+        results = []
+        for item in sorted(_intersect(self._postings, grams)):
+            rel_path = self.paths[item]
+            text = read(rel_path)
+            if text is None:
+                continue
+            pos = text.lower().find(needle)
+            if pos < 0:
+                continue  # 三元组都在，但不相邻
+            start = text.rfind('\n', 0, pos) + 1
+            end = text.find('\n', pos)
+            results.append((rel_path, text.count('\n', 0, pos) + 1, text[start:end if end >= 0 else None].strip()))
+            if len(results) >= limit:
+                break
+        return results
@@ -0,0 +1,194 @@
+"""
+三态勾选引擎，独立于 Qt 控件。
+
+每个目录维护两个计数：有多少个子节点是“全选”，有多少个是“部分选中”。
+勾选/取消一个节点时只需沿祖先链更新计数，状态不变即停止，代价为 O(depth)。
+
+对目录整体勾选/取消时不会立即改写所有子孙，而是给该目录打上“整棵子树一致”（uniform）标记；
+子孙的状态以最高处的 uniform 祖先为准，直到某个子孙被单独修改时才沿路径把标记下推一层。
+未加载的目录被勾选时，这个标记就表示“整个目录全选”。
+"""
+from array import array
+
+from .tree_index import FileIndex
+
+# 勾选状态，与 Qt.CheckState 的整数值一致
+UNCHECKED = 0
+PARTIAL = 1
+CHECKED = 2
+
+# selected_paths 中的类型标记（与 engine 一致）
+_TYPE_FILE = 0
+_TYPE_DIR = 1
+
+
+class Selection:
+    def __init__(self, index):
+        self.index = index
+        self.states = bytearray()
+        self.uniform = bytearray()
+        self.n_checked = array('i')
+        self.n_partial = array('i')
+        self._grow()
+
+    def _grow(self):
+        """索引新增节点后补齐数组"""
+        missing = len(self.index) - len(self.states)
+        if missing > 0:
+            self.states.extend(bytes(missing))
+            self.uniform.extend(bytes(missing))
+            self.n_checked.extend([0] * missing)
+            self.n_partial.extend([0] * missing)
+
+    def memory_usage(self):
+        return len(self.states) + len(self.uniform) + 4 * (len(self.n_checked) + len(self.n_partial))
+
+    # --- 查询 ---
+
+    def state(self, node):
+        """节点的实际状态：若有 uniform 祖先，以最高处的那个为准"""
+        parent = self.index.parent
+        governing = node
+        current = parent[node]
+        while current >= 0:
+            if self.uniform[current]:
+                governing = current
+            current = parent[current]
+        return self.states[governing]
+
+    def _derive(self, node):
+        """由计数推导已加载目录的状态"""
+        count = self.index.child_count(node)
+        checked = self.n_checked[node]
+        if count and checked == count:
+            return CHECKED
+        if checked or self.n_partial[node]:
+            return PARTIAL
+        return UNCHECKED
+
+    # --- 修改 ---
+
+    def _push_down(self, node):
+        """把 node 的 uniform 标记下推到直接子节点"""
+        state = self.states[node]
+        children = self.index.children(node)
+        for child in children:
+            self.states[child] = state
+            if self.index.is_dir(child):
+                self.uniform[child] = 1
+        self.n_checked[node] = len(children) if state == CHECKED else 0
+        self.n_partial[node] = 0
+        self.uniform[node] = 0
+
+    def _materialize(self, node):
+        """从根到 node 的父节点逐层下推 uniform 标记，使 node 及其兄弟的状态成为真实值"""
+        path = []
+        current = self.index.parent[node]
+        while current >= 0:
+            path.append(current)
+            current = self.index.parent[current]
+        for ancestor in reversed(path):
+            if self.uniform[ancestor]:
+                self._push_down(ancestor)
+
+    def set_state(self, node, state):
+        """
+        勾选（CHECKED）或取消（UNCHECKED）一个节点及其整个子树。
+        返回状态发生变化的祖先列表（由近及远，不含 node 本身和根），供视图刷新对应的行。
+        """
+        self._grow()
+        self._materialize(node)
+        old = self.states[node]
+        self.states[node] = state
+        if self.index.is_dir(node):
+            self.uniform[node] = 1
+
+        return self._propagate(self.index.parent[node], old, state)
+
+    def _propagate(self, parent, old, new):
+        """某个子节点的状态由 old 变为 new：沿祖先链更新计数，返回状态变化的祖先"""
+        changed = []
+        while parent >= 0 and old != new:
+            self.n_checked[parent] += (new == CHECKED) - (old == CHECKED)
+            self.n_partial[parent] += (new == PARTIAL) - (old == PARTIAL)
+            old = self.states[parent]
+            new = self._derive(parent)
+            if parent != FileIndex.ROOT and old != new:
+                self.states[parent] = new
+                changed.append(parent)
+            parent = self.index.parent[parent]
+        return changed
+
+    def on_children_added(self, node, ids):
+        """
+        node 下新加载了一批子节点：父节点全选时继承全选，否则默认不选。
+        返回状态因此变化的节点列表（例如子节点被全部删除后又新增了未勾选的子节点）。
+        """
+        self._grow()
+        if not ids or self.uniform[node] or self._has_uniform_ancestor(node):
+            # 由 uniform 标记统一决定，下推时再写入
+            return []
+        if self.states[node] == CHECKED:
+            for child in ids:
+                self.states[child] = CHECKED
+            self.n_checked[node] += len(ids)
+        return self._rederive(node)
+
+    def on_children_removed(self, node, removed):
+        """
+        node 的一些子节点被删除（文件系统变化）：扣除它们的计数并向上更新。
+        返回状态变化的节点列表（含 node 本身）。
+        """
+        if self.uniform[node] or self._has_uniform_ancestor(node):
+            return []
+        for child in removed:
+            state = self.states[child]
+            self.n_checked[node] -= state == CHECKED
+            self.n_partial[node] -= state == PARTIAL
+        return self._rederive(node)
+
+    def _rederive(self, node):
+        """子节点集合变化后重新推导 node 的状态并向上传播；空目录保留原状态"""
+        if node == FileIndex.ROOT or not self.index.child_count(node):
+            return []
+        old = self.states[node]
+        new = self._derive(node)
+        if old == new:
+            return []
+        self.states[node] = new
+        return [node] + self._propagate(self.index.parent[node], old, new)
+
+    def on_children_cleared(self, node):
+        """node 的子节点被丢弃（加载中途折叠）：清零计数，保留 node 自身的状态"""
+        self.n_checked[node] = 0
+        self.n_partial[node] = 0
+
+    def _has_uniform_ancestor(self, node):
+        current = self.index.parent[node]
+        while current >= 0:
+            if self.uniform[current]:
+                return True
+            current = self.index.parent[current]
+        return False
+
+    # --- 导出 ---
+
+    def collect(self, node=FileIndex.ROOT, result_list=None):
+        """
+        收集选中项，返回 (path, type) 列表：
+        全选的目录作为“全选目录”(type 1) 加入，不再递归；全选的文件作为 type 0；
+        部分选中的目录递归查找子节点。只访问部分选中的目录，不遍历整棵树。
+        """
+        if result_list is None:
+            result_list = []
+        if self.uniform[node]:
+            if self.states[node] == CHECKED and node != FileIndex.ROOT:
+                result_list.append((self.index.path(node), _TYPE_DIR))
+            return result_list
+        for child in self.index.children(node):
+            state = self.states[child]
+            if state == CHECKED:
+                result_list.append((self.index.path(child), _TYPE_DIR if self.index.is_dir(child) else _TYPE_FILE))
+            elif state == PARTIAL:
+                self.collect(child, result_list)
+        return result_list
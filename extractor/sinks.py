@@ -0,0 +1,139 @@
+"""
+输出目标（sink）：引擎把渲染结果按块写入 sink，而不是拼成一个大字符串。
+
+写文件、stdout 或管道时内存占用与选中内容的总量无关；
+只有 StringSink（剪贴板等必须拿到完整文本的场景）才会保留全部内容；
+PartSink 按文件边界拆成多个小文件，可以逐个复制。
+"""
+import io
+import os
+import sys
+
+
+class Sink:
+    """输出目标的基类：write() 接收一块文本，close() 结束输出"""
+
+    def write(self, chunk):
+        raise NotImplementedError
+
+    def begin_section(self, rel_path, content, tokens):
+        """每个文件的段落写入前调用；tokens 为整个段落的估算值。默认忽略"""
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class StreamSink(Sink):
+    """写入已打开的文本流（stdout、管道等），不负责关闭它"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes_written = 0
+
+    def write(self, chunk):
+        self.stream.write(chunk)
+        self.bytes_written += len(chunk)
+
+    def close(self):
+        self.stream.flush()
+
+
+class FileSink(StreamSink):
+    """写入文件（UTF-8），关闭时一并关闭文件"""
+
+    def __init__(self, path):
+        self.path = path
+        super().__init__(open(path, 'w', encoding='utf-8', newline=''))
+
+    def close(self):
+        if not self.stream.closed:
+            self.stream.close()
+
+
+class StringSink(Sink):
+    """把结果留在内存中，用于剪贴板等需要完整文本的目标"""
+
+    def __init__(self):
+        self.buffer = io.StringIO()
+
+    def write(self, chunk):
+        self.buffer.write(chunk)
+
+    def getvalue(self):
+        return self.buffer.getvalue()
+
+
+class PartSink(Sink):
+    """
+    按文件边界把输出拆成若干部分，依次写入 directory 下的 part-0001.md、part-0002.md ……
+    每部分不超过 max_bytes 字节（UTF-8）和 max_tokens 个 token（估算），
+    单个文件本身超过上限时独占一部分。每部分以 "<!-- Part N of M -->" 开头，M 在 close() 时回填。
+    """
+
+    # M 的位置预留固定宽度，结束时原地覆盖，不必重写整个文件
+    HEADER = "<!-- Part {n} of {m:<8}-->\n\n"
+
+    def __init__(self, directory, max_bytes=None, max_tokens=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_tokens = max_tokens
+        self.parts = []        # 各部分的文件路径
+        self.part_tokens = []  # 各部分的 token 估算值
+        self._file = None
+        self._bytes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def begin_section(self, rel_path, content, tokens):
+        size = len(content) if content.isascii() else len(content.encode('utf-8'))
+        size += len(rel_path) + 32  # 标题行和代码块标记
+        if self._file is None or self._bytes and (
+                self.max_bytes is not None and self._bytes + size > self.max_bytes
+                or self.max_tokens is not None and self.part_tokens[-1] + tokens > self.max_tokens):
+            self._new_part()
+        self.part_tokens[-1] += tokens
+
+    def _new_part(self):
+        self._close_file()
+        path = os.path.join(self.directory, f"part-{len(self.parts) + 1:04d}.md")
+        self._file = open(path, 'wb')
+        self._file.write(self.HEADER.format(n=len(self.parts) + 1, m='').encode('utf-8'))
+        self.parts.append(path)
+        self.part_tokens.append(0)
+        self._bytes = 0
+
+    def write(self, chunk):
+        if self._file is None:
+            self._new_part()
+        data = chunk.encode('utf-8')
+        self._file.write(data)
+        self._bytes += len(data)
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        self._close_file()
+        total = len(self.parts)
+        for n, path in enumerate(self.parts, 1):
+            with open(path, 'r+b') as f:
+                f.write(self.HEADER.format(n=n, m=total).encode('utf-8'))
+
+    def read_part(self, index):
+        """第 index 部分（从 0 开始）的完整文本"""
+        with open(self.parts[index], encoding='utf-8', newline='') as f:
+            return f.read()
+
+
+def stdout_sink():
+    """标准输出；Windows 控制台默认编码可能不是 UTF-8"""
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(encoding='utf-8')
+    return StreamSink(sys.stdout)
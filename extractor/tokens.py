@@ -0,0 +1,65 @@
+"""
+离线的 token 数估算，以及按 token 预算挑选文件。
+
+不依赖任何分词器：ASCII 文本按约 4 个字符一个 token 估算（GPT 系列 BPE 对代码的常见比例），
+中日韩等多字节字符按每个字符一个 token 计。只求数量级准确，速度与一次编码相当。
+"""
+
+# ASCII 文本平均每个 token 的字符数
+CHARS_PER_TOKEN = 4
+
+# 预算装不下全部文件时的取舍策略
+PREFER_SMALL = 'small'    # 先放小文件，尽量多放几个
+PREFER_RECENT = 'recent'  # 先放最近修改的文件
+PREFERENCES = (PREFER_SMALL, PREFER_RECENT)
+
+
+def estimate_tokens(text):
+    """估算 text 的 token 数"""
+    if not text:
+        return 0
+    if text.isascii():
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    # UTF-8 下多出来的字节数：CJK 字符每个多 2 字节，带重音的拉丁字母多 1 字节
+    extra = len(text.encode('utf-8', 'surrogatepass')) - len(text)
+    wide = (extra + 1) // 2
+    return (len(text) - wide + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN + wide
+
+
+def format_tokens(count):
+    """1234 -> '1.2k'，2500000 -> '2.5M'"""
+    if count >= 1_000_000:
+        return f"{count / 1_000_000:.1f}M"
+    if count >= 1000:
+        return f"{count / 1000:.1f}k"
+    return str(count)
+
+
+def pack(candidates, budget, prefer=PREFER_SMALL):
+    """
+    candidates: [(path, tokens, explicit, mtime)]，按输出顺序排列
+    返回 (kept, dropped)，两者都保持 candidates 原来的顺序。
+
+    显式勾选的文件最先考虑，其余按 prefer 排序；放不下的文件跳过，
+    继续尝试后面的文件，因此剩余预算仍可能被更小的文件用掉。
+    """
+    if prefer == PREFER_RECENT:
+        def priority(i):
+            _, tokens, explicit, mtime = candidates[i]
+            return (not explicit, -mtime, tokens)
+    else:
+        def priority(i):
+            _, tokens, explicit, mtime = candidates[i]
+            return (not explicit, tokens, -mtime)
+
+    remaining = budget
+    keep = set()
+    for i in sorted(range(len(candidates)), key=priority):
+        tokens = candidates[i][1]
+        if tokens <= remaining:
+            keep.add(i)
+            remaining -= tokens
+
+    kept = [c for i, c in enumerate(candidates) if i in keep]
+    dropped = [c for i, c in enumerate(candidates) if i not in keep]
+    return kept, dropped
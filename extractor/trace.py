@@ -0,0 +1,151 @@
+"""
+一次提取的计时与统计：各阶段耗时、读取字节数、各编码处理的文件数、跳过的文件和最慢的文件。
+
+可导出为 JSON 摘要，或 Chrome trace 格式（chrome://tracing 或 ui.perfetto.dev 直接打开）。
+读取和解码在线程池中并行执行，阶段耗时是所有线程耗时之和，可能大于总耗时。
+"""
+import heapq
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# 阶段名，按流程顺序排列
+STAGE_WALK = 'walk'
+STAGE_DEPS = 'deps'
+STAGE_GIT = 'git'
+STAGE_CACHE = 'cache'
+STAGE_READ = 'read'
+STAGE_DECODE = 'decode'
+STAGE_OUTLINE = 'outline'
+STAGE_COMPACT = 'compact'
+STAGE_RENDER = 'render'
+STAGES = (STAGE_WALK, STAGE_DEPS, STAGE_GIT, STAGE_CACHE, STAGE_READ, STAGE_DECODE, STAGE_OUTLINE, STAGE_COMPACT,
+          STAGE_RENDER)
+
+# 默认列出的最慢文件数
+SLOWEST = 10
+
+# 最多保留的事件数（每个文件每个阶段一个），超出后只累计耗时，不再记录事件
+MAX_EVENTS = 200_000
+
+FORMAT_CHROME = 'chrome'
+FORMAT_JSON = 'json'
+FORMATS = (FORMAT_CHROME, FORMAT_JSON)
+
+
+class Trace:
+    """线程安全的计时记录，传给 Extractor(trace=...) 后由引擎填充"""
+
+    def __init__(self, slowest=SLOWEST, max_events=MAX_EVENTS):
+        self.slowest_count = slowest
+        self.max_events = max_events
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.start = time.perf_counter()
+        self.wall = 0.0
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.files = 0
+        self.bytes_read = 0
+        self.encodings = Counter()
+        self.skipped = Counter()
+        self.events = []  # [(stage, start, duration, thread_id, path)]
+        self.lost_events = 0
+        self._threads = {}
+        self._slowest = []  # 最小堆 [(seconds, path)]
+
+    def add(self, stage, start, end=None, path=None):
+        """记录 stage 在 [start, end) 内的耗时（perf_counter 秒），end 默认为现在"""
+        if end is None:
+            end = time.perf_counter()
+        thread = threading.current_thread()
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + (end - start)
+            if len(self.events) < self.max_events:
+                self.events.append((stage, start, end - start, thread.ident, path))
+                self._threads.setdefault(thread.ident, thread.name)
+            else:
+                self.lost_events += 1
+
+    @contextmanager
+    def span(self, stage, path=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, start, path=path)
+
+    def add_bytes(self, nbytes):
+        with self._lock:
+            self.bytes_read += nbytes
+
+    def file_done(self, path, seconds, encoding, skip=None):
+        """一个文件读取解码完毕：seconds 为该文件的总耗时，skip 为跳过原因（engine 的 SKIP_*）"""
+        with self._lock:
+            self.files += 1
+            if encoding is not None:
+                self.encodings[encoding] += 1
+            if skip is not None:
+                self.skipped[skip] += 1
+            if len(self._slowest) < self.slowest_count:
+                heapq.heappush(self._slowest, (seconds, path))
+            elif self._slowest and seconds > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, (seconds, path))
+
+    def finish(self):
+        self.wall = time.perf_counter() - self.start
+
+    # --- 输出 ---
+
+    def slowest(self):
+        """[(seconds, path)]，最慢的在前"""
+        return sorted(self._slowest, reverse=True)
+
+    def summary(self):
+        return {
+            'wall_seconds': self.wall,
+            'stages': {stage: seconds for stage, seconds in self.stages.items() if seconds or stage in STAGES},
+            'files': self.files,
+            'bytes_read': self.bytes_read,
+            'encodings': dict(self.encodings.most_common()),
+            'skipped': dict(self.skipped),
+            'slowest': [{'path': path, 'seconds': seconds} for seconds, path in self.slowest()],
+            'lost_events': self.lost_events,
+        }
+
+    def summary_lines(self, rel=None):
+        """人类可读的摘要；rel 用于把路径转换成相对路径"""
+        rel = rel or (lambda path: path)
+        lines = [f"Total: {self.wall * 1000:.0f} ms, {self.files} files, {self.bytes_read / 1024 / 1024:.1f} MB read"]
+        stages = ', '.join(f"{stage} {seconds * 1000:.0f} ms" for stage, seconds in self.stages.items() if seconds)
+        if stages:
+            lines.append(f"Stages (summed over threads): {stages}")
+        if self.encodings:
+            lines.append("Encodings: " + ', '.join(f"{enc} {n}" for enc, n in self.encodings.most_common()))
+        if self.skipped:
+            lines.append("Skipped: " + ', '.join(f"{status} {n}" for status, n in self.skipped.most_common()))
+        slowest = self.slowest()
+        if slowest:
+            lines.append("Slowest files:")
+            lines.extend(f"  {seconds * 1000:.1f} ms  {rel(path)}" for seconds, path in slowest)
+        return lines
+
+    def to_chrome(self):
+        """Chrome trace event 格式（JSON object 形式），摘要放在 otherData 中"""
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': name}}
+                  for tid, name in self._threads.items()]
+        for stage, start, duration, tid, path in self.events:
+            event = {'name': stage, 'cat': 'extract', 'ph': 'X', 'pid': 1, 'tid': tid,
+                     'ts': (start - self.start) * 1e6, 'dur': duration * 1e6}
+            if path is not None:
+                event['args'] = {'path': path}
+            events.append(event)
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': self.summary()}
+
+    def save(self, path, fmt=FORMAT_CHROME):
+        import json
+        data = self.to_chrome() if fmt == FORMAT_CHROME else self.summary()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=None if fmt == FORMAT_CHROME else 2)
@@ -0,0 +1,152 @@
+"""
+文件树的紧凑索引：每个节点只占几个数组槽位，而不是一个 Python 对象。
+
+- parent / row：父节点 id 和在父节点中的行号
+- name_off / name_len：文件名在共享 UTF-8 缓冲区中的位置
+- flags：is_dir / loaded 位
+
+节点 0 是根目录。已加载目录的子节点 id 列表保存在 array('i') 中。
+勾选状态不在这里，见 selection.Selection。
+"""
+import os
+from array import array
+
+FLAG_DIR = 1
+FLAG_LOADED = 2
+
+
+class FileIndex:
+    ROOT = 0
+
+    def __init__(self, root_path):
+        self.root_path = root_path
+        self.parent = array('i', [-1])
+        self.row = array('i', [0])
+        self.name_off = array('I', [0])
+        self.name_len = array('I', [0])
+        self.flags = bytearray([FLAG_DIR])
+        self.names = bytearray()
+        self._children = {}
+
+    def __len__(self):
+        return len(self.parent)
+
+    # --- 结构 ---
+
+    def add_children(self, node, entries):
+        """在 node 下追加一批 (name, is_dir)，返回新节点 id 列表"""
+        return self.insert_children(node, self.child_count(node), entries)
+
+    def insert_children(self, node, row, entries):
+        """在 node 的第 row 行之前插入一批 (name, is_dir)，返回新节点 id 列表"""
+        children = self._children.get(node)
+        if children is None:
+            children = self._children[node] = array('i')
+
+        first = len(self.parent)
+        start = row
+        for name, is_dir in entries:
+            encoded = name.encode('utf-8', 'surrogatepass')
+            self.parent.append(node)
+            self.row.append(row)
+            self.name_off.append(len(self.names))
+            self.name_len.append(len(encoded))
+            self.names += encoded
+            self.flags.append(FLAG_DIR if is_dir else 0)
+            row += 1
+        ids = range(first, len(self.parent))
+        if start == len(children):
+            children.extend(ids)
+        else:
+            children[start:start] = array('i', ids)
+            self._renumber(node, start + len(ids))
+        return ids
+
+    def remove_children(self, node, first, last):
+        """移除 node 的第 first..last 行（含），返回被移除的节点 id；其子树不再可达"""
+        children = self._children[node]
+        removed = children[first:last + 1].tolist()
+        del children[first:last + 1]
+        self._renumber(node, first)
+        for child in removed:
+            self.clear_children(child)
+        return removed
+
+    def _renumber(self, node, start):
+        children = self._children[node]
+        for row in range(start, len(children)):
+            self.row[children[row]] = row
+
+    def clear_children(self, node):
+        """丢弃 node 已加载的子节点（数组中的槽位不回收，只是不再可达）"""
+        children = self._children.pop(node, ())
+        self.flags[node] &= ~FLAG_LOADED
+        for child in children:
+            if child in self._children:
+                self.clear_children(child)
+
+    def loaded_dirs(self, node):
+        """node 及其子树中所有已加载的目录"""
+        result = []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if current in self._children or self.is_loaded(current):
+                result.append(current)
+                stack.extend(c for c in self._children.get(current, ()) if self.is_dir(c))
+        return result
+
+    def children(self, node):
+        return self._children.get(node, ())
+
+    def child_count(self, node):
+        return len(self._children.get(node, ()))
+
+    def child(self, node, row):
+        return self._children[node][row]
+
+    # --- 节点属性 ---
+
+    def name(self, node):
+        if node == self.ROOT:
+            return os.path.basename(self.root_path) or self.root_path
+        off = self.name_off[node]
+        return self.names[off:off + self.name_len[node]].decode('utf-8', 'surrogatepass')
+
+    def path(self, node):
+        parts = []
+        while node != self.ROOT:
+            parts.append(self.name(node))
+            node = self.parent[node]
+        return os.path.join(self.root_path, *reversed(parts))
+
+    def is_dir(self, node):
+        return bool(self.flags[node] & FLAG_DIR)
+
+    def is_loaded(self, node):
+        return bool(self.flags[node] & FLAG_LOADED)
+
+    def set_loaded(self, node):
+        self.flags[node] |= FLAG_LOADED
+
+    def find(self, path):
+        """按绝对路径查找已加载的节点，找不到返回 None"""
+        rel = os.path.relpath(path, self.root_path)
+        if rel == os.curdir:
+            return self.ROOT
+        node = self.ROOT
+        for part in rel.split(os.sep):
+            for child in self.children(node):
+                if self.name(child) == part:
+                    node = child
+                    break
+            else:
+                return None
+        return node
+
+    def memory_usage(self):
+        """索引本身占用的字节数（近似）"""
+        arrays = (self.parent, self.row, self.name_off, self.name_len)
+        total = sum(a.itemsize * len(a) for a in arrays) + len(self.flags) + len(self.names)
+        total += sum(a.itemsize * len(a) for a in self._children.values())
+        return total
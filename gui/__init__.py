@@ -0,0 +1,13 @@
+"""PySide6 图形界面。只有在真正启动窗口时才会被 code_copier.py 导入。"""
+import sys
+
+
+def main(argv=None):
+    from PySide6.QtWidgets import QApplication
+    from .window import MainWindow
+
+    app = QApplication(sys.argv if argv is None else argv)
+    
+    window = MainWindow()
+    window.show()
+    return app.exec()
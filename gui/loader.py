@@ -0,0 +1,150 @@
+"""
+后台目录加载：在线程池中列出目录，再把结果分批交还给 GUI 线程插入树中。
+
+每个 QTimer 节拍最多占用 PUMP_BUDGET 秒交付结果，插入 5 万项的目录时窗口仍能及时重绘和响应。
+"""
+import time
+from collections import deque
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal
+
+# 每批插入的条目数
+BATCH_SIZE = 500
+# 每个事件循环节拍用于插入结果的时间上限（秒）
+PUMP_BUDGET = 0.015
+
+
+class LoaderSignals(QObject):
+    batch = Signal(int, object, list)   # token, key, [(name, is_dir)]
+    done = Signal(int, object, bool)    # token, key, ok
+
+
+class DirLoadTask(QRunnable):
+    def __init__(self, token, key, dir_path, path_filter):
+        super().__init__()
+        self.token = token
+        self.key = key
+        self.dir_path = dir_path
+        self.path_filter = path_filter
+        self.cancelled = False
+        self.signals = LoaderSignals()
+
+    def run(self):
+        try:
+            entries = self.path_filter.list_dir(self.dir_path)
+        except OSError:
+            self.signals.done.emit(self.token, self.key, False)
+            return
+
+        for start in range(0, len(entries), BATCH_SIZE):
+            if self.cancelled: return
+            self.signals.batch.emit(self.token, self.key, entries[start:start + BATCH_SIZE])
+        self.signals.done.emit(self.token, self.key, True)
+
+
+class CheckSignals(QObject):
+    stale = Signal(object, list)   # project_index, [dir_path]
+
+
+class StaleCheckTask(QRunnable):
+    """在后台核对从项目索引恢复的目录（stat 目录和规则文件），找出需要重新列出的目录"""
+
+    def __init__(self, project_index, dir_paths):
+        super().__init__()
+        self.project_index = project_index
+        self.dir_paths = dir_paths
+        self.signals = CheckSignals()
+
+    def run(self):
+        self.signals.stale.emit(self.project_index, self.project_index.stale_dirs(self.dir_paths))
+
+
+class DirLoader(QObject):
+    """
+    管理目录加载任务。key 由调用方决定（通常是目录路径），同一个 key 同时只有一个任务；
+    取消或重新加载后，旧任务迟到的结果会被丢弃。
+    """
+    batch_ready = Signal(object, list)   # key, [(name, is_dir)]
+    finished = Signal(object, bool)      # key, ok
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+        self._tasks = {}
+        self._delivered = {}
+        self._next_token = 0
+        self._queue = deque()
+        self._timer = QTimer(self)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._pump)
+
+    def load(self, key, dir_path, path_filter):
+        self.cancel(key)
+        self._next_token += 1
+        task = DirLoadTask(self._next_token, key, dir_path, path_filter)
+        task.setAutoDelete(False)
+        task.signals.batch.connect(self._on_batch)
+        task.signals.done.connect(self._on_done)
+        self._tasks[key] = task
+        self._delivered[key] = 0
+        self.pool.start(task)
+
+    def is_loading(self, key):
+        return key in self._tasks
+
+    def cancel(self, key):
+        task = self._tasks.pop(key, None)
+        self._delivered.pop(key, None)
+        if task is not None:
+            task.cancelled = True
+
+    def cancel_all(self):
+        for key in list(self._tasks):
+            self.cancel(key)
+        self._queue.clear()
+
+    def _is_current(self, token, key):
+        task = self._tasks.get(key)
+        return task is not None and task.token == token
+
+    def _on_batch(self, token, key, entries):
+        self._queue.append((token, key, entries, None))
+        self._timer.start()
+
+    def _on_done(self, token, key, ok):
+        self._queue.append((token, key, None, ok))
+        self._timer.start()
+
+    def _merge_batches(self, token, key, entries):
+        """
+        合并队列中同一任务紧随其后的批次，使每次交付至少与已交付的数量相当。
+        视图每次插入后都会重新布局已展开的全部行，按几何级数增长的批次让布局次数只有 O(log n)。
+        """
+        limit = max(BATCH_SIZE, self._delivered[key])
+        if len(entries) < limit:
+            entries = list(entries)
+            while (self._queue and len(entries) < limit and self._queue[0][0] == token
+                   and self._queue[0][2] is not None):
+                entries.extend(self._queue.popleft()[2])
+        self._delivered[key] += len(entries)
+        return entries
+
+    def _pump(self):
+        # 超出时间预算后把剩余的批次留到下一轮事件循环；
+        # 结束标记总是立即处理，让最后一批和移除占位行落在同一次视图布局里
+        deadline = time.perf_counter() + PUMP_BUDGET
+        while self._queue:
+            if self._queue[0][2] is not None and time.perf_counter() >= deadline:
+                break
+            token, key, entries, ok = self._queue.popleft()
+            if not self._is_current(token, key):
+                continue
+            if entries is not None:
+                self.batch_ready.emit(key, self._merge_batches(token, key, entries))
+            else:
+                del self._tasks[key]
+                del self._delivered[key]
+                self.finished.emit(key, ok)
+        if not self._queue:
+            self._timer.stop()
@@ -0,0 +1,260 @@
+"""
+搜索面板：在后台建立文件名索引（extractor.search.PathIndex），输入时在内存中模糊匹配；
+内容搜索的索引第一次用到时再建。结果可以逐个或整体勾选，不需要把中间目录加载进树中。
+"""
+import os
+import time
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Qt, QTimer, Signal
+from PySide6.QtWidgets import (QCheckBox, QComboBox, QHBoxLayout, QLabel, QLineEdit, QListWidget,
+                               QListWidgetItem, QPushButton, QVBoxLayout, QWidget)
+
+from extractor import Extractor
+from extractor.search import ContentIndex, PathIndex
+
+from .tree_model import standard_icon
+
+# 停止输入这么久之后才查询（毫秒）
+QUERY_DELAY_MS = 120
+
+MODE_NAMES = 0
+MODE_CONTENTS = 1
+
+# 内容搜索最多列出的文件数：每个候选文件都要读出来确认
+CONTENT_LIMIT = 200
+
+
+class BuildSignals(QObject):
+    built = Signal(int, object)   # token, index
+
+
+class BuildTask(QRunnable):
+    """在线程池中执行 build(should_stop)，结果经信号交回 GUI 线程"""
+
+    def __init__(self, token, build):
+        super().__init__()
+        self.token = token
+        self.build = build
+        self.cancelled = False
+        self.signals = BuildSignals()
+
+    def run(self):
+        index = self.build(lambda: self.cancelled)
+        if not self.cancelled:
+            self.signals.built.emit(self.token, index)
+
+
+class SearchPanel(QWidget):
+    active_changed = Signal(bool)   # 有查询时显示结果列表，代替文件树
+
+    def __init__(self, tree_model, parent=None):
+        super().__init__(parent)
+        self.tree_model = tree_model
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.root_path = ""
+        self.path_filter = None
+        self.walker = None
+        self.reader = None
+        self.path_index = None
+        self.content_index = None
+        self.dirty = False
+        self._token = 0
+        self._tasks = {}
+        self._results = []  # [(abs_path, is_dir)]
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        row = QHBoxLayout()
+        self.query_edit = QLineEdit()
+        self.query_edit.setPlaceholderText("Search files (Ctrl+F): fuzzy names, e.g. \"gui model\"; Esc clears")
+        self.query_edit.setClearButtonEnabled(True)
+        self.query_edit.textChanged.connect(lambda: self._timer.start())
+        row.addWidget(self.query_edit, 1)
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItems(["Names", "Contents"])
+        self.mode_combo.setToolTip("Contents builds a trigram index of all text files the first time it is used")
+        self.mode_combo.currentIndexChanged.connect(self.run_query)
+        row.addWidget(self.mode_combo)
+        self.btn_check_all = QPushButton("Check All")
+        self.btn_check_all.setToolTip("Check every listed match without loading its folders into the tree")
+        self.btn_check_all.clicked.connect(lambda: self.check_all(True))
+        row.addWidget(self.btn_check_all)
+        self.btn_uncheck_all = QPushButton("Uncheck All")
+        self.btn_uncheck_all.clicked.connect(lambda: self.check_all(False))
+        row.addWidget(self.btn_uncheck_all)
+        self.dirs_check = QCheckBox("Folders")
+        self.dirs_check.setChecked(True)
+        self.dirs_check.setToolTip("Include matching folders in name results")
+        self.dirs_check.toggled.connect(self.run_query)
+        row.addWidget(self.dirs_check)
+        layout.addLayout(row)
+
+        self.info_label = QLabel()
+        self.info_label.setStyleSheet("color: #888;")
+        layout.addWidget(self.info_label)
+        self.results = QListWidget()
+        self.results.setUniformItemSizes(True)
+        self.results.itemChanged.connect(self.on_item_changed)
+        layout.addWidget(self.results, 1)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(QUERY_DELAY_MS)
+        self._timer.timeout.connect(self.run_query)
+        self.set_active(False)
+
+    # --- 索引 ---
+
+    def set_root(self, root_path, path_filter, walker, cache=None, archive=None):
+        """
+        切换项目：丢弃旧索引，在后台重新建立文件名索引；walker 提供 walk()（ProjectIndex 或 PathFilter）。
+        archive: 根目录为归档时的 Archive，内容从归档成员读取
+        """
+        self.cancel_builds()
+        self.root_path = root_path
+        self.path_filter = path_filter
+        self.walker = walker
+        # 读取内容共用一个 Extractor：有缓存时不重新解码
+        self.reader = Extractor(root_path, [], cache=cache, path_filter=path_filter, archive=archive)
+        self.path_index = None
+        self.content_index = None
+        self.dirty = False
+        self.query_edit.clear()
+        self.build_paths()
+
+    def invalidate(self, *args):
+        """文件系统变化后调用：下次查询时在后台重建，重建完成前继续使用旧索引"""
+        self.dirty = True
+
+    def cancel_builds(self):
+        for task in self._tasks.values():
+            task.cancelled = True
+        self._tasks.clear()
+
+    def _start(self, kind, build):
+        old = self._tasks.get(kind)
+        if old is not None:
+            old.cancelled = True
+        self._token += 1
+        task = BuildTask(self._token, build)
+        task.signals.built.connect(lambda token, index: self._on_built(kind, token, index))
+        self._tasks[kind] = task
+        self.pool.start(task)
+
+    def _on_built(self, kind, token, index):
+        task = self._tasks.get(kind)
+        if task is None or task.token != token:
+            return
+        del self._tasks[kind]
+        if kind == 'paths':
+            self.path_index = index
+            # 文件列表变了，内容索引跟着重建
+            if self.content_index is not None or 'contents' in self._tasks:
+                self.content_index = None
+                self.build_contents()
+        else:
+            self.content_index = index
+        self.run_query()
+
+    def build_paths(self):
+        root, walker = self.root_path, self.walker
+        self.dirty = False
+        self._start('paths', lambda should_stop: PathIndex.build(root, walker.walk(root), should_stop))
+
+    def build_contents(self):
+        if self.path_index is None:
+            return  # 文件名索引建好后再建
+        root, path_index, reader = self.root_path, self.path_index, self.reader
+
+        def build(should_stop):
+            paths = path_index.file_paths()
+            if reader.archive is not None:
+                paths = reader.archive.read_order(paths)  # tar 归档只向前解压一遍
+            return ContentIndex.build(root, reader.iter_decoded(paths), should_stop)
+        self._start('contents', build)
+
+    def read(self, rel_path):
+        """内容搜索确认候选文件时读取内容"""
+        return self.reader.decode(os.path.join(self.root_path, *rel_path.split('/')))
+
+    # --- 查询 ---
+
+    def set_active(self, active):
+        self.results.setVisible(active)
+        self.info_label.setVisible(active)
+        for widget in (self.btn_check_all, self.btn_uncheck_all):
+            widget.setEnabled(active)
+        self.active_changed.emit(active)
+
+    def run_query(self):
+        query = self.query_edit.text().strip()
+        self.set_active(bool(query))
+        if not query or not self.root_path:
+            self.results.clear()
+            return
+        if self.dirty and 'paths' not in self._tasks:
+            self.build_paths()
+
+        start = time.perf_counter()
+        if self.mode_combo.currentIndex() == MODE_CONTENTS:
+            if self.content_index is None:
+                if 'contents' not in self._tasks:
+                    self.build_contents()
+                self.show_results([], "Indexing file contents...")
+                return
+            matches = self.content_index.search(query, self.read, limit=CONTENT_LIMIT)
+            results = [(rel, False, f"{rel}:{line_no}  {line[:120]}") for rel, line_no, line in matches]
+            note = " (index truncated: some large files are not searched)" if self.content_index.truncated else ""
+        else:
+            if self.path_index is None:
+                self.show_results([], "Indexing file names...")
+                return
+            matches = self.path_index.search(query)
+            if not self.dirs_check.isChecked():
+                matches = [(rel, is_dir) for rel, is_dir in matches if not is_dir]
+            results = [(rel, is_dir, rel + '/' if is_dir else rel) for rel, is_dir in matches]
+            note = ""
+        elapsed = (time.perf_counter() - start) * 1000
+        total = len(self.path_index) if self.path_index is not None else 0
+        self.show_results(results, f"{len(results)} matches in {elapsed:.0f} ms ({total} paths indexed){note}")
+
+    def show_results(self, results, info):
+        self.info_label.setText(info)
+        self.results.blockSignals(True)
+        self.results.clear()
+        self._results = []
+        for rel, is_dir, text in results:
+            path = os.path.join(self.root_path, *rel.split('/'))
+            item = QListWidgetItem(standard_icon(is_dir), text)
+            item.setFlags(Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Checked if self.tree_model.path_checked(path)
+                               else Qt.CheckState.Unchecked)
+            item.setToolTip(path)
+            self.results.addItem(item)
+            self._results.append((path, is_dir))
+        self.results.blockSignals(False)
+
+    def refresh_checks(self):
+        """树中的勾选变化后同步结果列表的勾选框"""
+        self.results.blockSignals(True)
+        for row, (path, _) in enumerate(self._results):
+            checked = self.tree_model.path_checked(path)
+            self.results.item(row).setCheckState(Qt.CheckState.Checked if checked else Qt.CheckState.Unchecked)
+        self.results.blockSignals(False)
+
+    def on_item_changed(self, item):
+        path, is_dir = self._results[self.results.row(item)]
+        self.tree_model.set_path_checked(path, is_dir, item.checkState() == Qt.CheckState.Checked)
+        self.refresh_checks()
+
+    def check_all(self, checked):
+        for path, is_dir in self._results:
+            self.tree_model.set_path_checked(path, is_dir, checked)
+        self.refresh_checks()
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key.Key_Escape:
+            self.query_edit.clear()
+            return
+        super().keyPressEvent(event)
@@ -0,0 +1,263 @@
+# Theme Definitions
+DARK_THEME = """
+QWidget {
+    background-color: #2b2b2b;
+    color: #e0e0e0;
+    font-family: "Segoe UI", "Microsoft YaHei", sans-serif;
+    font-size: 10pt;
+}
+#RootWidget {
+    border: 1px solid #3e3e3e;
+    background-color: #2b2b2b;
+}
+QLineEdit {
+    background-color: #383838;
+    border: 1px solid #555;
+    border-radius: 4px;
+    padding: 5px;
+    selection-background-color: #0078d4;
+    color: #e0e0e0;
+}
+QTreeView {
+    background-color: #323232;
+    border: 1px solid #444;
+    border-radius: 4px;
+    alternate-background-color: #383838;
+}
+QTreeView::item {
+    padding: 4px;
+}
+QTreeView::item:hover {
+    background-color: #3e3e3e;
+}
+QTreeView::item:selected {
+    background-color: #4d4d4d;
+    color: #ffffff;
+}
+QHeaderView::section {
+    background-color: #404040;
+    color: #ddd;
+    padding: 4px;
+    border: none;
+    border-bottom: 1px solid #555;
+}
+QPushButton {
+    background-color: #0078d4;
+    color: white;
+    border: none;
+    border-radius: 5px;
+    padding: 6px 12px;
+}
+QPushButton:hover {
+    background-color: #1084d9;
+}
+QPushButton:pressed {
+    background-color: #006cc1;
+}
+QPushButton:disabled {
+    background-color: #444;
+    color: #888;
+}
+QProgressBar {
+    border: 1px solid #444;
+    border-radius: 4px;
+    text-align: center;
+    background-color: #333;
+}
+QProgressBar::chunk {
+    background-color: #0078d4;
+    border-radius: 3px;
+}
+QScrollBar:vertical {
+    border: none;
+    background: #2b2b2b;
+    width: 10px;
+    margin: 0px;
+}
+QScrollBar::handle:vertical {
+    background: #555;
+    min-height: 20px;
+    border-radius: 5px;
+}
+QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
+    height: 0px;
+}
+/* Title Bar - Seamless Integration */
+#TitleBar {
+    background-color: transparent;
+}
+#TitleLabel {
+    color: #ffffff;
+    font-weight: bold;
+    font-size: 11pt;
+}
+.TitleBtn {
+    background-color: transparent;
+    color: #e0e0e0;
+    border: none;
+    border-radius: 4px;
+    padding: 0;
+    font-size: 11px;
+    margin-left: 2px;
+}
+.TitleBtn:hover {
+    background-color: #444;
+}
+#ThemeBtn {
+    font-size: 13px;
+    font-weight: normal;
+}
+#CloseBtn:hover {
+    background-color: #d32f2f;
+    color: white;
+}
+"""
+
+LIGHT_THEME = """
+QWidget {
+    background-color: #f9f9f9;
+    color: #333333;
+    font-family: "Segoe UI", "Microsoft YaHei", sans-serif;
+    font-size: 10pt;
+}
+#RootWidget {
+    border: 1px solid #dcdcdc;
+    background-color: #f9f9f9;
+}
+QLineEdit {
+    background-color: #ffffff;
+    border: 1px solid #cccccc;
+    border-radius: 4px;
+    padding: 5px;
+    selection-background-color: #0078d4;
+    color: #333333;
+}
+QTreeView {
+    background-color: #ffffff;
+    border: 1px solid #d0d0d0;
+    border-radius: 4px;
+    alternate-background-color: #fcfcfc;
+}
+QTreeView::item {
+    padding: 4px;
+    color: #333;
+}
+QTreeView::item:hover {
+    background-color: #e6f7ff;
+}
+QTreeView::item:selected {
+    background-color: #cce8ff;
+    color: #000;
+}
+QHeaderView::section {
+    background-color: #f0f0f0;
+    color: #333;
+    padding: 4px;
+    border: none;
+    border-bottom: 1px solid #ccc;
+}
+QPushButton {
+    background-color: #0078d4;
+    color: white;
+    border: none;
+    border-radius: 5px;
+    padding: 6px 12px;
+}
+QPushButton:hover {
+    background-color: #1084d9;
+}
+QPushButton:pressed {
+    background-color: #006cc1;
+}
+QPushButton:disabled {
+    background-color: #cccccc;
+    color: #666666;
+}
+QProgressBar {
+    border: 1px solid #ccc;
+    border-radius: 4px;
+    text-align: center;
+    background-color: #eee;
+}
+QProgressBar::chunk {
+    background-color: #0078d4;
+    border-radius: 3px;
+}
+QScrollBar:vertical {
+    border: none;
+    background: #f9f9f9;
+    width: 10px;
+    margin: 0px;
+}
+QScrollBar::handle:vertical {
+    background: #c1c1c1;
+    min-height: 20px;
+    border-radius: 5px;
+}
+QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
+    height: 0px;
+}
+/* Title Bar - Seamless Integration */
+#TitleBar {
+    background-color: transparent;
+}
+#TitleLabel {
+    color: #000000;
+    font-weight: bold;
+    font-size: 11pt;
+}
+.TitleBtn {
+    background-color: transparent;
+    color: #333;
+    border: none;
+    border-radius: 4px;
+    padding: 0;
+    font-size: 11px;
+    margin-left: 2px;
+}
+.TitleBtn:hover {
+    background-color: #e0e0e0;
+}
+#ThemeBtn {
+    font-size: 13px;
+    font-weight: normal;
+}
+#CloseBtn:hover {
+    background-color: #e81123;
+    color: white;
+}
+"""
+
+# 提示框不是主窗口的子控件，样式表管不到，只能通过调色板设置颜色
+TOOLTIP_COLORS = {True: ('#383838', '#e0e0e0'), False: ('#ffffdc', '#333333')}
+
+
+class ThemeManager:
+    """
+    样式表只设置在 target（主窗口）上，而不是整个 QApplication：
+    切换主题时只重新计算主窗口这一棵控件树，以主窗口为父控件的对话框同样继承样式。
+    """
+    def __init__(self, target):
+        self.target = target
+        self.is_dark = True
+
+    def toggle_theme(self):
+        self.is_dark = not self.is_dark
+        # 重新套用样式期间暂停重绘，避免每个控件各画一次
+        self.target.setUpdatesEnabled(False)
+        try:
+            self.apply_theme()
+        finally:
+            self.target.setUpdatesEnabled(True)
+        return self.is_dark
+
+    def apply_theme(self):
+        from PySide6.QtGui import QColor, QPalette
+        from PySide6.QtWidgets import QToolTip
+
+        self.target.setStyleSheet(DARK_THEME if self.is_dark else LIGHT_THEME)
+        base, text = TOOLTIP_COLORS[self.is_dark]
+        palette = QToolTip.palette()
+        palette.setColor(QPalette.ColorRole.ToolTipBase, QColor(base))
+        palette.setColor(QPalette.ColorRole.ToolTipText, QColor(text))
+        QToolTip.setPalette(palette)
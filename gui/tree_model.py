@@ -0,0 +1,510 @@
+"""
+基于 FileIndex 的树模型，替代每个节点一个 QTreeWidgetItem 的 QTreeWidget。
+
+节点数据都在 FileIndex 的数组里，Qt 只在需要显示某一行时才通过 data() 取值；
+图标按类型共享，目录在展开时（fetchMore）由 DirLoader 在后台分批加载。
+"""
+import os
+
+from PySide6.QtCore import QAbstractItemModel, QModelIndex, Qt, Signal
+from PySide6.QtWidgets import QApplication
+
+from extractor.engine import TYPE_DIR, TYPE_FILE
+from extractor.selection import CHECKED, PARTIAL, UNCHECKED, Selection
+from extractor.tree_index import FLAG_DIR, FLAG_LOADED, FileIndex
+
+from .loader import DirLoader, StaleCheckTask
+
+_ICONS = {}
+
+def standard_icon(is_dir):
+    """文件夹/文件图标只查找一次，所有节点共用"""
+    icon = _ICONS.get(is_dir)
+    if icon is None:
+        pixmap = QApplication.style().StandardPixmap.SP_DirIcon if is_dir else QApplication.style().StandardPixmap.SP_FileIcon
+        icon = _ICONS[is_dir] = QApplication.style().standardIcon(pixmap)
+    return icon
+
+_NODE_FLAGS = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsUserCheckable
+_PLACEHOLDER_FLAGS = Qt.ItemFlag.NoItemFlags
+
+_CHECK_STATES = {UNCHECKED: Qt.CheckState.Unchecked, PARTIAL: Qt.CheckState.PartiallyChecked,
+                 CHECKED: Qt.CheckState.Checked}
+
+
+def _runs(rows):
+    """把升序的行号列表拆成连续区间 [(first, last)]"""
+    runs = []
+    for row in rows:
+        if runs and runs[-1][1] == row - 1:
+            runs[-1][1] = row
+        else:
+            runs.append([row, row])
+    return [tuple(r) for r in runs]
+
+
+class FileTreeModel(QAbstractItemModel):
+    """
+    internalId 编码：节点 n -> n << 1；目录 n 加载期间末尾的“Loading…”占位行 -> (n << 1) | 1
+    """
+    # 勾选状态变化后发出一次，视图据此整体重绘：子孙行不逐个发 dataChanged，
+    # 否则 QTreeView 会逐行检查行高，5 万行需要数秒
+    checks_changed = Signal()
+    dir_loaded = Signal(str)       # 目录加载完成（监视器据此开始监视）
+    paths_removed = Signal(list)   # 刷新时从树中移除的路径
+    dirs_unloaded = Signal(list)   # 随之不再可达的已加载目录
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.index_data = None
+        self.selection = None
+        self._dir_nodes = {}   # 已加载目录的 path -> node
+        self.path_filter = None
+        self.project_index = None
+        self._check_task = None
+        self._pending = {}     # 父目录尚未加载时从搜索结果勾选的 path -> is_dir
+        self._loading = set()
+        self.notes = {}        # path -> 显示在名称后面的说明（如单个文件的行范围）
+        self.loader = DirLoader(self)
+        self.loader.batch_ready.connect(self.on_batch_loaded)
+        self.loader.finished.connect(self.on_dir_loaded)
+
+    def set_root(self, root_path, path_filter, project_index=None):
+        """切换根目录：丢弃旧索引和所有未完成的加载；给出 project_index 时目录经由项目索引列出"""
+        self.beginResetModel()
+        self.loader.cancel_all()
+        self._loading.clear()
+        self._dir_nodes.clear()
+        self._pending.clear()
+        self.notes = {}
+        self.index_data = FileIndex(root_path)
+        self.selection = Selection(self.index_data)
+        self.path_filter = path_filter
+        self.project_index = project_index
+        self.endResetModel()
+
+    @property
+    def lister(self):
+        """列出目录用的对象（ProjectIndex 或 PathFilter，两者的 list_dir 结果相同）"""
+        return self.project_index if self.project_index is not None else self.path_filter
+
+    def restore(self, dir_paths, selection):
+        """
+        用项目索引中保存的列表直接填充上次加载过的目录（不核对），再恢复勾选状态。
+        之后调用 revalidate() 在后台核对，变化的目录按增量刷新的方式修补。
+        """
+        data = self.index_data
+        children_of = {FileIndex.ROOT: None}  # 已填充目录的 node -> {name: child}
+        loaded = []
+
+        def lookup(path):
+            rel = os.path.relpath(path, data.root_path)
+            node = FileIndex.ROOT
+            for part in ([] if rel == os.curdir else rel.split(os.sep)):
+                node = (children_of.get(node) or {}).get(part)
+                if node is None:
+                    return None
+            return node
+
+        self.beginResetModel()
+        for dir_path in sorted(dir_paths, key=lambda p: p.count(os.sep)):  # 先父后子
+            node = lookup(dir_path)
+            if node is None or data.is_loaded(node) or not data.is_dir(node):
+                continue
+            entries = self.project_index.cached_entries(data.path(node))
+            if entries is None:
+                continue
+            ids = data.add_children(node, [(name, is_dir) for name, is_dir, _, _ in entries])
+            self.selection.on_children_added(node, ids)
+            data.set_loaded(node)
+            children_of[node] = {data.name(child): child for child in ids}
+            path = data.path(node)
+            self._dir_nodes[path] = node
+            loaded.append(path)
+        for path, item_type in selection:
+            node = lookup(path)
+            if node is not None and node != FileIndex.ROOT:
+                self.selection.set_state(node, CHECKED)
+            elif node is None:
+                self._pending[path] = item_type == TYPE_DIR
+        self.endResetModel()
+        for path in loaded:
+            self.dir_loaded.emit(path)
+
+    def revalidate(self):
+        """在后台核对所有已加载目录与磁盘是否一致，结果由 on_stale_dirs 处理"""
+        if self.project_index is None or not self._dir_nodes:
+            return
+        self._check_task = StaleCheckTask(self.project_index, self.loaded_dir_paths())
+        self._check_task.signals.stale.connect(self.on_stale_dirs)
+        self.loader.pool.start(self._check_task)
+
+    def on_stale_dirs(self, project_index, dir_paths):
+        # 核对期间可能已经切换了项目
+        if project_index is self.project_index and dir_paths:
+            self.refresh_dirs(dir_paths)
+
+    # --- 节点 <-> QModelIndex ---
+
+    def node_of(self, index):
+        """返回 index 对应的节点 id；根返回 FileIndex.ROOT，占位行返回 None"""
+        if not index.isValid():
+            return FileIndex.ROOT
+        internal = index.internalId()
+        return None if internal & 1 else internal >> 1
+
+    def index_of(self, node):
+        if node == FileIndex.ROOT:
+            return QModelIndex()
+        return self.createIndex(self.index_data.row[node], 0, node << 1)
+
+    # --- QAbstractItemModel ---
+
+    def index(self, row, column, parent=QModelIndex()):
+        # 视图布局时每一行都会调用，保持在最短路径上
+        if self.index_data is None or column != 0 or row < 0:
+            return QModelIndex()
+        node = self.node_of(parent)
+        if node is None:
+            return QModelIndex()
+        children = self.index_data.children(node)
+        count = len(children)
+        if row < count:
+            return self.createIndex(row, 0, children[row] << 1)
+        if row == count and node in self._loading:
+            return self.createIndex(row, 0, (node << 1) | 1)
+        return QModelIndex()
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        internal = index.internalId()
+        node = internal >> 1
+        if internal & 1:
+            return self.index_of(node)
+        return self.index_of(self.index_data.parent[node])
+
+    def rowCount(self, parent=QModelIndex()):
+        if self.index_data is None:
+            return 0
+        node = self.node_of(parent)
+        if node is None:
+            return 0
+        return self.index_data.child_count(node) + (1 if node in self._loading else 0)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        if self.index_data is None:
+            return False
+        node = self.node_of(parent)
+        if node is None:
+            return False
+        flags = self.index_data.flags[node]
+        if not flags & FLAG_DIR:
+            return False
+        # 未加载的目录总是显示展开箭头，与原来的 ShowIndicator 行为一致
+        return not flags & FLAG_LOADED or self.index_data.child_count(node) > 0 or node in self._loading
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return "Project Structure"
+        return None
+
+    def flags(self, index):
+        if index.internalId() & 1:
+            return _PLACEHOLDER_FLAGS
+        return _NODE_FLAGS
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        node = self.node_of(index)
+        if node is None:
+            return "Loading…" if role == Qt.ItemDataRole.DisplayRole else None
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            name = self.index_data.name(node)
+            if self.notes:
+                note = self.notes.get(self.index_data.path(node))
+                if note:
+                    return f"{name}  [{note}]"
+            return name
+        if role == Qt.ItemDataRole.DecorationRole:
+            return standard_icon(self.index_data.is_dir(node))
+        if role == Qt.ItemDataRole.CheckStateRole:
+            return _CHECK_STATES[self.selection.state(node)]
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return self.index_data.path(node)
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        node = self.node_of(index)
+        if node is None or node == FileIndex.ROOT or role != Qt.ItemDataRole.CheckStateRole:
+            return False
+        state = CHECKED if Qt.CheckState(value) == Qt.CheckState.Checked else UNCHECKED
+        self.set_check_state(node, state)
+        return True
+
+    # --- 懒加载 ---
+
+    def canFetchMore(self, parent):
+        if self.index_data is None:
+            return False
+        node = self.node_of(parent)
+        return (node is not None and self.index_data.is_dir(node)
+                and not self.index_data.is_loaded(node) and node not in self._loading)
+
+    def fetchMore(self, parent):
+        """展开时在后台加载子项；加载期间显示占位行"""
+        node = self.node_of(parent)
+        count = self.index_data.child_count(node)
+        self.beginInsertRows(parent, count, count)
+        self._loading.add(node)
+        self.endInsertRows()
+        self.loader.load(node, self.index_data.path(node), self.lister)
+
+    def cancel_fetch(self, parent):
+        """加载中途折叠：取消加载并丢弃已插入的部分子项，下次展开时重新加载"""
+        node = self.node_of(parent)
+        if node not in self._loading:
+            return
+        self.loader.cancel(node)
+        self.beginRemoveRows(parent, 0, self.index_data.child_count(node))
+        self._loading.discard(node)
+        self.index_data.clear_children(node)
+        self.selection.on_children_cleared(node)
+        self.endRemoveRows()
+
+    def on_batch_loaded(self, node, entries):
+        if node not in self._loading:
+            return
+        first = self.index_data.child_count(node)
+        # 占位行始终在最后，新的一批插在它前面
+        self.beginInsertRows(self.index_of(node), first, first + len(entries) - 1)
+        ids = self.index_data.add_children(node, entries)
+        # 继承父节点的勾选状态 (如果父节点被勾选，新子节点全选；否则默认不选)
+        changed = self.selection.on_children_added(node, ids)
+        self.endInsertRows()
+        self.emit_check_changes(changed)
+
+    def on_dir_loaded(self, node, ok):
+        if node not in self._loading:
+            return
+        row = self.index_data.child_count(node)
+        self.beginRemoveRows(self.index_of(node), row, row)
+        self._loading.discard(node)
+        self.index_data.set_loaded(node)
+        self.endRemoveRows()
+        if ok:
+            path = self.index_data.path(node)
+            self._dir_nodes[path] = node
+            self.apply_pending(path)
+            self.dir_loaded.emit(path)
+
+    # --- 增量刷新 ---
+
+    def refresh_dirs(self, dir_paths):
+        """重新列出发生变化的已加载目录，只增删有差异的行，保留勾选状态"""
+        for dir_path in dir_paths:
+            node = self._dir_nodes.get(dir_path)
+            if node is None or node in self._loading or not self.index_data.is_loaded(node):
+                continue
+            try:
+                entries = self.lister.list_dir(dir_path)
+            except OSError:
+                continue # 目录本身被删除，由父目录的刷新处理
+            self.patch_children(node, entries)
+
+    def reload_rules(self, dir_paths):
+        """
+        dir_paths 中的规则文件（.gitignore / .ignore）有变化：重新读取其中的过滤规则，
+        再重新列出这些目录和它们下面所有已加载的目录，规则对整个子树都有效
+        """
+        if self.path_filter is None:
+            return
+        prefixes = []
+        for dir_path in dir_paths:
+            self.path_filter.reload_rules(dir_path)
+            prefixes.append(os.path.join(dir_path, ''))
+        # 先父后子：父目录的刷新移除了被忽略的子目录时，子目录不再重复列出
+        self.refresh_dirs(sorted((path for path in self._dir_nodes
+                                  if os.path.join(path, '').startswith(tuple(prefixes))),
+                                 key=lambda p: p.count(os.sep)))
+
+    def patch_children(self, node, entries):
+        """把 node 的子节点更新为 entries（已排序），按连续区间增删行"""
+        data = self.index_data
+        old = [(data.name(c), data.is_dir(c)) for c in data.children(node)]
+        parent = self.index_of(node)
+
+        # 合并新旧两个有序列表：保留项按 entries 的顺序，被删除的旧项留在原来的相对位置
+        merged = []
+        pos = 0
+        old_set = set(old)
+        for key in entries:
+            if key in old_set:
+                while old[pos] != key:
+                    merged.append((old[pos], False))
+                    pos += 1
+                pos += 1
+                merged.append((key, None))
+            else:
+                merged.append((key, True))
+        merged.extend((key, False) for key in old[pos:])
+
+        # 1. 先插入：新子节点按父节点变化前的状态继承勾选（部分勾选的目录里新增的文件不会被自动勾选）
+        added_rows = [row for row, (key, added) in enumerate(merged) if added]
+        for first, last in _runs(added_rows):
+            self.beginInsertRows(parent, first, last)
+            ids = data.insert_children(node, first, [key for key, _ in merged[first:last + 1]])
+            changed = self.selection.on_children_added(node, ids)
+            self.endInsertRows()
+            self.emit_check_changes(changed)
+
+        # 2. 再删除：从后往前按连续区间处理，行号不受影响
+        removed_rows = [row for row, (key, added) in enumerate(merged) if added is False]
+        removed_nodes = []
+        for first, last in reversed(_runs(removed_rows)):
+            self.beginRemoveRows(parent, first, last)
+            removed_nodes.extend(data.remove_children(node, first, last))
+            self.endRemoveRows()
+        if not removed_nodes:
+            return
+
+        removed_paths = [data.path(n) for n in removed_nodes]
+        removed_set = set(removed_nodes)
+        unloaded = [path for path, n in self._dir_nodes.items() if self._is_within(n, removed_set)]
+        for path in unloaded:
+            del self._dir_nodes[path]
+        for n in removed_nodes:
+            if n in self._loading:
+                self.loader.cancel(n)
+                self._loading.discard(n)
+        self.emit_check_changes(self.selection.on_children_removed(node, removed_nodes))
+        self.paths_removed.emit(removed_paths)
+        if unloaded:
+            self.dirs_unloaded.emit(unloaded)
+
+    def _is_within(self, node, subtree_roots):
+        """node 是否是 subtree_roots 中某个节点或其子孙"""
+        while node >= 0:
+            if node in subtree_roots:
+                return True
+            node = self.index_data.parent[node]
+        return False
+
+    def loaded_dir_paths(self):
+        return list(self._dir_nodes)
+
+    def dir_index(self, dir_path):
+        """已加载目录的 QModelIndex，未加载时返回 None"""
+        node = self._dir_nodes.get(dir_path)
+        return None if node is None else self.index_of(node)
+
+    # --- 勾选 ---
+
+    def set_check_state(self, node, state):
+        """勾选/取消一个节点：选择引擎按 O(depth) 更新，视图只刷新该行和状态变化的祖先"""
+        if self._pending and self.index_data.is_dir(node):
+            # 整个目录的状态已定，其中挂起的勾选不再需要
+            prefix = os.path.join(self.index_data.path(node), '')
+            for path in [p for p in self._pending if p.startswith(prefix)]:
+                del self._pending[path]
+        self.emit_check_changes([node] + self.selection.set_state(node, state))
+        # 子孙行不逐个通知，合并为一次整体重绘
+        if self.index_data.child_count(node):
+            self.checks_changed.emit()
+
+    def emit_check_changes(self, nodes):
+        """逐行通知状态变化的节点（只有被操作的节点和它的祖先，数量为 O(depth)）"""
+        for node in nodes:
+            index = self.index_of(node)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.CheckStateRole])
+
+    def set_note(self, path, note):
+        """设置或清除（note 为空）path 名称后面的说明"""
+        if note:
+            self.notes[path] = note
+        else:
+            self.notes.pop(path, None)
+        node, exact = self._locate(path)
+        if exact:
+            index = self.index_of(node)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole])
+
+    def collect_checked_paths(self):
+        """收集选中项，返回 (path, type) 列表，直接读取选择引擎的状态，再加上挂起的勾选"""
+        if self.selection is None:
+            return []
+        return self.selection.collect() + [(path, TYPE_DIR if is_dir else TYPE_FILE)
+                                           for path, is_dir in self._pending.items()]
+
+    def uncheck_all(self):
+        """取消所有勾选，包括挂起的勾选"""
+        self._pending.clear()
+        if self.selection is not None:
+            self.selection.set_state(FileIndex.ROOT, UNCHECKED)
+            self.checks_changed.emit()
+
+    # --- 按路径勾选（搜索结果） ---
+
+    def _locate(self, path):
+        """
+        返回 (node, exact)：exact 为 True 时 node 就是 path 的节点；
+        否则 node 是 path 路径上第一个尚未加载的目录（或 None，路径不在树中）。
+        """
+        data = self.index_data
+        rel = os.path.relpath(path, data.root_path)
+        if rel == os.curdir or rel.startswith(os.pardir):
+            return None, False
+        node = FileIndex.ROOT
+        for part in rel.split(os.sep):
+            if not data.is_loaded(node):
+                return node, False
+            for child in data.children(node):
+                if data.name(child) == part:
+                    node = child
+                    break
+            else:
+                return None, False
+        return node, True
+
+    def path_checked(self, path):
+        """path 是否被勾选（自身或某个祖先目录全选），不需要加载中间目录"""
+        node, exact = self._locate(path)
+        if node is None:
+            return False
+        if exact:
+            return self.selection.state(node) == CHECKED
+        return path in self._pending or self.selection.state(node) == CHECKED
+
+    def set_path_checked(self, path, is_dir, checked):
+        """
+        勾选/取消任意路径，不加载中间目录：路径上的目录都已加载时直接设置节点，
+        否则先挂起，等父目录加载后再应用，生成时与树中的勾选合并。
+        返回 False 表示无法完成（在一个全选且未加载的目录里取消单个文件）。
+        """
+        node, exact = self._locate(path)
+        if node is None:
+            return False
+        if exact:
+            self.set_check_state(node, CHECKED if checked else UNCHECKED)
+            return True
+        if checked:
+            if self.selection.state(node) != CHECKED:
+                self._pending[path] = is_dir
+            return True
+        self._pending.pop(path, None)
+        return self.selection.state(node) != CHECKED
+
+    def apply_pending(self, dir_path):
+        """目录加载完成：把挂起的、直接位于其中的勾选应用到节点上"""
+        if not self._pending:
+            return
+        for path in [p for p in self._pending if os.path.dirname(p) == dir_path]:
+            del self._pending[path]
+            node, exact = self._locate(path)
+            if exact:
+                self.set_check_state(node, CHECKED)
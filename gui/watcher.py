@@ -0,0 +1,103 @@
+"""
+文件系统监视：只监视已加载（展开过）的目录，变化经过去抖与合并后一次性交给模型。
+
+保存文件时编辑器往往会连续产生多个事件（写临时文件、改名、删除），
+DEBOUNCE_MS 内的事件合并为一次刷新；持续有变化时最迟 MAX_DELAY_MS 也会刷新一次。
+原地修改文件不会触发目录变化，所以目录中的 .gitignore / .ignore 另外单独监视，
+并记下它们的指纹：刷新时指纹变化的目录另外通过 rules_changed 报告，其中的过滤规则需要重新读取。
+"""
+import os
+import time
+
+from PySide6.QtCore import QFileSystemWatcher, QObject, QTimer, Signal
+
+from extractor.filters import IGNORE_FILES, rules_fingerprint
+
+DEBOUNCE_MS = 300
+MAX_DELAY_MS = 2000
+
+
+class TreeWatcher(QObject):
+    dirs_changed = Signal(list)   # [dir_path]，已去重
+    rules_changed = Signal(list)  # [dir_path]：规则文件被增删或修改的目录，先于 dirs_changed 发出
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.enabled = True
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._on_changed)
+        self._watcher.fileChanged.connect(lambda path: self._on_changed(os.path.dirname(path)))
+        self._rules = {}   # 监视中的目录 -> 规则文件的指纹
+        self._pending = set()
+        self._first_event = None
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._flush)
+
+    def watch(self, dir_path):
+        if self.enabled and dir_path not in self._watcher.directories():
+            self._watcher.addPath(dir_path)
+            self._watch_rules(dir_path)
+
+    def _watch_rules(self, dir_path):
+        """记下规则文件的指纹并监视存在的规则文件（替换保存的文件会从监视中消失，需要重新加入）"""
+        self._rules[dir_path] = rules_fingerprint(dir_path)
+        watched = set(self._watcher.files())
+        for name in IGNORE_FILES:
+            path = os.path.join(dir_path, name)
+            if path not in watched and os.path.isfile(path):
+                self._watcher.addPath(path)
+
+    def unwatch(self, dir_paths):
+        watched = set(self._watcher.directories())
+        dir_paths = [p for p in dir_paths if p in watched]
+        if dir_paths:
+            files = set(self._watcher.files())
+            rule_files = [path for path in (os.path.join(p, name) for p in dir_paths for name in IGNORE_FILES)
+                          if path in files]
+            self._watcher.removePaths(dir_paths + rule_files)
+        for dir_path in dir_paths:
+            self._rules.pop(dir_path, None)
+        self._pending.difference_update(dir_paths)
+
+    def clear(self):
+        watched = self._watcher.directories() + self._watcher.files()
+        if watched:
+            self._watcher.removePaths(watched)
+        self._rules.clear()
+        self._pending.clear()
+        self._timer.stop()
+
+    def set_enabled(self, enabled, dir_paths=()):
+        """关闭时移除所有监视；重新开启时监视调用方给出的已加载目录"""
+        self.enabled = enabled
+        self.clear()
+        if enabled:
+            for dir_path in dir_paths:
+                self.watch(dir_path)
+
+    def _on_changed(self, dir_path):
+        self._pending.add(dir_path)
+        now = time.monotonic()
+        if self._first_event is None:
+            self._first_event = now
+        # 去抖：每个新事件都推迟刷新，但不超过 MAX_DELAY_MS
+        remaining = MAX_DELAY_MS - (now - self._first_event) * 1000
+        self._timer.start(int(max(0, min(DEBOUNCE_MS, remaining))))
+
+    def _flush(self):
+        self._first_event = None
+        if self._pending:
+            changed = sorted(self._pending)
+            self._pending.clear()
+            rules_changed = []
+            for dir_path in changed:
+                old = self._rules.get(dir_path)
+                if old is None:
+                    continue # 已不再监视
+                self._watch_rules(dir_path)
+                if self._rules[dir_path] != old:
+                    rules_changed.append(dir_path)
+            if rules_changed:
+                self.rules_changed.emit(rules_changed)
+            self.dirs_changed.emit(changed)
@@ -0,0 +1,893 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from PySide6.QtWidgets import (QApplication, QMainWindow, QTreeView, QVBoxLayout, 
+                             QWidget, QPushButton, QLabel, QMessageBox, QProgressBar, 
+                             QHBoxLayout, QFileDialog, QLineEdit, QSizeGrip, QFrame,
+                             QSpinBox, QComboBox, QCheckBox, QMenu, QInputDialog)
+from PySide6.QtCore import Qt, QThreadPool
+from PySide6.QtGui import QKeySequence, QShortcut
+
+from extractor import (ContentCache, DepGraph, FileSink, PartSink, PathFilter, ProjectIndex, Trace,
+                       default_workers, format_tokens, recent_projects)
+from extractor.archive import ARCHIVE_EXTS, ArchiveError, is_archive, open_archive
+from extractor.engine import SKIP_TOO_LARGE, TYPE_FILE
+from extractor.excerpt import Excerpt
+from extractor.git import DEFAULT_CONTEXT, DEFAULT_REF, GitDiff, GitError
+from extractor.trace import FORMAT_CHROME, FORMAT_JSON
+from .themes import ThemeManager
+from .search import BuildTask, SearchPanel
+from .tree_model import FileTreeModel
+from .watcher import TreeWatcher
+from .worker import Worker
+
+# 进度条的刻度数：字节数可能超过 QProgressBar 的 int 范围，按千分比显示
+PROGRESS_STEPS = 1000
+
+# output_combo 的选项
+OUTPUT_CLIPBOARD = 0
+OUTPUT_FILE = 1
+OUTPUT_PARTS = 2
+
+
+class TitleBar(QFrame):
+    def __init__(self, parent_window, theme_manager):
+        super().__init__()
+        self.parent_window = parent_window
+        self.theme_manager = theme_manager
+        self.setObjectName("TitleBar")
+        self.setFixedHeight(40)
+        
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(20, 0, 20, 0) # Symmetric alignment
+        layout.setSpacing(0)
+        
+        # Title
+        self.title_label = QLabel("Code Context Extractor")
+        self.title_label.setObjectName("TitleLabel")
+        layout.addWidget(self.title_label)
+        
+        layout.addStretch()
+        
+        # Theme Toggle
+        self.btn_theme = QPushButton("☀/🌙")
+        self.btn_theme.setObjectName("ThemeBtn") # Specific ID for styling
+        self.btn_theme.setProperty("class", "TitleBtn")
+        self.btn_theme.setFixedSize(60, 36) # Wider to avoid truncation
+        self.btn_theme.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.btn_theme.setToolTip("Toggle Theme")
+        self.btn_theme.clicked.connect(self.toggle_theme)
+        layout.addWidget(self.btn_theme)
+
+        # Minimize
+        self.btn_min = QPushButton("─")
+        self.btn_min.setProperty("class", "TitleBtn")
+        self.btn_min.setFixedSize(36, 36)
+        self.btn_min.clicked.connect(self.parent_window.showMinimized)
+        layout.addWidget(self.btn_min)
+
+        # Maximize/Restore
+        self.btn_max = QPushButton("☐")
+        self.btn_max.setProperty("class", "TitleBtn")
+        self.btn_max.setFixedSize(36, 36)
+        self.btn_max.clicked.connect(self.toggle_max_restore)
+        layout.addWidget(self.btn_max)
+
+        # Close
+        self.btn_close = QPushButton("✕")
+        self.btn_close.setProperty("class", "TitleBtn")
+        self.btn_close.setObjectName("CloseBtn") # Specific ID for red hover
+        self.btn_close.setFixedSize(36, 36)
+        self.btn_close.clicked.connect(self.parent_window.close)
+        layout.addWidget(self.btn_close)
+
+    def toggle_theme(self):
+        self.theme_manager.toggle_theme()
+
+    def toggle_max_restore(self):
+        if self.parent_window.isMaximized():
+            self.parent_window.showNormal()
+            self.btn_max.setText("☐")
+        else:
+            self.parent_window.showMaximized()
+            self.btn_max.setText("❐")
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self.parent_window.windowHandle().startSystemMove()
+
+class MainWindow(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Code Context Extractor for AI")
+        self.resize(900, 700)
+        self.setWindowFlags(Qt.WindowType.FramelessWindowHint)
+        
+        # Theme Init：先设置样式表再创建子控件，每个控件只在创建时套用一次样式
+        self.theme_manager = ThemeManager(self)
+        self.theme_manager.apply_theme()
+        
+        # Root Widget & Layout (Contains TitleBar + Content)
+        root_widget = QWidget()
+        root_widget.setObjectName("RootWidget") # Can be used for border
+        self.setCentralWidget(root_widget)
+        root_layout = QVBoxLayout(root_widget)
+        root_layout.setContentsMargins(0, 0, 0, 0)
+        root_layout.setSpacing(0)
+
+        # 1. Title Bar
+        self.title_bar = TitleBar(self, self.theme_manager)
+        root_layout.addWidget(self.title_bar)
+
+        # 2. Content Widget
+        content_widget = QWidget()
+        root_layout.addWidget(content_widget)
+        
+        # Layout for content
+        layout = QVBoxLayout(content_widget)
+        layout.setContentsMargins(20, 10, 20, 10) # Symmetric alignment with TitleBar
+        layout.setSpacing(15)
+
+        # --- Content UI ---
+        # 1. Top Selection Area
+        top_layout = QHBoxLayout()
+        top_layout.setSpacing(10)
+        
+        self.path_edit = QLineEdit()
+        self.path_edit.setPlaceholderText("Select project root directory...")
+        self.path_edit.setReadOnly(True)
+        self.path_edit.setMinimumHeight(35)
+        top_layout.addWidget(self.path_edit)
+
+        self.btn_browse = QPushButton("Browse")
+        self.btn_browse.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.btn_browse.setMinimumHeight(35)
+        self.btn_browse.clicked.connect(self.browse_directory)
+        top_layout.addWidget(self.btn_browse)
+
+        # zip / tar 归档直接作为根目录打开，不解压到磁盘
+        self.btn_archive = QPushButton("Archive")
+        self.btn_archive.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.btn_archive.setMinimumHeight(35)
+        self.btn_archive.setToolTip("Open a .zip or .tar(.gz/.bz2/.xz) archive as the root without unpacking it")
+        self.btn_archive.clicked.connect(self.browse_archive)
+        top_layout.addWidget(self.btn_archive)
+
+        # 最近打开的项目：树、展开状态和勾选从项目索引恢复
+        self.btn_recent = QPushButton("Recent")
+        self.btn_recent.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.btn_recent.setMinimumHeight(35)
+        self.btn_recent.setToolTip("Reopen a recent project with its tree and selection restored")
+        self.recent_menu = QMenu(self.btn_recent)
+        self.recent_menu.aboutToShow.connect(self.fill_recent_menu)
+        self.btn_recent.setMenu(self.recent_menu)
+        top_layout.addWidget(self.btn_recent)
+
+        # 按 git 改动勾选：未提交的改动，或相对某个 ref 的改动
+        self.btn_changed = QPushButton("Changed")
+        self.btn_changed.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.btn_changed.setMinimumHeight(35)
+        self.btn_changed.setToolTip("Check only the files changed in the local git repository")
+        changed_menu = QMenu(self.btn_changed)
+        changed_menu.addAction("Uncommitted Changes", lambda: self.check_changed(DEFAULT_REF))
+        changed_menu.addAction("Changes Against Ref...", self.ask_changed_ref)
+        self.btn_changed.setMenu(changed_menu)
+        self.btn_changed.setEnabled(False)
+        top_layout.addWidget(self.btn_changed)
+        layout.addLayout(top_layout)
+
+        # 2. File Tree
+        self.tree_model = FileTreeModel(self)
+        self.tree = QTreeView()
+        self.tree.setModel(self.tree_model)
+        self.tree.setUniformRowHeights(True) # 大目录下避免逐行计算行高
+        self.tree.collapsed.connect(self.tree_model.cancel_fetch)
+        self.tree.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.tree.customContextMenuRequested.connect(self.show_tree_menu)
+        self.tree_model.checks_changed.connect(self.tree.viewport().update)
+
+        # 监视已展开的目录，文件增删时只修补受影响的节点
+        self.watcher = TreeWatcher(self)
+        self.watcher.dirs_changed.connect(self.tree_model.refresh_dirs)
+        self.watcher.rules_changed.connect(self.tree_model.reload_rules)
+        self.tree_model.dir_loaded.connect(self.watcher.watch)
+        self.tree_model.dirs_unloaded.connect(self.watcher.unwatch)
+        self.tree_model.paths_removed.connect(self.invalidate_cache)
+
+        # 搜索：有查询时结果列表代替文件树
+        self.search_panel = SearchPanel(self.tree_model)
+        self.search_panel.active_changed.connect(lambda active: self.tree.setVisible(not active))
+        self.watcher.dirs_changed.connect(self.search_panel.invalidate)
+        self.watcher.dirs_changed.connect(self.on_dirs_changed)
+        QShortcut(QKeySequence.StandardKey.Find, self, activated=self.focus_search)
+        layout.addWidget(self.search_panel)
+        layout.addWidget(self.tree)
+
+        # 3. Bottom Operations：选项分行排列，每行都放得进默认宽度的窗口。
+        # 第一行决定读取哪些文件，第二行决定每个文件保留多少，第三行决定输出的形式
+        engine_layout = QHBoxLayout()
+        engine_layout.setSpacing(10)
+        engine_layout.addWidget(QLabel("Threads:"))
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, 64)
+        self.workers_spin.setValue(default_workers())
+        self.workers_spin.setToolTip("Parallel read/decode threads (default from CODE_COPIER_WORKERS)")
+        engine_layout.addWidget(self.workers_spin)
+        engine_layout.addWidget(QLabel("Max size:"))
+        self.max_size_spin = QSpinBox()
+        self.max_size_spin.setRange(0, 4096)
+        self.max_size_spin.setSuffix(" MB")
+        self.max_size_spin.setSpecialValueText("No limit")
+        self.max_size_spin.setToolTip("Files larger than this are skipped without being read")
+        engine_layout.addWidget(self.max_size_spin)
+        engine_layout.addWidget(QLabel("Deps:"))
+        self.deps_spin = QSpinBox()
+        self.deps_spin.setRange(0, 10)
+        self.deps_spin.setSpecialValueText("Off")
+        self.deps_spin.setToolTip("Also include local modules imported by the checked files (Python, JS/TS), "
+                                  "following imports this many levels deep")
+        self.deps_spin.valueChanged.connect(self.build_dep_graph)
+        engine_layout.addWidget(self.deps_spin)
+        self.diff_check = QCheckBox("Diff")
+        self.diff_check.setToolTip("Emit unified diffs of changed files instead of whole files; new files "
+                                   "are included in full and unchanged files are skipped. Compares with the "
+                                   "ref last used by Changed (HEAD by default)")
+        self.diff_check.toggled.connect(lambda checked: self.context_spin.setVisible(checked))
+        engine_layout.addWidget(self.diff_check)
+        self.context_spin = QSpinBox()
+        self.context_spin.setRange(0, 100)
+        self.context_spin.setValue(DEFAULT_CONTEXT)
+        self.context_spin.setSuffix(" context lines")
+        self.context_spin.setVisible(False)
+        engine_layout.addWidget(self.context_spin)
+        self.watch_check = QCheckBox("Watch")
+        self.watch_check.setChecked(True)
+        self.watch_check.setToolTip("Update the tree automatically when files are added or removed")
+        self.watch_check.toggled.connect(self.on_watch_toggled)
+        engine_layout.addWidget(self.watch_check)
+        engine_layout.addWidget(QLabel("Exclude:"))
+        self.exclude_edit = QLineEdit()
+        self.exclude_edit.setPlaceholderText("Extra ignore globs, e.g. *.min.js, docs/  (.gitignore is applied automatically)")
+        self.exclude_edit.editingFinished.connect(self.on_exclude_changed)
+        engine_layout.addWidget(self.exclude_edit, 1)
+        layout.addLayout(engine_layout)
+
+        # 所有文件只输出开头/末尾的若干行；单个文件的行范围在树的右键菜单中设置
+        trim_layout = QHBoxLayout()
+        trim_layout.setSpacing(10)
+        self.placeholder_check = QCheckBox("Placeholder")
+        self.placeholder_check.setToolTip("Emit a one-line placeholder for files over the size limit "
+                                          "instead of leaving them out")
+        trim_layout.addWidget(self.placeholder_check)
+        trim_layout.addWidget(QLabel("Head:"))
+        self.head_spin = QSpinBox()
+        self.head_spin.setRange(0, 1000000)
+        self.head_spin.setSuffix(" lines")
+        self.head_spin.setSpecialValueText("Off")
+        self.head_spin.setToolTip("Only the first lines of each file; omitted lines are marked in the output")
+        trim_layout.addWidget(self.head_spin)
+        trim_layout.addWidget(QLabel("Tail:"))
+        self.tail_spin = QSpinBox()
+        self.tail_spin.setRange(0, 1000000)
+        self.tail_spin.setSuffix(" lines")
+        self.tail_spin.setSpecialValueText("Off")
+        self.tail_spin.setToolTip("Only the last lines of each file (with Head, both ends); "
+                                  "large files are read from the end without reading the rest")
+        trim_layout.addWidget(self.tail_spin)
+        range_hint = QLabel("Right-click a file in the tree to set its own line range")
+        range_hint.setEnabled(False)
+        trim_layout.addWidget(range_hint)
+        trim_layout.addStretch()
+        layout.addLayout(trim_layout)
+
+        output_layout = QHBoxLayout()
+        output_layout.setSpacing(10)
+        output_layout.addWidget(QLabel("Output:"))
+        self.output_combo = QComboBox()
+        self.output_combo.addItems(["Clipboard", "File...", "Clipboard in parts"])
+        self.output_combo.setToolTip("Saving to a file streams the result without holding it in memory; "
+                                     "parts split it at file boundaries and copy one part at a time")
+        self.output_combo.currentIndexChanged.connect(
+            lambda index: self.part_spin.setVisible(index == OUTPUT_PARTS))
+        output_layout.addWidget(self.output_combo)
+        self.part_spin = QSpinBox()
+        self.part_spin.setRange(1, 2000)
+        self.part_spin.setValue(100)
+        self.part_spin.setSuffix("k tokens/part")
+        self.part_spin.setToolTip("Largest part; a single file larger than this gets a part of its own")
+        self.part_spin.setVisible(False)
+        output_layout.addWidget(self.part_spin)
+        output_layout.addWidget(QLabel("Budget:"))
+        self.budget_spin = QSpinBox()
+        self.budget_spin.setRange(0, 2000)
+        self.budget_spin.setSingleStep(8)
+        self.budget_spin.setSuffix("k tokens")
+        self.budget_spin.setSpecialValueText("No limit")
+        self.budget_spin.setToolTip("Estimated token budget: explicitly checked files are kept first, "
+                                    "then the smallest files that still fit")
+        output_layout.addWidget(self.budget_spin)
+        self.compact_check = QCheckBox("Compact")
+        self.compact_check.setToolTip("Strip comments, trailing whitespace and extra blank lines "
+                                      "(Python, JS/TS, Java, C/C++, Go and more)")
+        output_layout.addWidget(self.compact_check)
+        self.outline_check = QCheckBox("Outline")
+        self.outline_check.setToolTip("Only signatures, docstrings and constants for Python and "
+                                      "C-family languages; other files are included in full")
+        output_layout.addWidget(self.outline_check)
+        output_layout.addStretch()
+        layout.addLayout(output_layout)
+
+        self.btn_copy = QPushButton("Generate & Copy to Clipboard")
+        self.btn_copy.setMinimumHeight(45)
+        self.btn_copy.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.btn_copy.clicked.connect(self.start_processing)
+        self.btn_copy.setEnabled(False)
+        layout.addWidget(self.btn_copy)
+
+        progress_layout = QHBoxLayout()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        self.progress_bar.setTextVisible(False)
+        progress_layout.addWidget(self.progress_bar, 1)
+        self.btn_cancel = QPushButton("Cancel")
+        self.btn_cancel.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.btn_cancel.clicked.connect(self.cancel_processing)
+        self.btn_cancel.setVisible(False)
+        progress_layout.addWidget(self.btn_cancel)
+        layout.addLayout(progress_layout)
+
+        # 分部分输出：剪贴板上只放当前部分，按需复制上一部分/下一部分
+        self.parts_bar = QWidget()
+        parts_layout = QHBoxLayout(self.parts_bar)
+        parts_layout.setContentsMargins(0, 0, 0, 0)
+        self.part_label = QLabel()
+        parts_layout.addWidget(self.part_label, 1)
+        self.btn_prev_part = QPushButton("Copy Previous Part")
+        self.btn_prev_part.clicked.connect(lambda: self.copy_part(self.part_index - 1))
+        parts_layout.addWidget(self.btn_prev_part)
+        self.btn_next_part = QPushButton("Copy Next Part")
+        self.btn_next_part.clicked.connect(lambda: self.copy_part(self.part_index + 1))
+        parts_layout.addWidget(self.btn_next_part)
+        self.parts_bar.setVisible(False)
+        layout.addWidget(self.parts_bar)
+        
+        # Status Label & SizeGrip Container
+        status_layout = QHBoxLayout()
+        self.status_label = QLabel("Please select a project root directory to start.")
+        self.status_label.setStyleSheet("color: #888; font-style: italic;")
+        self.status_label.setAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
+        status_layout.addWidget(self.status_label, 1) # Stretch
+
+        # 上一次生成的计时统计，生成完成后才显示
+        self.btn_stats = QPushButton("Stats")
+        self.btn_stats.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.btn_stats.setToolTip("Timings, encodings, skipped and slowest files of the last completed run")
+        self.btn_stats.clicked.connect(self.show_stats)
+        self.btn_stats.setVisible(False)
+        status_layout.addWidget(self.btn_stats)
+        
+        # Size Grip
+        self.size_grip = QSizeGrip(self)
+        status_layout.addWidget(self.size_grip, 0, Qt.AlignmentFlag.AlignBottom | Qt.AlignmentFlag.AlignRight)
+        
+        layout.addLayout(status_layout)
+
+        self.worker = None
+        self.scan_total = None # 预扫描结果 (文件数, 字节数)
+        self.scan_time = 0.0
+        self.parts = None # 上一次分部分输出的 PartSink
+        self.last_trace = None # 上一次完成的生成的 (Trace, 根目录)；取消或失败的不算
+        self.part_index = 0
+        self.cache = None
+        self.project_index = None
+        self.path_filter = None
+        self.root_path = ""
+        self.archive = None # 根目录为归档时的 Archive，同时充当 path_filter
+        self.excerpts = {} # 右键菜单设置的单个文件的行范围 {path: Excerpt}
+        # 依赖图：打开项目时（或第一次启用 Deps 时）在后台增量构建
+        self.dep_graph = None
+        self.dep_task = None
+        self.deps_pool = QThreadPool(self)
+        self.deps_pool.setMaxThreadCount(1)
+        # Changed 上一次使用的 ref，以及当时列出的已删除文件（树中没有它们，Diff 模式下补上）
+        self.git_ref = DEFAULT_REF
+        self.changed_deleted = []
+
+    def browse_directory(self):
+        dir_path = QFileDialog.getExistingDirectory(self, "Select Project Root")
+        if dir_path:
+            self.open_project(dir_path)
+
+    def browse_archive(self):
+        patterns = ' '.join('*' + ext for ext in ARCHIVE_EXTS)
+        path, _ = QFileDialog.getOpenFileName(self, "Open Archive", "", f"Archives ({patterns});;All Files (*)")
+        if path:
+            self.open_project(path)
+
+    def fill_recent_menu(self):
+        self.recent_menu.clear()
+        roots = [root for root in recent_projects() if os.path.isdir(root)]
+        for root in roots:
+            self.recent_menu.addAction(root, lambda root=root: self.open_project(root))
+        if not roots:
+            self.recent_menu.addAction("No recent projects").setEnabled(False)
+
+    def open_project(self, dir_path):
+        archive = None
+        if is_archive(dir_path):
+            # 先读出成员列表（压缩的 tar 需要完整解压一遍），打不开时保留当前项目
+            QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+            try:
+                archive = open_archive(dir_path, self.exclude_globs())
+            except (ArchiveError, OSError) as e:
+                QMessageBox.warning(self, "Warning", str(e))
+                return
+            finally:
+                QApplication.restoreOverrideCursor()
+        self.archive = archive
+        self.root_path = dir_path
+        self.path_edit.setText(dir_path)
+        restored = self.load_root_tree(dir_path)
+        self.btn_copy.setEnabled(True)
+        # 归档中没有 git 仓库，也不会变化
+        self.btn_changed.setEnabled(archive is None)
+        self.diff_check.setEnabled(archive is None)
+        self.watch_check.setEnabled(archive is None)
+        self.deps_spin.setEnabled(archive is None)
+        self.git_ref = DEFAULT_REF
+        self.changed_deleted = []
+        self.excerpts = {}
+        if archive is not None:
+            self.status_label.setText(f"Loaded: {dir_path} (archive, {archive.file_count()} files)")
+        elif restored:
+            self.status_label.setText(f"Loaded: {dir_path} (restored from the project index)")
+        else:
+            self.status_label.setText(f"Loaded: {dir_path}")
+
+    def exclude_globs(self):
+        return [g.strip() for g in self.exclude_edit.text().split(',') if g.strip()]
+
+    def build_path_filter(self, root_path):
+        if self.archive is not None:
+            self.archive.set_extra_globs(self.exclude_globs())
+            return self.archive
+        return PathFilter(root_path, self.exclude_globs())
+
+    def on_exclude_changed(self):
+        # 新规则对之后展开的目录和下一次生成生效，已加载的树和勾选状态保持不变
+        if self.root_path:
+            self.path_filter = self.build_path_filter(self.root_path)
+            self.tree_model.path_filter = self.path_filter
+            if self.project_index is not None:
+                try:
+                    self.project_index.set_filter(self.path_filter)
+                except sqlite3.Error:
+                    # 保存的列表按旧规则过滤，又无法作废：这次会话不再使用索引
+                    self.project_index = self.tree_model.project_index = None
+            self.search_panel.set_root(self.root_path, self.path_filter, self.tree_model.lister, self.get_cache(),
+                                       self.archive)
+            if self.dep_graph is not None:
+                self.dep_graph.set_filter(self.path_filter)
+                self.build_dep_graph()
+
+    def ask_changed_ref(self):
+        ref, ok = QInputDialog.getText(self, "Changes Against Ref",
+                                       "Branch, tag or commit (end with ... to compare with the merge base, e.g. main...):",
+                                       text=self.git_ref if self.git_ref != DEFAULT_REF else "main...")
+        if ok and ref.strip():
+            self.check_changed(ref.strip())
+
+    def check_changed(self, ref):
+        """只勾选相对 ref 改动过的文件（包括未跟踪的新文件），不需要加载它们所在的目录"""
+        diff = GitDiff(self.root_path, ref, path_filter=self.path_filter)
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            changes = diff.load_changes()
+        except GitError as e:
+            QMessageBox.warning(self, "Warning", f"Cannot list changes against {ref}:\n{e}")
+            return
+        finally:
+            QApplication.restoreOverrideCursor()
+        self.search_panel.query_edit.clear()
+        self.tree_model.uncheck_all()
+        for path, _ in diff.selection():
+            self.tree_model.set_path_checked(path, False, True)
+        self.git_ref = ref
+        self.changed_deleted = sorted(diff.deleted)
+        deleted = f", {len(diff.deleted)} deleted" if diff.deleted else ""
+        self.status_label.setText(f"Checked {len(changes) - len(diff.deleted)} files changed against {ref}{deleted}.")
+
+    def show_tree_menu(self, pos):
+        index = self.tree.indexAt(pos)
+        node = self.tree_model.node_of(index) if index.isValid() else None
+        if node is None or self.tree_model.index_data.is_dir(node):
+            return
+        path = self.tree_model.index_data.path(node)
+        menu = QMenu(self.tree)
+        menu.addAction("Line Range...", lambda: self.ask_line_range(path))
+        if path in self.excerpts:
+            menu.addAction("Clear Line Range", lambda: self.set_line_range(path, None))
+        menu.exec(self.tree.viewport().mapToGlobal(pos))
+
+    def ask_line_range(self, path):
+        current = self.excerpts.get(path)
+        while True:
+            spec, ok = QInputDialog.getText(self, "Line Range",
+                                            "Lines to output, e.g. 1-80,200-240 or head=100 or tail=50 "
+                                            "(empty for the whole file):",
+                                            text=str(current) if current else "")
+            if not ok:
+                return
+            try:
+                self.set_line_range(path, Excerpt.parse(spec) if spec.strip() else None)
+                return
+            except ValueError as e:
+                QMessageBox.warning(self, "Warning", str(e))
+
+    def set_line_range(self, path, excerpt):
+        """设置单个文件要输出的行，优先于 Head / Tail；文件同时被勾选"""
+        if excerpt:
+            self.excerpts[path] = excerpt
+            self.tree_model.set_path_checked(path, False, True)
+        else:
+            self.excerpts.pop(path, None)
+        self.tree_model.set_note(path, str(excerpt) if excerpt else None)
+
+    def focus_search(self):
+        self.search_panel.query_edit.setFocus()
+        self.search_panel.query_edit.selectAll()
+
+    def load_root_tree(self, root_path):
+        """切换根目录；项目索引中有上次的状态时立即恢复，返回是否恢复了"""
+        self.save_project_state()
+        self.path_filter = self.build_path_filter(root_path)
+        # 旧索引不显式关闭：后台加载任务可能还在用，随最后一个引用释放
+        self.project_index = self.open_project_index(root_path)
+        # 换根目录时模型会丢弃所有未完成的加载；第一层由视图通过 fetchMore 懒加载
+        self.watcher.set_enabled(self.archive is None and self.watch_check.isChecked())
+        self.tree_model.set_root(root_path, self.path_filter, self.project_index)
+        self.search_panel.set_root(root_path, self.path_filter, self.tree_model.lister, self.get_cache(),
+                                   self.archive)
+        self.open_dep_graph(root_path)
+        if self.project_index is None:
+            return False
+
+        loaded, expanded, selection = self.project_index.load_state()
+        if not loaded:
+            return False
+        self.tree_model.restore(loaded, selection)
+        for dir_path in expanded:
+            node = self.tree_model.index_data.find(dir_path)
+            if node is not None:
+                self.tree.expand(self.tree_model.index_of(node))
+        self.tree_model.revalidate()
+        return True
+
+    def open_project_index(self, root_path):
+        """打开项目索引；打不开时直接不用索引。归档的成员列表已在内存中，不需要索引"""
+        if self.archive is not None:
+            return None
+        try:
+            return ProjectIndex(root_path, self.path_filter)
+        except (OSError, sqlite3.Error):
+            return None
+
+    def open_dep_graph(self, root_path):
+        """换项目时换一个依赖图；旧图随最后一个引用释放（后台任务可能还在用）"""
+        if self.dep_task is not None:
+            self.dep_task.cancelled = True
+            self.dep_task = None
+        if self.archive is not None:
+            self.dep_graph = None
+            return
+        try:
+            self.dep_graph = DepGraph(root_path, self.path_filter)
+        except (OSError, sqlite3.Error):
+            self.dep_graph = None
+        self.build_dep_graph()
+
+    def build_dep_graph(self):
+        """Deps 启用时在后台把依赖图建好（只解析变化过的文件），生成时就不必等待"""
+        graph = self.dep_graph
+        if graph is None or not self.deps_spin.value() or graph.ready:
+            return
+        if self.dep_task is not None:
+            self.dep_task.cancelled = True
+        walk = self.tree_model.lister.walk(self.root_path)
+        self.dep_task = BuildTask(0, lambda should_stop: graph.ensure(walk, should_stop))
+        self.deps_pool.start(self.dep_task)
+
+    def on_dirs_changed(self, dir_paths):
+        if self.dep_graph is not None:
+            self.dep_graph.invalidate()
+            self.build_dep_graph()
+
+    def save_project_state(self):
+        """把已加载、已展开的目录和勾选项写入项目索引，下次打开同一项目时恢复"""
+        if self.project_index is None:
+            return
+        model = self.tree_model
+        loaded = model.loaded_dir_paths()
+        expanded = [path for path in loaded if self.tree.isExpanded(model.dir_index(path))]
+        try:
+            self.project_index.save_state(loaded, expanded, model.collect_checked_paths())
+            self.project_index.flush()
+        except sqlite3.Error:
+            pass
+
+    def on_watch_toggled(self, enabled):
+        if self.archive is not None:
+            return
+        self.watcher.set_enabled(enabled, self.tree_model.loaded_dir_paths())
+        if enabled:
+            # 关闭期间可能错过了变化（包括规则文件的修改），重新读取规则并核对一遍已加载的目录
+            self.tree_model.reload_rules(self.tree_model.loaded_dir_paths())
+
+    def invalidate_cache(self, paths):
+        """文件或目录从磁盘上消失时，只删除缓存中对应的条目"""
+        if self.cache is None:
+            return
+        try:
+            for path in paths:
+                self.cache.invalidate(path)
+                self.cache.invalidate_tree(path)
+        except sqlite3.Error:
+            pass  # 数据库被其它进程锁住：条目以 size/mtime 为键，留下也不会被误用
+
+    def start_processing(self):
+        # 收集选中项：list of (path, type), type 0=file, 1=dir(recursive)
+        selected_items = self.tree_model.collect_checked_paths()
+        
+        if not selected_items:
+            QMessageBox.warning(self, "Warning", "Please select files or folders from the tree first.")
+            return
+
+        diff = None
+        if self.diff_check.isChecked() and self.archive is None:
+            diff = GitDiff(self.root_path, self.git_ref, self.context_spin.value(), self.path_filter)
+            try:
+                diff.load_changes()  # 在这里报告 git 的错误；diff 本身在后台线程中取
+            except GitError as e:
+                QMessageBox.warning(self, "Warning", f"Cannot diff against {self.git_ref}:\n{e}")
+                return
+            listed = set(path for path, _ in selected_items)
+            selected_items += [(path, TYPE_FILE) for path in self.changed_deleted
+                               if path in diff.deleted and path not in listed]
+
+        output_path = None
+        if self.output_combo.currentIndex() == OUTPUT_FILE:
+            output_path, _ = QFileDialog.getSaveFileName(self, "Save Output", "context.md", "Markdown (*.md);;All Files (*)")
+            if not output_path:
+                return
+
+        self.discard_parts()
+        sink = None
+        if output_path:
+            # 在这里打开，目录不存在或没有写权限时直接提示，不启动后台线程
+            try:
+                sink = FileSink(output_path)
+            except OSError as e:
+                QMessageBox.warning(self, "Warning", f"Cannot write {output_path}:\n{e}")
+                return
+        elif self.output_combo.currentIndex() == OUTPUT_PARTS:
+            sink = PartSink(tempfile.mkdtemp(prefix='code_copier_parts_'),
+                            max_tokens=self.part_spin.value() * 1000)
+
+        self.btn_copy.setEnabled(False)
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setRange(0, 0) # 预扫描完成前不确定总量
+        self.btn_cancel.setVisible(True)
+        self.btn_cancel.setEnabled(True)
+        self.scan_total = None
+        self.status_label.setText("Scanning files...")
+        
+        self.save_project_state()
+        cache = self.get_cache()
+        if cache is not None:
+            cache.reset_counters()
+        self.worker = Worker(self.root_path, selected_items, workers=self.workers_spin.value(),
+                             output_path=output_path, cache=cache, path_filter=self.path_filter,
+                             max_file_size=self.max_size_spin.value() * 1024 * 1024 or None,
+                             token_budget=self.budget_spin.value() * 1000 or None,
+                             compact=self.compact_check.isChecked(),
+                             outline=self.outline_check.isChecked(), trace=Trace(), sink=sink,
+                             project_index=self.project_index, dep_graph=self.dep_graph,
+                             dep_depth=self.deps_spin.value(), diff=diff, archive=self.archive,
+                             excerpt=Excerpt(self.head_spin.value(), self.tail_spin.value()),
+                             excerpts=dict(self.excerpts), placeholder=self.placeholder_check.isChecked())
+        self.worker.scanned.connect(self.on_scanned)
+        self.worker.progress.connect(self.on_progress)
+        self.worker.finished.connect(self.process_finished)
+        self.worker.cancelled.connect(self.process_cancelled)
+        self.worker.failed.connect(self.process_failed)
+        self.worker.start()
+
+    def on_scanned(self, files, nbytes):
+        self.scan_total = (files, nbytes)
+        self.scan_time = time.perf_counter()
+        self.progress_bar.setRange(0, PROGRESS_STEPS)
+        self.progress_bar.setValue(0)
+        self.status_label.setText(f"Found {files} files ({nbytes / 1024 / 1024:.1f} MB), reading...")
+
+    def on_progress(self, files, nbytes):
+        """按字节数显示进度、吞吐量和预计剩余时间"""
+        if self.scan_total is None:
+            self.status_label.setText(f"Processed {files} files...")
+            return
+        total_files, total_bytes = self.scan_total
+        # 全是空文件时按文件数计算
+        fraction = nbytes / total_bytes if total_bytes else files / max(total_files, 1)
+        self.progress_bar.setValue(int(fraction * PROGRESS_STEPS))
+        text = f"Processed {files} of {total_files} files, {nbytes / 1024 / 1024:.1f} of {total_bytes / 1024 / 1024:.1f} MB"
+        elapsed = time.perf_counter() - self.scan_time
+        if elapsed > 0 and 0 < fraction < 1:
+            eta = elapsed * (1 - fraction) / fraction
+            text += f" ({nbytes / 1024 / 1024 / elapsed:.1f} MB/s, about {eta:.0f}s left)"
+        self.status_label.setText(text + "...")
+
+    def cancel_processing(self):
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.stop()
+            self.btn_cancel.setEnabled(False)
+            self.status_label.setText("Cancelling...")
+
+    def process_cancelled(self):
+        self.reset_progress()
+        self.status_label.setText("Cancelled. Nothing was copied or saved.")
+
+    def process_failed(self, message):
+        self.reset_progress()
+        self.status_label.setText("Failed. Nothing was copied or saved.")
+        QMessageBox.warning(self, "Warning", f"Extraction failed:\n{message}")
+
+    def reset_progress(self):
+        self.btn_copy.setEnabled(True)
+        self.progress_bar.setVisible(False)
+        self.btn_cancel.setVisible(False)
+
+    def get_cache(self):
+        """懒加载解码缓存，整个会话共用；打不开时直接不用缓存"""
+        if self.cache is None:
+            try:
+                self.cache = ContentCache()
+            except (OSError, sqlite3.Error):
+                return None
+        return self.cache
+
+    def process_finished(self, text, count):
+        self.reset_progress()
+
+        extractor = self.worker.extractor
+        self.last_trace = (extractor.trace, self.worker.root_dir)
+        self.btn_stats.setVisible(True)
+        notes = [f"~{format_tokens(extractor.total_tokens)} tokens", f"{extractor.trace.wall:.1f}s"]
+        if extractor.dep_depth:
+            notes.append(f"{extractor.dep_files} added as dependencies")
+        if extractor.diff is not None:
+            notes.append(f"{extractor.diffed} as diffs")
+        if extractor.outline:
+            notes.append(f"{extractor.outlined} as outlines")
+        if extractor.compact:
+            notes.append(f"~{format_tokens(extractor.saved_tokens)} tokens saved by compaction")
+        if extractor.truncated:
+            notes.append(f"{len(extractor.truncated)} truncated")
+        if extractor.cache is not None:
+            notes.append(f"{self.cache.hits} cached")
+        too_large = len({path for path, status in extractor.skipped if status == SKIP_TOO_LARGE})
+        if too_large:
+            notes.append(f"{too_large} skipped as too large")
+        if extractor.dropped:
+            notes.append(f"{len(extractor.dropped)} dropped to fit the budget")
+        details = f" ({', '.join(notes)})"
+
+        dropped = self.dropped_summary(extractor)
+        if self.worker.output_path:
+            self.status_label.setText(f"Done! Saved {count} files{details}.")
+            QMessageBox.information(self, "Success", f"Successfully extracted {count} files to:\n{self.worker.output_path}{dropped}")
+            return
+
+        if self.worker.sink is not None:
+            self.parts = self.worker.sink
+            self.status_label.setText(f"Done! Split {count} files into {len(self.parts.parts)} parts{details}.")
+            if self.parts.parts:
+                self.copy_part(0)
+            return
+
+        start = time.perf_counter()
+        clipboard = QApplication.clipboard()
+        clipboard.setText(text)
+        extractor.trace.add('clipboard', start)
+        
+        self.status_label.setText(f"Done! Copied {count} files{details}.")
+        QMessageBox.information(self, "Success", f"Successfully extracted {count} files to clipboard!\nReady to paste.{dropped}")
+
+    def copy_part(self, index):
+        """把第 index 部分（从 0 开始）读出来放到剪贴板，剪贴板上始终只有一个部分"""
+        total = len(self.parts.parts)
+        if not 0 <= index < total:
+            return
+        try:
+            text = self.parts.read_part(index)
+        except OSError as e:
+            QMessageBox.warning(self, "Warning", f"Cannot read part {index + 1}:\n{e}")
+            return
+        QApplication.clipboard().setText(text)
+        self.part_index = index
+        self.part_label.setText(f"Part {index + 1} of {total} on the clipboard "
+                                f"(~{format_tokens(self.parts.part_tokens[index])} tokens)")
+        self.btn_prev_part.setEnabled(index > 0)
+        self.btn_next_part.setEnabled(index + 1 < total)
+        self.parts_bar.setVisible(True)
+
+    def discard_parts(self):
+        """删除上一次分部分输出的临时文件"""
+        if self.parts is not None:
+            shutil.rmtree(self.parts.directory, ignore_errors=True)
+            self.parts = None
+        self.parts_bar.setVisible(False)
+
+    def closeEvent(self, event):
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.stop()
+            self.worker.wait()
+        self.discard_parts()
+        # 后台建索引的任务可能在读缓存
+        self.search_panel.cancel_builds()
+        self.search_panel.pool.waitForDone()
+        if self.dep_task is not None:
+            self.dep_task.cancelled = True
+        self.deps_pool.waitForDone()
+        if self.dep_graph is not None:
+            self.dep_graph.close()
+            self.dep_graph = None
+        if self.project_index is not None:
+            self.save_project_state()
+            # 等后台列目录的任务结束，它们可能正在使用索引
+            self.tree_model.loader.cancel_all()
+            self.tree_model.loader.pool.waitForDone()
+            self.project_index.close()
+            self.project_index = None
+            self.tree_model.project_index = None
+            self.watcher.clear()
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+        super().closeEvent(event)
+
+    def dropped_summary(self, extractor, limit=10):
+        """超出预算被丢弃的文件，列出前 limit 个"""
+        if not extractor.dropped:
+            return ""
+        lines = [f"\n\n{len(extractor.dropped)} files did not fit the token budget:"]
+        for path, tokens in extractor.dropped[:limit]:
+            lines.append(f"  {os.path.relpath(path, self.root_path)} (~{format_tokens(tokens)})")
+        if len(extractor.dropped) > limit:
+            lines.append(f"  ... and {len(extractor.dropped) - limit} more")
+        return "\n".join(lines)
+
+    def show_stats(self):
+        """显示上一次完成的生成的计时统计，可导出为 Chrome trace 或 JSON"""
+        if self.last_trace is None:
+            return
+        trace, root_dir = self.last_trace
+        lines = trace.summary_lines(lambda path: os.path.relpath(path, root_dir))
+        box = QMessageBox(self)
+        box.setWindowTitle("Extraction Stats")
+        box.setText("\n".join(lines))
+        btn_export = box.addButton("Export Trace...", QMessageBox.ButtonRole.ActionRole)
+        box.addButton(QMessageBox.StandardButton.Close)
+        box.exec()
+        if box.clickedButton() is not btn_export:
+            return
+
+        chrome_filter = "Chrome Trace (*.json)"
+        path, selected = QFileDialog.getSaveFileName(self, "Export Trace", "trace.json",
+                                                     f"{chrome_filter};;JSON Summary (*.json)")
+        if not path:
+            return
+        try:
+            trace.save(path, FORMAT_CHROME if selected == chrome_filter else FORMAT_JSON)
+        except OSError as e:
+            QMessageBox.warning(self, "Warning", f"Cannot write trace:\n{e}")
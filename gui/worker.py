@@ -0,0 +1,101 @@
+import os
+import shutil
+import time
+
+from PySide6.QtCore import QThread, Signal
+
+from extractor import Extractor, FileSink, PartSink, StringSink
+
+# 进度信号的最短间隔（秒），避免每个文件都刷新一次界面
+PROGRESS_INTERVAL = 0.1
+
+
+class Worker(QThread):
+    """把 extractor.Extractor 包装成后台线程，通过信号回报进度和结果"""
+    scanned = Signal(int, 'qint64')   # 预扫描完成：file_count, total_bytes
+    progress = Signal(int, 'qint64')  # 已处理的文件数, 字节数
+    finished = Signal(str, int)  # result_text（写文件或分部分时为空）, file_count
+    cancelled = Signal()         # stop() 之后代替 finished 发出，未完成的输出已删除
+    failed = Signal(str)         # 提取出错时代替 finished 发出：错误信息，未完成的输出已删除
+    
+    def __init__(self, root_dir, selected_paths, workers=None, output_path=None, cache=None,
+                 path_filter=None, max_file_size=None, token_budget=None, compact=False,
+                 outline=False, trace=None, sink=None, project_index=None, dep_graph=None, dep_depth=0,
+                 diff=None, archive=None, excerpt=None, excerpts=None, placeholder=False):
+        """
+        root_dir: 项目根目录
+        selected_paths: 一个列表，包含 (path, type)
+                        type 0 = 文件
+                        type 1 = 文件夹 (全选)
+        workers: 读取/解码线程数，None 使用引擎默认值
+        output_path: 指定时流式写入该文件，否则在内存中收集结果用于剪贴板；
+                     窗口会先打开 FileSink 作为 sink 传入，路径不可写时在启动线程之前就报告
+        cache: 可选的 ContentCache，在多次生成之间复用解码结果
+        path_filter: 与文件树共用的 PathFilter
+        max_file_size: 超过该字节数的文件跳过，None 表示不限制
+        token_budget: 结果的 token 上限，超出时只保留放得下的文件，None 表示不限制
+        compact: 去掉注释和多余空白后再输出
+        outline: 支持的语言只输出大纲
+        trace: 可选的 Trace，记录各阶段耗时供界面显示和导出
+        sink: 指定时写入该 sink（如 PartSink），忽略 output_path
+        project_index: 与文件树共用的 ProjectIndex，全选的文件夹从索引展开
+        dep_graph: 窗口在后台构建的 DepGraph；dep_depth > 0 时把选中文件引用的本地模块一并输出
+        diff: 可选的 GitDiff，改动过的文件只输出 diff
+        archive: 根目录为归档时的 Archive，成员直接从归档中读取
+        excerpt / excerpts: 所有文件 / 单个文件只输出的行（excerpt.Excerpt）
+        placeholder: 超过 max_file_size 的文件输出占位说明
+        """
+        super().__init__()
+        self.root_dir = root_dir
+        self.selected_paths = selected_paths
+        self.output_path = output_path
+        self.sink = sink
+        self._last_progress = 0.0
+        self.extractor = Extractor(root_dir, selected_paths, workers=workers, cache=cache,
+                                   path_filter=path_filter, max_file_size=max_file_size,
+                                   token_budget=token_budget, compact=compact,
+                                   outline=outline, trace=trace, project_index=project_index,
+                                   dep_graph=dep_graph, dep_depth=dep_depth, diff=diff, archive=archive,
+                                   excerpt=excerpt, excerpts=excerpts, placeholder=placeholder)
+
+    @property
+    def is_running(self):
+        return self.extractor.is_running
+
+    def run(self):
+        sink = self.sink
+        if sink is None:
+            sink = FileSink(self.output_path) if self.output_path else StringSink()
+        try:
+            with sink:
+                total_files = self.extractor.write_to(sink, on_progress=self.report_progress,
+                                                      on_scan=self.scanned.emit)
+        except Exception as e:
+            # git、磁盘、缓存数据库等任何错误都要通知窗口，否则界面会一直停在运行状态
+            self.discard(sink)
+            self.failed.emit(str(e) or type(e).__name__)
+            return
+        if not self.is_running:
+            self.discard(sink)
+            self.cancelled.emit()
+            return
+        self.finished.emit(sink.getvalue() if isinstance(sink, StringSink) else "", total_files)
+
+    def report_progress(self, files, nbytes):
+        now = time.perf_counter()
+        if now - self._last_progress >= PROGRESS_INTERVAL:
+            self._last_progress = now
+            self.progress.emit(files, nbytes)
+
+    def discard(self, sink):
+        """取消或出错后删除写了一半的输出文件"""
+        if isinstance(sink, PartSink):
+            shutil.rmtree(sink.directory, ignore_errors=True)
+        elif isinstance(sink, FileSink):
+            try:
+                os.remove(sink.path)
+            except OSError:
+                pass
+
+    def stop(self):
+        self.extractor.stop()
@@ -0,0 +1,20 @@
+from extractor.compact import compact_text
+
+
+def test_ts_keeps_triple_slash_directives():
+    text = ("/// <reference path='x'/>\n"
+            '/// <amd-module name="m"/>\n'
+            "/// doc comment\n"
+            "x = y // z\n")
+    assert compact_text('d.ts', text) == ("/// <reference path='x'/>\n"
+                                          '/// <amd-module name="m"/>\n'
+                                          "x = y")
+
+
+def test_ts_directive_after_code():
+    assert compact_text('a.ts', 'let a = 1; /// <reference types="node" />\n') == \
+        'let a = 1; /// <reference types="node" />'
+
+
+def test_go_keeps_build_constraints():
+    assert compact_text('a.go', "//go:build linux\n// c\npackage a // p\n") == "//go:build linux\npackage a"
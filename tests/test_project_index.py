@@ -0,0 +1,54 @@
+import os
+
+from extractor import project_index
+from extractor.project_index import ProjectIndex
+
+
+def walk_files(index, top):
+    return sorted(os.path.relpath(os.path.join(dir_path, name), index.root).replace(os.sep, '/')
+                  for dir_path, _, files in index.walk(top) for name in files)
+
+
+def make_project(tmp_path, monkeypatch):
+    # 刚修改过的目录不记录 mtime（见 RACY_NS），测试中不等待
+    monkeypatch.setattr(project_index, 'RACY_NS', 0)
+    root = tmp_path / 'pi'
+    sub = root / 'src' / 'sub'
+    sub.mkdir(parents=True)
+    (sub / 'gen.py').write_text('x = 1\n')
+    (sub / 'keep.py').write_text('y = 1\n')
+    (root / '.gitignore').write_text('*.log\n')
+    return str(root), str(sub), str(tmp_path / 'projects.sqlite')
+
+
+def test_ancestor_rules_change_invalidates_listing(tmp_path, monkeypatch):
+    """从子目录开始遍历时，根目录 .gitignore 的变化同样使保存的列表失效（每次新开索引，如命令行 --index）"""
+    root, sub, db = make_project(tmp_path, monkeypatch)
+    index = ProjectIndex(root, path=db)
+    assert walk_files(index, sub) == ['src/sub/gen.py', 'src/sub/keep.py']
+    index.close()
+
+    index = ProjectIndex(root, path=db)
+    assert walk_files(index, sub) == ['src/sub/gen.py', 'src/sub/keep.py']
+    assert (index.hits, index.misses) == (1, 0)
+    index.close()
+
+    with open(os.path.join(root, '.gitignore'), 'a') as f:
+        f.write('gen.py\n')
+    index = ProjectIndex(root, path=db)
+    assert walk_files(index, sub) == ['src/sub/keep.py']
+    index.close()
+
+
+def test_ancestor_rules_change_reloads_path_filter(tmp_path, monkeypatch):
+    """同一个索引（GUI、守护进程）：PathFilter 中缓存的上级规则也要重新读取"""
+    root, sub, db = make_project(tmp_path, monkeypatch)
+    index = ProjectIndex(root, path=db)
+    assert walk_files(index, root) == ['.gitignore', 'src/sub/gen.py', 'src/sub/keep.py']
+
+    with open(os.path.join(root, '.gitignore'), 'a') as f:
+        f.write('gen.py\n')
+    assert index.stale_dirs([sub]) == [sub]
+    assert walk_files(index, sub) == ['src/sub/keep.py']
+    assert walk_files(index, root) == ['.gitignore', 'src/sub/keep.py']
+    index.close()